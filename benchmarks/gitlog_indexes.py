@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+"""
+Benchmark of the CourseGitLog indexes added in migration 0003.
+
+Builds a synthetic edx_sysadmin_coursegitlog table in a throwaway sqlite
+database, then prints the query plan and timing of the Git Logs and retention
+queries before and after creating the indexes.
+
+Usage: python benchmarks/gitlog_indexes.py [--rows 300000] [--courses 500]
+"""
+import argparse
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+SCHEMA = """
+CREATE TABLE edx_sysadmin_coursegitlog (
+    id integer NOT NULL PRIMARY KEY AUTOINCREMENT,
+    course_id varchar(255) NOT NULL,
+    course_import_log text NULL,
+    course_import_log_compressed blob NULL,
+    git_log text NULL,
+    repo_dir varchar(255) NOT NULL,
+    "commit" varchar(40) NULL,
+    author varchar(255) NOT NULL,
+    created datetime NULL
+);
+CREATE INDEX edx_sysadmin_coursegitlog_course_id
+    ON edx_sysadmin_coursegitlog (course_id);
+"""
+
+INDEXES = """
+CREATE INDEX sysadmin_gitlog_course_crtd
+    ON edx_sysadmin_coursegitlog (course_id, created, id);
+CREATE INDEX sysadmin_gitlog_created
+    ON edx_sysadmin_coursegitlog (created, id);
+"""
+
+# The queries issued by the Git Logs panel and the retention pruning
+QUERIES = {
+    "course logs page": (
+        "SELECT id, course_id, git_log, created FROM edx_sysadmin_coursegitlog "
+        "WHERE course_id = :course_id ORDER BY created DESC, id DESC LIMIT 11"
+    ),
+    "course logs deep page": (
+        "SELECT id, course_id, git_log, created FROM edx_sysadmin_coursegitlog "
+        "WHERE course_id = :course_id AND (created < :created "
+        "OR (created = :created AND id < :id)) "
+        "ORDER BY created DESC, id DESC LIMIT 11"
+    ),
+    "staff logs page": (
+        "SELECT id, course_id, git_log, created FROM edx_sysadmin_coursegitlog "
+        "ORDER BY created DESC, id DESC LIMIT 11"
+    ),
+    "staff logs deep page": (
+        "SELECT id, course_id, git_log, created FROM edx_sysadmin_coursegitlog "
+        "WHERE created < :created OR (created = :created AND id < :id) "
+        "ORDER BY created DESC, id DESC LIMIT 11"
+    ),
+    "course retention cutoff": (
+        "SELECT id FROM edx_sysadmin_coursegitlog WHERE course_id = :course_id "
+        "ORDER BY created DESC LIMIT 100 OFFSET 20"
+    ),
+}
+
+
+def populate(connection, rows, courses):
+    """Fill the table with rows spread over courses and a year of imports"""
+    start = datetime(2021, 1, 1)
+    course_ids = [f"course-v1:MITx+course{index}+run" for index in range(courses)]
+    random.seed(0)
+    connection.executemany(
+        "INSERT INTO edx_sysadmin_coursegitlog "
+        "(course_id, git_log, repo_dir, author, created) VALUES (?, ?, ?, '', ?)",
+        (
+            (
+                random.choice(course_ids),
+                "Commit ID: " + "0" * 40,
+                "repo",
+                (start + timedelta(seconds=index * 100)).isoformat(" "),
+            )
+            for index in range(rows)
+        ),
+    )
+    connection.commit()
+    return course_ids
+
+
+def run_queries(connection, params):
+    """Print the plan and the best of 5 timings of every query"""
+    for name, query in QUERIES.items():
+        plan = "; ".join(
+            row[-1] for row in connection.execute("EXPLAIN QUERY PLAN " + query, params)
+        )
+        timings = []
+        for _ in range(5):
+            start = time.perf_counter()
+            connection.execute(query, params).fetchall()
+            timings.append(time.perf_counter() - start)
+        print(f"  {name:<26} {min(timings) * 1000:9.2f} ms  {plan}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=300000)
+    parser.add_argument("--courses", type=int, default=500)
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(":memory:")
+    connection.executescript(SCHEMA)
+    course_ids = populate(connection, args.rows, args.courses)
+    connection.execute("ANALYZE")
+
+    course_id = course_ids[0]
+    created, pk = connection.execute(
+        "SELECT created, id FROM edx_sysadmin_coursegitlog WHERE course_id = ? "
+        "ORDER BY created LIMIT 1 OFFSET 50",
+        (course_id,),
+    ).fetchone()
+    params = {"course_id": course_id, "created": created, "id": pk}
+
+    print(f"{args.rows} rows over {args.courses} courses")
+    print("Before (course_id index only):")
+    run_queries(connection, params)
+
+    connection.executescript(INDEXES)
+    connection.execute("ANALYZE")
+    print("After (course_id, created, id) and (created, id) indexes:")
+    run_queries(connection, params)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,15 @@
 Tests for Permissions
 """
 import ddt
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
 from unittest.mock import patch
 
 from git import Repo
+from opaque_keys.edx.locator import CourseLocator
 
 from django.conf import settings
 from django.test import TestCase, override_settings
@@ -13,7 +19,17 @@ from rest_framework import status as _status
 from rest_framework.test import APIClient
 from rest_framework.response import Response
 
+from common.djangoapps.student.tests.factories import UserFactory
+from openedx.core.djangoapps.content.course_overviews.tests.factories import (
+    CourseOverviewFactory,
+)
+from edx_sysadmin.import_log import index_import_log_messages
+from edx_sysadmin.models import CourseGitLog, CourseImportStatus
+from edx_sysadmin.utils.pagination import encode_cursor
+
 SYSADMIN_GITHUB_WEBHOOK_KEY = "nuiVypAArY7lFDgMdyC5kwutDGQdDc6rXljuIcI5iBttpPebui"
+# Kept unpatched for the tests to run git themselves
+check_output = subprocess.check_output
 
 
 @ddt.ddt
@@ -222,3 +238,304 @@ class GitReloadAPIViewTestCase(TestCase):
             HTTP_X_Github_Event=event,
         )
         self.assertEqual(response.status_code, status)
+
+
+class GitCourseDetailsAPIViewTestCase(TestCase):
+    """
+    Test Case for GitCourseDetailsAPIView
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = UserFactory.create(is_staff=True, password="foo")
+        self.client.login(username=self.user.username, password="foo")
+        self.git_repo_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.git_repo_dir)
+        self.course_dir = "sysadmin_test_{}".format(os.path.basename(self.git_repo_dir))
+        self.repo_path = os.path.join(self.git_repo_dir, self.course_dir)
+        os.mkdir(self.repo_path)
+        self.git("init", "-q")
+        self.git("config", "user.email", "test@example.com")
+        self.git("config", "user.name", "test")
+        self.git("commit", "-q", "--allow-empty", "-m", "initial")
+
+    def git(self, *args):
+        """Runs a git command in the test repo"""
+        return check_output(("git",) + args, cwd=self.repo_path)
+
+    def get_details(self):
+        """Requests the git details of the test repo"""
+        with self.settings(GIT_REPO_DIR=self.git_repo_dir):
+            return self.client.get(
+                reverse("sysadmin:api:git-course-details"),
+                {"courseDir": self.course_dir},
+            )
+
+    @patch(
+        "edx_sysadmin.api.views.subprocess.check_output",
+        side_effect=check_output,
+    )
+    def test_details_cached_on_ref_state(self, mocked_check_output):
+        """
+        Unchanged repos are answered from the cache, a new commit invalidates it
+        """
+        response = self.get_details()
+        self.assertEqual(response.status_code, _status.HTTP_200_OK)
+        first_commit = response.data["commit"]
+
+        self.assertEqual(self.get_details().data["commit"], first_commit)
+        self.assertEqual(mocked_check_output.call_count, 1)
+
+        self.git("commit", "-q", "--allow-empty", "-m", "second")
+        response = self.get_details()
+        self.assertNotEqual(response.data["commit"], first_commit)
+        self.assertEqual(mocked_check_output.call_count, 2)
+
+
+class GitCoursesAPIViewTestCase(TestCase):
+    """
+    Test Case for GitCoursesAPIView
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = UserFactory.create(is_staff=True, password="foo")
+        self.client.login(username=self.user.username, password="foo")
+        self.course_keys = [
+            CourseLocator("MITx", "course{}".format(index), "run") for index in range(3)
+        ]
+        CourseGitLog.objects.create(
+            course_id=self.course_keys[0], repo_dir="old_repo", commit="a" * 40
+        )
+        CourseGitLog.objects.create(
+            course_id=self.course_keys[0],
+            repo_dir="repo",
+            commit="b" * 40,
+            status=CourseGitLog.STATUS_SUCCEEDED,
+            warning_count=2,
+            error_count=0,
+        )
+        for course_key in reversed(self.course_keys):
+            CourseOverviewFactory.create(id=course_key, display_name=str(course_key))
+
+    def test_cursor_pagination(self):
+        """
+        Courses are paged in course id order and merged with their latest import
+        """
+        response = self.client.get(
+            reverse("sysadmin:api:git-courses"), {"page_size": 2}
+        )
+        self.assertEqual(response.status_code, _status.HTTP_200_OK)
+        self.assertEqual(
+            [course["course_id"] for course in response.data["results"]],
+            [str(course_key) for course_key in self.course_keys[:2]],
+        )
+        self.assertEqual(response.data["results"][0]["repo_dir"], "repo")
+        self.assertEqual(response.data["results"][0]["import_status"], "succeeded")
+        self.assertEqual(response.data["results"][0]["warning_count"], 2)
+        self.assertEqual(response.data["results"][0]["commit"], "b" * 40)
+        self.assertIsNone(response.data["results"][1]["commit"])
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual(
+            [course["course_id"] for course in response.data["results"]],
+            [str(self.course_keys[2])],
+        )
+        self.assertIsNone(response.data["next"])
+
+    def test_invalid_cursor(self):
+        """
+        Cursors which don't hold a course id are rejected
+        """
+        response = self.client.get(
+            reverse("sysadmin:api:git-courses"), {"cursor": encode_cursor("nope")}
+        )
+        self.assertEqual(response.status_code, _status.HTTP_400_BAD_REQUEST)
+
+    def test_field_selection(self):
+        """
+        Only the requested fields are returned, unknown ones are rejected
+        """
+        response = self.client.get(
+            reverse("sysadmin:api:git-courses"), {"fields": "course_id,commit"}
+        )
+        self.assertEqual(
+            set(response.data["results"][0].keys()), {"course_id", "commit"}
+        )
+
+        response = self.client.get(
+            reverse("sysadmin:api:git-courses"), {"fields": "course_id,secret"}
+        )
+        self.assertEqual(response.status_code, _status.HTTP_400_BAD_REQUEST)
+
+
+class GitLogsExportAPIViewTestCase(TestCase):
+    """
+    Test Case for GitLogsExportAPIView
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = UserFactory.create(is_staff=True, password="foo")
+        self.client.login(username=self.user.username, password="foo")
+        CourseGitLog.objects.create(
+            course_id=CourseLocator("MITx", "course", "run"),
+            repo_dir="repo",
+            status=CourseGitLog.STATUS_FAILED,
+            first_error="Broken problem",
+        )
+
+    def test_csv_export(self):
+        """
+        The logs are streamed as a CSV attachment
+        """
+        response = self.client.get(
+            reverse("sysadmin:api:git-logs-export"), {"file_format": "csv"}
+        )
+        self.assertEqual(response.status_code, _status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        lines = b"".join(response.streaming_content).decode("utf-8").splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith("id,course_id,"))
+        self.assertIn("Broken problem", lines[1])
+
+    def test_invalid_params(self):
+        """
+        Unknown formats and statuses are rejected, non staff users are denied
+        """
+        for params in ({"file_format": "xml"}, {"status": "unknown"}):
+            response = self.client.get(reverse("sysadmin:api:git-logs-export"), params)
+            self.assertEqual(response.status_code, _status.HTTP_400_BAD_REQUEST)
+
+        self.user.is_staff = False
+        self.user.save()
+        response = self.client.get(reverse("sysadmin:api:git-logs-export"))
+        self.assertEqual(response.status_code, _status.HTTP_403_FORBIDDEN)
+
+
+class GitLogSearchAPIViewTestCase(TestCase):
+    """
+    Test Case for GitLogSearchAPIView
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = UserFactory.create(is_staff=True, password="foo")
+        self.client.login(username=self.user.username, password="foo")
+        self.course_a = CourseLocator("MITx", "a", "run")
+        for course_key, messages in (
+            (
+                self.course_a,
+                [
+                    (logging.WARNING, "Missing display name"),
+                    (logging.ERROR, "Broken problem p1"),
+                ],
+            ),
+            (
+                CourseLocator("MITx", "b", "run"),
+                [(logging.ERROR, "Broken video v1")],
+            ),
+        ):
+            index_import_log_messages(
+                CourseGitLog.objects.create(course_id=course_key, repo_dir="repo"),
+                messages,
+            )
+
+    def search(self, **params):
+        """Searches the messages, returning the response"""
+        return self.client.get(reverse("sysadmin:api:git-logs-search"), params)
+
+    def test_search(self):
+        """
+        Messages are matched on the start of their words, newest first, and can be
+        narrowed down to a course and a severity
+        """
+        response = self.search(q="brok")
+        self.assertEqual(response.status_code, _status.HTTP_200_OK)
+        self.assertEqual(
+            [result["excerpt"] for result in response.data["results"]],
+            ["Broken video v1", "Broken problem p1"],
+        )
+        self.assertEqual(response.data["results"][0]["level"], "ERROR")
+
+        response = self.search(q="broken", course_id=str(self.course_a))
+        self.assertEqual(
+            [result["excerpt"] for result in response.data["results"]],
+            ["Broken problem p1"],
+        )
+
+        response = self.search(course_id=str(self.course_a), severity="error")
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_pagination(self):
+        """
+        Pages link to the next one until the last
+        """
+        response = self.search(page_size=2)
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIsNotNone(response.data["next"])
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertIsNone(response.data["next"])
+
+    def test_invalid_params(self):
+        """
+        Unknown severities, bad course ids and page sizes are rejected, non staff
+        users are denied
+        """
+        for params in (
+            {"severity": "debug"},
+            {"course_id": "not a course"},
+            {"page_size": "0"},
+            {"cursor": "garbage"},
+        ):
+            response = self.search(**params)
+            self.assertEqual(response.status_code, _status.HTTP_400_BAD_REQUEST)
+
+        self.user.is_staff = False
+        self.user.save()
+        self.assertEqual(self.search().status_code, _status.HTTP_403_FORBIDDEN)
+
+
+class CourseImportStatusAPIViewTestCase(TestCase):
+    """
+    Test Case for CourseImportStatusAPIView
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = UserFactory.create(is_staff=True, password="foo")
+        self.client.login(username=self.user.username, password="foo")
+        for course, status in (("a", "succeeded"), ("b", "failed")):
+            CourseImportStatus.objects.create(
+                course_id=CourseLocator("MITx", course, "run"),
+                repo_dir=course,
+                status=status,
+            )
+
+    def test_sort_and_filter(self):
+        """
+        Failed imports are listed first, courses can be filtered on their status
+        """
+        response = self.client.get(reverse("sysadmin:api:import-status"))
+        self.assertEqual(
+            [course["repo_dir"] for course in response.data["results"]], ["b", "a"]
+        )
+
+        response = self.client.get(
+            reverse("sysadmin:api:import-status"), {"status": "succeeded"}
+        )
+        self.assertEqual(
+            [course["repo_dir"] for course in response.data["results"]], ["a"]
+        )
+
+        response = self.client.get(
+            reverse("sysadmin:api:import-status"), {"sort": "unknown"}
+        )
+        self.assertEqual(response.status_code, _status.HTTP_400_BAD_REQUEST)
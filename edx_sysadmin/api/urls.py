@@ -4,7 +4,11 @@ URLs for edx_sysadmin.
 from django.conf.urls import url, include
 
 from edx_sysadmin.api.views import (
+    CourseImportStatusAPIView,
     GitCourseDetailsAPIView,
+    GitCoursesAPIView,
+    GitLogSearchAPIView,
+    GitLogsExportAPIView,
     GitReloadAPIView,
 )
 
@@ -17,4 +21,20 @@ urlpatterns = [
         GitCourseDetailsAPIView.as_view(),
         name="git-course-details",
     ),
+    url("^courses/$", GitCoursesAPIView.as_view(), name="git-courses"),
+    url(
+        "^gitlogs/search/$",
+        GitLogSearchAPIView.as_view(),
+        name="git-logs-search",
+    ),
+    url(
+        "^gitlogs/export/$",
+        GitLogsExportAPIView.as_view(),
+        name="git-logs-export",
+    ),
+    url(
+        "^importstatus/$",
+        CourseImportStatusAPIView.as_view(),
+        name="import-status",
+    ),
 ]
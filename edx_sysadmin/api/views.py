@@ -1,13 +1,21 @@
 import json
 import logging
+from hashlib import sha1
 from path import Path as path
 import subprocess
 
 from django.conf import settings
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
 from django.utils.decorators import method_decorator
 from django.utils.translation import gettext as _
+from edx_rest_framework_extensions.auth.jwt.authentication import JwtAuthentication
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
 from rest_framework import status, permissions
 from rest_framework.authentication import SessionAuthentication
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 from rest_framework.response import Response
 
@@ -15,15 +23,42 @@ from edx_sysadmin.api.permissions import GithubWebhookPermission
 from edx_sysadmin.git_import import (
     add_repo,
     DEFAULT_GIT_REPO_DIR,
+    get_webhook_import_log_level,
+)
+from edx_sysadmin.import_log import (
+    SEVERITY_LEVELS,
+    make_excerpt,
+    search_import_log_messages,
+)
+from edx_sysadmin.models import CourseGitLog
+from edx_sysadmin.utils.export import (
+    EXPORT_CONTENT_TYPES,
+    EXPORT_FORMATS,
+    export_git_logs,
+    get_git_logs_for_export,
+)
+from edx_sysadmin.utils.pagination import (
+    InvalidCursor,
+    decode_cursor,
+    encode_cursor,
+    paginate_by_created,
 )
 from edx_sysadmin.utils.utils import (
+    IMPORT_STATUS_ORDERINGS,
+    get_course_import_statuses,
+    get_latest_course_git_logs,
     get_local_active_branch,
     get_local_course_repo,
     get_clean_branch_name,
+    get_git_ref_state,
+    parse_datetime_param,
 )
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_GIT_COURSE_DETAILS_CACHE_TIMEOUT = 24 * 60 * 60
+GIT_COURSE_DETAILS_CACHE_KEY = "edx_sysadmin.git_course_details.{0}"
+
 
 class GitReloadAPIView(APIView):
     """
@@ -69,7 +104,9 @@ class GitReloadAPIView(APIView):
                     # So, We will do the course import instead of reload
 
                     add_repo.delay(
-                        repo=repo_ssh_url, branch=settings.SYSADMIN_DEFAULT_BRANCH
+                        repo=repo_ssh_url,
+                        branch=settings.SYSADMIN_DEFAULT_BRANCH,
+                        log_level=get_webhook_import_log_level(),
                     )
                     msg = _(
                         "No local course copy found. Triggered course import from branch: {} of repo: {}"
@@ -87,7 +124,9 @@ class GitReloadAPIView(APIView):
                             "The pushed branch ({}) is not currently in use"
                         ).format(pushed_branch)
                     else:
-                        add_repo.delay(repo_ssh_url)
+                        add_repo.delay(
+                            repo_ssh_url, log_level=get_webhook_import_log_level()
+                        )
                         msg = _("Triggered reloading branch: {} of repo: {}").format(
                             active_branch, repo_name
                         )
@@ -157,6 +196,17 @@ class GitCourseDetailsAPIView(APIView):
             if not git_dir.exists():
                 return ["", "", ""]
 
+        # The details only change with HEAD, so they are cached against the state of
+        # the repo's ref files and served without running git while that is unchanged
+        ref_state = get_git_ref_state(git_dir)
+        if ref_state is not None:
+            cache_key = GIT_COURSE_DETAILS_CACHE_KEY.format(
+                sha1(repr(ref_state).encode("utf-8")).hexdigest()
+            )
+            output_json = cache.get(cache_key)
+            if output_json is not None:
+                return output_json
+
         cmd = [
             "git",
             "log",
@@ -173,4 +223,312 @@ class GitCourseDetailsAPIView(APIView):
         except (ValueError, subprocess.CalledProcessError):
             raise
 
+        if ref_state is not None:
+            cache.set(
+                cache_key,
+                output_json,
+                getattr(
+                    settings,
+                    "SYSADMIN_GIT_COURSE_DETAILS_CACHE_TIMEOUT",
+                    DEFAULT_GIT_COURSE_DETAILS_CACHE_TIMEOUT,
+                ),
+            )
         return output_json
+
+
+class GitCoursesAPIView(APIView):
+    """
+    APIView to list the courses shown in the Courses panel along with the git
+    details stored by their latest import, using cursor pagination.
+
+    Query params:
+        cursor: the "next" cursor of the previous page
+        page_size: number of courses per page
+        fields: comma separated subset of FIELDS to return
+    """
+
+    authentication_classes = [JwtAuthentication, SessionAuthentication]
+    permission_classes = [permissions.IsAdminUser]
+
+    DEFAULT_PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 500
+    FIELDS = (
+        "course_id",
+        "display_name",
+        "git_directory",
+        "repo_dir",
+        "commit",
+        "last_import",
+        "import_status",
+        "warning_count",
+        "error_count",
+        "first_error",
+        "import_duration",
+    )
+    GIT_LOG_FIELDS = FIELDS[3:]
+
+    def get(self, request):
+        """
+        Get a page of courses with their git details
+        """
+        try:
+            fields = self.get_fields(request.GET.get("fields"))
+            page_size = self.get_page_size(request.GET.get("page_size"))
+            after = decode_cursor(request.GET.get("cursor"), 1)
+            after_course_key = CourseKey.from_string(after[0]) if after else None
+        except (InvalidCursor, InvalidKeyError, ValueError) as e:
+            err_msg = str(e)
+            logger.exception(f"{self.__class__.__name__}:: {err_msg}")
+            return Response({"message": err_msg}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Paged in the database, one course more tells whether there's a next page
+        courses = CourseOverview.objects.only("id", "display_name").order_by("id")
+        if after_course_key is not None:
+            courses = courses.filter(id__gt=after_course_key)
+        limit = page_size + 1
+        courses = list(courses[:limit])
+        page, has_next = courses[:page_size], len(courses) > page_size
+
+        git_logs = {}
+        if any(field in self.GIT_LOG_FIELDS for field in fields):
+            git_logs = get_latest_course_git_logs([course.id for course in page])
+
+        next_url = None
+        if has_next:
+            next_url = replace_query_param(
+                request.build_absolute_uri(),
+                "cursor",
+                encode_cursor(str(page[-1].id)),
+            )
+
+        return Response(
+            {
+                "next": next_url,
+                "results": [
+                    self.serialize_course(course, git_logs.get(course.id), fields)
+                    for course in page
+                ],
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    def get_fields(self, fields_param):
+        """Get the requested fields, all of them by default"""
+        if not fields_param:
+            return self.FIELDS
+        fields = [field.strip() for field in fields_param.split(",") if field.strip()]
+        unknown = set(fields) - set(self.FIELDS)
+        if unknown:
+            raise ValueError(_("Unknown fields: {}").format(", ".join(sorted(unknown))))
+        return fields
+
+    def get_page_size(self, page_size_param):
+        """Get the requested page size, capped at MAX_PAGE_SIZE"""
+        if not page_size_param:
+            return self.DEFAULT_PAGE_SIZE
+        page_size = int(page_size_param)
+        if page_size < 1:
+            raise ValueError(_("page_size must be a positive number"))
+        return min(page_size, self.MAX_PAGE_SIZE)
+
+    def serialize_course(self, course, git_log, fields):
+        """Merge a course overview with the details of its latest import"""
+        data = {
+            "course_id": str(course.id),
+            "display_name": course.display_name,
+            "git_directory": course.id.course,
+            "repo_dir": git_log.repo_dir if git_log else None,
+            "commit": git_log.commit if git_log else None,
+            "last_import": git_log.created if git_log else None,
+            "import_status": git_log.status if git_log else None,
+            "warning_count": git_log.warning_count if git_log else None,
+            "error_count": git_log.error_count if git_log else None,
+            "first_error": git_log.first_error if git_log else None,
+            "import_duration": git_log.duration if git_log else None,
+        }
+        return {field: data[field] for field in fields}
+
+
+class GitLogSearchAPIView(APIView):
+    """
+    APIView to search the warnings and errors of the git import logs, newest first.
+
+    Query params:
+        q: text to search for, every word must match the start of a word of the message
+        course_id: only search the imports of this course
+        since, until: only search imports created in this date range
+        severity: "warning" or "error", the minimum level of the messages
+        page_size: number of results per page
+        cursor: the "next" cursor of the previous page
+    """
+
+    authentication_classes = [JwtAuthentication, SessionAuthentication]
+    permission_classes = [permissions.IsAdminUser]
+
+    DEFAULT_PAGE_SIZE = 20
+    MAX_PAGE_SIZE = 100
+
+    def get(self, request):
+        """
+        Get a page of import log messages matching the search
+        """
+        params = request.GET
+        try:
+            course_id = params.get("course_id")
+            severity = params.get("severity")
+            if severity and severity not in SEVERITY_LEVELS:
+                raise ValueError(_("Unknown severity: {}").format(severity))
+            page_size = min(
+                int(params.get("page_size") or self.DEFAULT_PAGE_SIZE),
+                self.MAX_PAGE_SIZE,
+            )
+            if page_size < 1:
+                raise ValueError(_("page_size must be a positive number"))
+            messages = search_import_log_messages(
+                query=params.get("q"),
+                course_id=CourseKey.from_string(course_id) if course_id else None,
+                since=parse_datetime_param(params["since"])
+                if params.get("since")
+                else None,
+                until=parse_datetime_param(params["until"])
+                if params.get("until")
+                else None,
+                severity=severity or None,
+            )
+            page = paginate_by_created(messages, page_size, after=params.get("cursor"))
+        except (InvalidCursor, InvalidKeyError, ValueError) as e:
+            err_msg = str(e)
+            logger.exception(f"{self.__class__.__name__}:: {err_msg}")
+            return Response({"message": err_msg}, status=status.HTTP_400_BAD_REQUEST)
+
+        next_url = None
+        if page.has_next:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), "cursor", page.next_cursor
+            )
+
+        return Response(
+            {
+                "next": next_url,
+                "results": [
+                    {
+                        "log_id": message.course_git_log_id,
+                        "course_id": str(message.course_id),
+                        "created": message.created,
+                        "level": logging.getLevelName(message.level),
+                        "excerpt": make_excerpt(message.message, params.get("q")),
+                    }
+                    for message in page
+                ],
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class GitLogsExportAPIView(APIView):
+    """
+    APIView to stream the git import logs as NDJSON or CSV, oldest first.
+
+    Query params:
+        file_format: "ndjson" (default) or "csv"
+        course_id: only export the imports of this course
+        since, until: only export imports created in this date range
+        status: only export imports with this status, e.g "failed"
+        include_import_log: "true" to also export the full import logs
+    """
+
+    authentication_classes = [JwtAuthentication, SessionAuthentication]
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        """
+        Stream the git logs matching the filters
+        """
+        params = request.GET
+        try:
+            file_format = params.get("file_format") or EXPORT_FORMATS[0]
+            if file_format not in EXPORT_FORMATS:
+                raise ValueError(_("Unknown file_format: {}").format(file_format))
+            import_status = params.get("status")
+            if import_status and import_status not in dict(CourseGitLog.STATUS_CHOICES):
+                raise ValueError(_("Unknown status: {}").format(import_status))
+            course_id = params.get("course_id")
+            queryset = get_git_logs_for_export(
+                course_id=CourseKey.from_string(course_id) if course_id else None,
+                since=parse_datetime_param(params["since"])
+                if params.get("since")
+                else None,
+                until=parse_datetime_param(params["until"])
+                if params.get("until")
+                else None,
+                status=import_status or None,
+            )
+        except (InvalidKeyError, ValueError) as e:
+            err_msg = str(e)
+            logger.exception(f"{self.__class__.__name__}:: {err_msg}")
+            return Response({"message": err_msg}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            export_git_logs(
+                queryset,
+                file_format,
+                include_import_log=params.get("include_import_log") in ("1", "true"),
+            ),
+            content_type=EXPORT_CONTENT_TYPES[file_format],
+        )
+        response[
+            "Content-Disposition"
+        ] = f'attachment; filename="git_logs.{file_format}"'
+        return response
+
+
+class CourseImportStatusAPIView(APIView):
+    """
+    APIView to list the outcome of the latest git import of every course.
+
+    Query params:
+        status: only list the courses whose latest import has this status
+        sort: one of IMPORT_STATUS_ORDERINGS, e.g "status" (failed imports first,
+            the default) or "last_import" (stalest courses first)
+    """
+
+    authentication_classes = [JwtAuthentication, SessionAuthentication]
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        """
+        Get the latest import of every course
+        """
+        import_status = request.GET.get("status")
+        sort = request.GET.get("sort")
+        try:
+            if import_status and import_status not in dict(CourseGitLog.STATUS_CHOICES):
+                raise ValueError(_("Unknown status: {}").format(import_status))
+            if sort and sort not in IMPORT_STATUS_ORDERINGS:
+                raise ValueError(_("Unknown sort: {}").format(sort))
+        except ValueError as e:
+            err_msg = str(e)
+            logger.exception(f"{self.__class__.__name__}:: {err_msg}")
+            return Response({"message": err_msg}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(
+            {
+                "results": [
+                    {
+                        "course_id": str(course_import_status.course_id),
+                        "repo_dir": course_import_status.repo_dir,
+                        "commit": course_import_status.commit,
+                        "status": course_import_status.status,
+                        "error_count": course_import_status.error_count,
+                        "first_error": course_import_status.first_error,
+                        "duration": course_import_status.duration,
+                        "last_import": course_import_status.last_import,
+                        "log_id": course_import_status.course_git_log_id,
+                    }
+                    for course_import_status in get_course_import_statuses(
+                        status=import_status or None, sort=sort or None
+                    )
+                ],
+            },
+            status=status.HTTP_200_OK,
+        )
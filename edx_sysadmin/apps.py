@@ -25,3 +25,10 @@ class EdxSysAdminConfig(AppConfig):
             }
         },
     }
+
+    def ready(self):
+        """
+        Connect the signal handlers
+        """
+        # pylint: disable=import-outside-toplevel,unused-import
+        from edx_sysadmin import signals
@@ -4,32 +4,120 @@ instance when using a mongo modulestore
 """
 # pylint: disable=wrong-import-order
 
+import inspect
 import logging
 import os
 import re
+import shutil
+import signal
 import subprocess
-from io import StringIO
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
 
 from celery import shared_task
 from cms.djangoapps.contentstore.outlines import update_outline_from_modulestore
 from django.conf import settings
 from django.core import management
+from django.core.cache import cache
 from django.core.management.base import CommandError
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
+from lxml import etree
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
 from opaque_keys.edx.locator import CourseLocator
-from xmodule.modulestore.django import SignalHandler
+from openedx.core.djangoapps.django_comment_common.utils import (
+    are_permissions_roles_seeded,
+    seed_permissions_roles,
+)
+from xmodule.contentstore.django import contentstore
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.django import SignalHandler, modulestore
+from xmodule.modulestore.exceptions import DuplicateCourseError
+from xmodule.modulestore.xml_importer import import_course_from_xml
 from xmodule.util.sandboxing import DEFAULT_PYTHON_LIB_FILENAME
 
+from edx_sysadmin.import_log import (
+    ImportLogHandler,
+    capture_import_log,
+    index_import_log_messages,
+)
+from edx_sysadmin.import_process import (
+    ERROR_IMPORT_FAILED,
+    ERROR_MEMORY_LIMIT,
+    ERROR_PROCESS_DIED,
+    ERROR_PROCESS_TIMEOUT,
+    IMPORT_PROCESS_GRACE_PERIOD,
+    run_import_in_process,
+)
 from edx_sysadmin.models import CourseGitLog
+from edx_sysadmin.utils.limits import limit_command
 from edx_sysadmin.utils.utils import (
     DEFAULT_GIT_REPO_PREFIX,
+    get_retention_setting,
     remove_old_course_import_logs,
+    update_course_import_status,
 )
 
 log = logging.getLogger(__name__)
+# Messages about the course import itself, captured into the import log
+course_import_log = logging.getLogger("git_add_course")
 
 DEFAULT_GIT_REPO_DIR = "/edx/var/app/edxapp/git_course_repos"
+# Upper bound (in seconds) on how long a repo is reported as being imported, in case
+# the worker running the import dies without clearing the marker.
+DEFAULT_GIT_IMPORT_RUNNING_TIMEOUT = 60 * 60
+IMPORT_RUNNING_CACHE_KEY = "edx_sysadmin.git_import.running.{0}"
+MAINTENANCE_RUNNING_CACHE_KEY = "edx_sysadmin.git_import.maintenance.{0}"
+# Seconds between the checks of an import waiting for the git maintenance of its repo
+MAINTENANCE_WAIT_INTERVAL = 1
+
+# Full sha1 commit ids, as printed by git log --format=%H
+COMMIT_ID_RE = re.compile(r"[0-9a-f]{40}")
+
+# Loggers of the course import whose output is captured into the import log
+IMPORT_LOGGER_NAMES = [
+    "xmodule.modulestore.xml_importer",
+    "git_add_course",
+    "xmodule.modulestore.xml",
+    "xmodule.seq_module",
+]
+
+# Levels the import loggers can be captured at, lower levels cost more CPU on
+# large courses as every block logs its loading
+IMPORT_LOG_LEVELS = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+}
+DEFAULT_GIT_IMPORT_LOG_LEVEL = "DEBUG"
+# Nobody watches the imports triggered by webhooks, their errors and warnings
+# are enough
+DEFAULT_WEBHOOK_IMPORT_LOG_LEVEL = "WARNING"
+
+# Limits of the git commands and of the course import, in seconds and bytes.
+# None disables a limit.
+DEFAULT_GIT_COMMAND_TIMEOUT = 10 * 60
+DEFAULT_GIT_IMPORT_TIMEOUT = 60 * 60
+
+# Stages of an import, reported to the progress callback of import_repo
+STAGE_FETCHING = "fetching"
+STAGE_SWITCHING_BRANCH = "switching_branch"
+STAGE_IMPORTING = "importing"
+STAGE_PUBLISHING = "publishing"
+STAGE_SAVING_LOG = "saving_log"
+# An import can be cancelled until its course import starts, the modulestore
+# is never left with a partial import
+CANCELLABLE_STAGES = (STAGE_FETCHING, STAGE_SWITCHING_BRANCH, STAGE_IMPORTING)
+# Seconds between two checks for cancellation while a git command runs
+CANCEL_CHECK_INTERVAL = 1.0
+
+# Cancellation check of the import running in the current thread or task, see
+# import_repo
+_import_cancel_check = ContextVar("import_cancel_check", default=None)
 
 
 # pylint: disable=raise-missing-from
@@ -126,19 +214,317 @@ class GitImportErrorCannotBranch(GitImportError):
     MESSAGE = _("Unable to switch to specified branch. Please check your branch name.")
 
 
-def cmd_log(cmd, cwd):
+class GitImportErrorLimitExceeded(GitImportError):
+    """
+    GitImportError when the import went over one of its time or resource limits.
+    """
+
+    MESSAGE = _("The import exceeded its time or resource limits.")
+
+
+class GitImportErrorGitTimeout(GitImportErrorLimitExceeded):
+    """
+    GitImportError when a git command ran longer than GIT_COMMAND_TIMEOUT.
+    """
+
+    MESSAGE = _("A git command timed out, check that the repo is reachable.")
+
+
+class GitImportErrorGitResourceLimit(GitImportErrorLimitExceeded):
+    """
+    GitImportError when a git command went over its CPU or memory limit.
+    """
+
+    MESSAGE = _("A git command exceeded its CPU or memory limit.")
+
+
+class GitImportErrorImportTimeout(GitImportErrorLimitExceeded):
+    """
+    GitImportError when the course import ran longer than GIT_IMPORT_TIMEOUT.
+    """
+
+    MESSAGE = _("The course import timed out.")
+
+
+class GitImportErrorImportCpuLimit(GitImportErrorLimitExceeded):
+    """
+    GitImportError when the course import used more CPU time than
+    GIT_IMPORT_CPU_LIMIT.
+    """
+
+    MESSAGE = _("The course import exceeded its CPU time limit.")
+
+
+class GitImportErrorCancelled(GitImportError):
+    """
+    GitImportError when the import was cancelled before it imported the course.
+    """
+
+    MESSAGE = _("The import was cancelled.")
+
+
+class GitImportErrorImportMemoryLimit(GitImportErrorLimitExceeded):
+    """
+    GitImportError when the course import ran out of the GIT_IMPORT_MEMORY_LIMIT
+    of its process.
+    """
+
+    MESSAGE = _("The course import exceeded its memory limit.")
+
+
+class ImportLimitReached(BaseException):
+    """
+    Raised from the signal handlers of import_limits. Not an Exception, so that
+    the importer can't swallow it while handling the errors of a single block.
+    """
+
+    def __init__(self, error_class):
+        super().__init__()
+        self.error_class = error_class
+
+
+CourseImportResult = namedtuple("CourseImportResult", ["course_keys", "duration"])
+# The importer argument was renamed along with the other modules to blocks,
+# use whichever the platform has
+IMPORTER_LOAD_ERROR_ARG = (
+    "load_error_blocks"
+    if "load_error_blocks" in inspect.signature(import_course_from_xml).parameters
+    else "load_error_modules"
+)
+# Errors the importer raises on broken course XML rather than on a bug
+XML_IMPORT_ERRORS = (
+    etree.LxmlError,
+    OSError,
+    InvalidKeyError,
+    DuplicateCourseError,
+)
+
+# Returncodes of an import process which most likely died allocating past its
+# memory limit, outside of the interpreter raising MemoryError
+MEMORY_LIMIT_SIGNAL_RETURNCODES = (-signal.SIGKILL, -signal.SIGSEGV, -signal.SIGABRT)
+# Errors import_course can fail with in the import process, by name
+ISOLATED_IMPORT_ERRORS = {
+    error_class.__name__: error_class
+    for error_class in (
+        GitImportErrorXmlImportFailed,
+        GitImportErrorUnsupportedStore,
+        GitImportErrorImportTimeout,
+        GitImportErrorImportCpuLimit,
+    )
+}
+
+
+def get_git_env():
+    """
+    Environment of the git commands, which must fail rather than wait for
+    credentials on a terminal nobody is watching
+    """
+    return dict(os.environ, GIT_TERMINAL_PROMPT="0")
+
+
+def limit_git_resources(cmd):
+    """
+    Applies the GIT_COMMAND_CPU_LIMIT and GIT_COMMAND_MEMORY_LIMIT settings to a
+    git command, see limit_command
+    """
+    return limit_command(
+        cmd,
+        cpu_limit=getattr(settings, "GIT_COMMAND_CPU_LIMIT", None),
+        memory_limit=getattr(settings, "GIT_COMMAND_MEMORY_LIMIT", None),
+    )
+
+
+def kill_process_group(process):
+    """Kills a command started in its own session along with its children"""
+    os.killpg(process.pid, signal.SIGKILL)
+    process.communicate()
+
+
+def cmd_log(cmd, cwd, timeout=None):
     """
     Helper function to redirect stderr to stdout and log the command
     used along with the output. Will raise subprocess.CalledProcessError if
     command doesn't return 0, and returns the command's output.
+    Raises GitImportErrorGitTimeout if the command runs longer than timeout
+    seconds, defaulting to GIT_COMMAND_TIMEOUT,
+    GitImportErrorGitResourceLimit if it went over its CPU or memory limit and
+    GitImportErrorCancelled if the import running it was cancelled.
     """
-    output = subprocess.check_output(cmd, cwd=cwd, stderr=subprocess.STDOUT).decode(
-        "utf-8"
+    if timeout is None:
+        timeout = getattr(settings, "GIT_COMMAND_TIMEOUT", DEFAULT_GIT_COMMAND_TIMEOUT)
+    resource_limits = getattr(settings, "GIT_COMMAND_CPU_LIMIT", None) or getattr(
+        settings, "GIT_COMMAND_MEMORY_LIMIT", None
     )
 
+    deadline = time.monotonic() + timeout if timeout else None
+    cancel_check = _import_cancel_check.get()
+
+    # In its own session, so that the helpers git spawns are killed along with it
+    with subprocess.Popen(
+        limit_git_resources(cmd),
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        env=get_git_env(),
+        start_new_session=True,
+    ) as process:
+        while True:
+            wait = None if deadline is None else max(0, deadline - time.monotonic())
+            if cancel_check is not None:
+                wait = (
+                    CANCEL_CHECK_INTERVAL
+                    if wait is None
+                    else min(wait, CANCEL_CHECK_INTERVAL)
+                )
+            try:
+                output, _unused = process.communicate(timeout=wait)
+                break
+            except subprocess.TimeoutExpired:
+                if deadline is not None and time.monotonic() >= deadline:
+                    kill_process_group(process)
+                    log.error(
+                        "Command %s timed out after %ss. Working directory was: %s",
+                        " ".join(cmd),
+                        timeout,
+                        cwd,
+                    )
+                    raise GitImportErrorGitTimeout()
+                if cancel_check():
+                    kill_process_group(process)
+                    log.info(
+                        "Command %s killed, the import was cancelled", " ".join(cmd)
+                    )
+                    raise GitImportErrorCancelled()
+
     log.debug("Command was: %s. Working directory was: %s", " ".join(cmd), cwd)
     log.debug("Command output was: %r", output)
-    return output
+    if process.returncode:
+        if resource_limits and (
+            process.returncode in (-signal.SIGXCPU, -signal.SIGKILL)
+            or b"out of memory" in output.lower()
+        ):
+            log.error("Command %s exceeded its resource limits", " ".join(cmd))
+            raise GitImportErrorGitResourceLimit()
+        raise subprocess.CalledProcessError(process.returncode, cmd, output=output)
+    return output.decode("utf-8")
+
+
+@contextmanager
+def import_limits(timeout=None, cpu_limit=None):
+    """
+    Bounds the wall clock time and the CPU time of the course import run in the
+    block, raising a GitImportErrorLimitExceeded when one runs out.
+    The limits rely on signals, so they are only enforced in the main thread,
+    which is where the tasks of the Celery prefork pool run.
+    :param timeout: seconds, defaults to GIT_IMPORT_TIMEOUT
+    :param cpu_limit: seconds of CPU time, defaults to GIT_IMPORT_CPU_LIMIT
+    """
+    if timeout is None:
+        timeout = getattr(settings, "GIT_IMPORT_TIMEOUT", DEFAULT_GIT_IMPORT_TIMEOUT)
+    if cpu_limit is None:
+        cpu_limit = getattr(settings, "GIT_IMPORT_CPU_LIMIT", None)
+    if not (timeout or cpu_limit):
+        yield
+        return
+    if threading.current_thread() is not threading.main_thread():
+        log.warning("Import limits can only be enforced in the main thread")
+        yield
+        return
+
+    def on_timeout(signum, frame):  # pylint: disable=unused-argument
+        raise ImportLimitReached(GitImportErrorImportTimeout)
+
+    def on_cpu_limit(signum, frame):  # pylint: disable=unused-argument
+        raise ImportLimitReached(GitImportErrorImportCpuLimit)
+
+    previous_handlers = {
+        signal.SIGALRM: signal.signal(signal.SIGALRM, on_timeout),
+        signal.SIGPROF: signal.signal(signal.SIGPROF, on_cpu_limit),
+    }
+    if timeout:
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    if cpu_limit:
+        # The CPU time of the whole process, which only runs this import
+        signal.setitimer(signal.ITIMER_PROF, cpu_limit)
+    try:
+        yield
+    except ImportLimitReached as ex:
+        log.error("The course import exceeded its limits: %s", ex.error_class.MESSAGE)
+        raise ex.error_class()
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+
+
+@contextmanager
+def mark_import_running(rdir):
+    """
+    Flags the repo directory rdir as being imported for the duration of the block,
+    so that maintenance jobs can leave it alone.
+    """
+    key = IMPORT_RUNNING_CACHE_KEY.format(rdir)
+    timeout = getattr(
+        settings, "GIT_IMPORT_RUNNING_TIMEOUT", DEFAULT_GIT_IMPORT_RUNNING_TIMEOUT
+    )
+    # A count of the running imports, so that overlapping imports of the same
+    # repo don't clear the flag of each other
+    cache.add(key, 0, timeout)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Expired in between
+        cache.set(key, 1, timeout)
+    try:
+        yield
+    finally:
+        try:
+            cache.decr(key)
+        except ValueError:
+            pass
+
+
+def is_import_running(rdir):
+    """
+    Checks if an import is currently running for the repo directory rdir
+    """
+    return (cache.get(IMPORT_RUNNING_CACHE_KEY.format(rdir)) or 0) > 0
+
+
+@contextmanager
+def mark_maintenance_running(rdir):
+    """
+    Flags the repo directory rdir as under git maintenance for the duration of
+    the block, so that imports of the repo wait for it to end.
+    The block gets False when an import or another maintenance of the repo is
+    running, in which case it must leave the repo alone.
+    """
+    key = MAINTENANCE_RUNNING_CACHE_KEY.format(rdir)
+    timeout = getattr(
+        settings, "GIT_IMPORT_RUNNING_TIMEOUT", DEFAULT_GIT_IMPORT_RUNNING_TIMEOUT
+    )
+    if not cache.add(key, True, timeout):
+        yield False
+        return
+    try:
+        # Imports flag their repo before waiting for its maintenance, so that
+        # one of them always sees the other
+        yield not is_import_running(rdir)
+    finally:
+        cache.delete(key)
+
+
+def wait_for_maintenance(rdir):
+    """
+    Waits for the git maintenance of the repo directory rdir to end, if any
+    """
+    key = MAINTENANCE_RUNNING_CACHE_KEY.format(rdir)
+    if cache.get(key):
+        log.info("Waiting for the git maintenance of %s to end", rdir)
+    while cache.get(key):
+        check_import_cancelled()
+        time.sleep(MAINTENANCE_WAIT_INTERVAL)
 
 
 def switch_branch(branch, rdir):
@@ -225,39 +611,322 @@ def switch_branch(branch, rdir):
         raise GitImportErrorCannotBranch()
 
 
+def save_course_git_log(
+    course_key,
+    rdir,
+    git_log,
+    commit_id,
+    import_log_handler,
+    duration,
+    import_error=None,
+):  # pylint: disable=too-many-arguments
+    """
+    Saves the CourseGitLog of an import along with the summary of its captured
+    log, indexes its warnings and errors for search and records it as the latest
+    import of its course.
+    An import is successful when it raised nothing and imported a course.
+    """
+    commit_id = (commit_id or "").strip()
+    if not COMMIT_ID_RE.fullmatch(commit_id):
+        if commit_id:
+            log.warning("Not storing the unexpected commit id %r", commit_id)
+        commit_id = None
+
+    summary = import_log_handler.get_summary()
+    if import_error is not None and summary["first_error"] is None:
+        summary["first_error"] = str(import_error)
+    if import_error is None and course_key is not None:
+        status = CourseGitLog.STATUS_SUCCEEDED
+    elif isinstance(import_error, GitImportErrorLimitExceeded):
+        status = CourseGitLog.STATUS_LIMIT_EXCEEDED
+    else:
+        status = CourseGitLog.STATUS_FAILED
+
+    cgl = CourseGitLog.objects.create(
+        course_id=course_key,
+        repo_dir=rdir,
+        created=timezone.now(),
+        import_log=import_log_handler.getvalue(),
+        git_log=git_log,
+        commit=commit_id,
+        status=status,
+        duration=duration,
+        **summary,
+    )
+
+    log.debug(f"saved CourseGitLog for {cgl.course_id}")
+
+    index_import_log_messages(cgl, import_log_handler.messages)
+    update_course_import_status(cgl)
+
+    # Only the course of the import, the prune_git_logs task covers the others
+    # and the maximum age
+    threshold = get_retention_setting("SYSADMIN_MAX_GIT_LOGS_THRESHOLD")
+    if course_key is not None and threshold is not None:
+        removed_logs_count = remove_old_course_import_logs(course_key, threshold)
+        if removed_logs_count:
+            log.debug(
+                "removed %d old CourseGitLog for %s", removed_logs_count, course_key
+            )
+    return cgl
+
+
 @shared_task()
-def add_repo(repo, rdir_in=None, branch=None):
+def add_repo(repo, rdir_in=None, branch=None, log_level=None):
     """
     This will add a git repo into the mongo modulestore.
     If branch is left as None, it will fetch the most recent
     version of the current branch.
+    log_level is one of IMPORT_LOG_LEVELS, defaulting to GIT_IMPORT_LOG_LEVEL.
     """
-    # pylint: disable=too-many-statements
+    import_repo(repo, rdir_in, branch, log_level=log_level)
 
-    git_repo_dir = getattr(settings, "GIT_REPO_DIR", DEFAULT_GIT_REPO_DIR)
-    git_import_static = getattr(settings, "GIT_IMPORT_STATIC", True)
-    git_import_python_lib = getattr(settings, "GIT_IMPORT_PYTHON_LIB", True)
-    python_lib_filename = getattr(
-        settings, "PYTHON_LIB_FILENAME", DEFAULT_PYTHON_LIB_FILENAME
+
+def get_import_log_level(log_level=None):
+    """
+    Returns the logging level the import log is captured at
+    :param log_level: one of IMPORT_LOG_LEVELS, by name or value, defaults to
+        the GIT_IMPORT_LOG_LEVEL setting
+    """
+    if log_level is None:
+        log_level = getattr(
+            settings, "GIT_IMPORT_LOG_LEVEL", DEFAULT_GIT_IMPORT_LOG_LEVEL
+        )
+    if isinstance(log_level, int) and log_level in IMPORT_LOG_LEVELS.values():
+        return log_level
+    if isinstance(log_level, str) and log_level.upper() in IMPORT_LOG_LEVELS:
+        return IMPORT_LOG_LEVELS[log_level.upper()]
+    raise ValueError(
+        f"Unknown import log level {log_level}, expected one of "
+        f"{', '.join(IMPORT_LOG_LEVELS)}"
     )
 
-    if not os.path.isdir(git_repo_dir):
-        raise GitImportErrorNoDir(git_repo_dir)
-    # pull from git
-    if not (
-        repo.endswith(".git") or repo.startswith(("http:", "https:", "git:", "file:"))
-    ):
-        raise GitImportErrorUrlBad()
 
+def get_webhook_import_log_level():
+    """
+    Returns the name of the level the imports triggered by webhooks capture
+    their import log at
+    """
+    return getattr(
+        settings, "SYSADMIN_WEBHOOK_IMPORT_LOG_LEVEL", DEFAULT_WEBHOOK_IMPORT_LOG_LEVEL
+    )
+
+
+def get_import_logger_names(logger_names=None):
+    """
+    Returns the names of the loggers captured into the import log
+    :param logger_names: names of the loggers, defaults to the GIT_IMPORT_LOGGERS
+        setting or else IMPORT_LOGGER_NAMES
+    """
+    if logger_names is None:
+        logger_names = getattr(settings, "GIT_IMPORT_LOGGERS", None)
+    if logger_names is None:
+        logger_names = IMPORT_LOGGER_NAMES
+    return list(logger_names)
+
+
+def get_course_key_from_xml(rdirp):
+    """
+    Reads the course key from the course.xml of a checked out repo, for
+    imports whose log was captured above the level of the line naming the course
+    and for the bulk operation of the import
+    :param rdirp: path of the repo
+    :return CourseLocator: the course key, None if course.xml isn't usable
+    """
+    try:
+        course = etree.parse(os.path.join(rdirp, "course.xml")).getroot()
+    except (OSError, etree.XMLSyntaxError) as ex:
+        log.warning("Unable to read course.xml of %s: %s", rdirp, ex)
+        return None
+    org, course_code, run = (
+        course.get("org"),
+        course.get("course"),
+        course.get("url_name"),
+    )
+    if not (org and course_code and run):
+        return None
+    return CourseLocator(org, course_code, run)
+
+
+def get_repo_dir(repo, rdir_in=None):
+    """
+    Returns the name of the directory in GIT_REPO_DIR a repo is imported into
+    """
     if rdir_in:
-        rdir = os.path.basename(rdir_in)
-    else:
-        rdir = repo.rsplit("/", 1)[-1].rsplit(".git", 1)[0]
-    log.debug("rdir = %s", rdir)
+        return os.path.basename(rdir_in)
+    return repo.rsplit("/", 1)[-1].rsplit(".git", 1)[0]
+
+
+def import_course(git_repo_dir, rdir):
+    """
+    Imports the course of a checked out repo into the modulestore, bounded by
+    import_limits. Raises GitImportErrorXmlImportFailed or
+    GitImportErrorUnsupportedStore if the import fails.
+    :param git_repo_dir: GIT_REPO_DIR
+    :param rdir: name of the repo directory
+    :return CourseImportResult: the imported courses, None if imported with the
+        import command because of the GIT_IMPORT_USE_COMMAND setting
+    """
+    try:
+        with import_limits():
+            if getattr(settings, "GIT_IMPORT_USE_COMMAND", False):
+                management.call_command(
+                    "import",
+                    git_repo_dir,
+                    rdir,
+                    nostatic=not getattr(settings, "GIT_IMPORT_STATIC", True),
+                    nopythonlib=not getattr(settings, "GIT_IMPORT_PYTHON_LIB", True),
+                    python_lib_filename=getattr(
+                        settings, "PYTHON_LIB_FILENAME", DEFAULT_PYTHON_LIB_FILENAME
+                    ),
+                )
+                return None
+            return import_course_xml(git_repo_dir, rdir)
+    except CommandError:
+        raise GitImportErrorXmlImportFailed()
+    except NotImplementedError:
+        raise GitImportErrorUnsupportedStore()
 
+
+def import_course_xml(git_repo_dir, rdir):
+    """
+    Imports the course of a checked out repo with the XML importer of the
+    modulestore, the way the import command does, in the modulestore
+    connection of the worker
+    :param git_repo_dir: GIT_REPO_DIR
+    :param rdir: name of the repo directory
+    :return CourseImportResult: the imported courses
+    """
+    start = time.monotonic()
+    store = modulestore()
+    import_static = getattr(settings, "GIT_IMPORT_STATIC", True)
+    course_key = get_course_key_from_xml(os.path.join(str(git_repo_dir), rdir))
+    # The importer runs several bulk operations on the course, nested in this
+    # one the course is written once
+    with store.bulk_operations(course_key) if course_key else nullcontext():
+        try:
+            courses = import_course_from_xml(
+                store,
+                ModuleStoreEnum.UserID.mgmt_command,
+                str(git_repo_dir),
+                [rdir],
+                **{IMPORTER_LOAD_ERROR_ARG: False},
+                static_content_store=contentstore(),
+                verbose=True,
+                do_import_static=import_static,
+                # Like the import command, the python lib comes with the
+                # static content
+                do_import_python_lib=import_static
+                or getattr(settings, "GIT_IMPORT_PYTHON_LIB", True),
+                create_if_not_present=True,
+                python_lib_filename=getattr(
+                    settings, "PYTHON_LIB_FILENAME", DEFAULT_PYTHON_LIB_FILENAME
+                ),
+            )
+        except XML_IMPORT_ERRORS:
+            course_import_log.exception("The course import failed")
+            raise GitImportErrorXmlImportFailed()
+
+    # Split keys carry a branch, the keys of the logs don't
+    course_keys = [
+        CourseLocator(course.id.org, course.id.course, course.id.run)
+        for course in courses
+    ]
+    for imported_key in course_keys:
+        if not are_permissions_roles_seeded(imported_key):
+            course_import_log.info("Seeding forum roles for course %s", imported_key)
+            seed_permissions_roles(imported_key)
+    result = CourseImportResult(course_keys, round(time.monotonic() - start, 3))
+    course_import_log.info(
+        "Imported %s in %s seconds",
+        ", ".join(str(imported_key) for imported_key in course_keys),
+        result.duration,
+    )
+    return result
+
+
+def import_course_in_process(git_repo_dir, rdir, log_level, logger_names):
+    """
+    Runs import_course in the import process of the worker, see
+    edx_sysadmin.import_process. The records it logs are replayed into the
+    loggers of the worker, so they are captured as usual.
+    :return CourseImportResult: see import_course
+    """
+    timeout = getattr(settings, "GIT_IMPORT_TIMEOUT", DEFAULT_GIT_IMPORT_TIMEOUT)
+    result = run_import_in_process(
+        {
+            "git_repo_dir": str(git_repo_dir),
+            "rdir": rdir,
+            "log_level": log_level,
+            "logger_names": logger_names,
+        },
+        timeout=timeout + IMPORT_PROCESS_GRACE_PERIOD if timeout else None,
+    )
+    error = result["error"]
+    if error is None:
+        if "course_keys" not in result:
+            return None
+        return CourseImportResult(
+            [CourseKey.from_string(course_key) for course_key in result["course_keys"]],
+            result["duration"],
+        )
+    if error == ERROR_MEMORY_LIMIT:
+        raise GitImportErrorImportMemoryLimit()
+    if error == ERROR_PROCESS_TIMEOUT:
+        raise GitImportErrorImportTimeout()
+    if error == ERROR_IMPORT_FAILED:
+        raise GitImportErrorXmlImportFailed()
+    if error == ERROR_PROCESS_DIED:
+        if (
+            getattr(settings, "GIT_IMPORT_MEMORY_LIMIT", None)
+            and result.get("returncode") in MEMORY_LIMIT_SIGNAL_RETURNCODES
+        ):
+            # Most likely killed while allocating past its limit
+            raise GitImportErrorImportMemoryLimit()
+        raise GitImportErrorXmlImportFailed()
+    raise ISOLATED_IMPORT_ERRORS.get(error, GitImportErrorXmlImportFailed)()
+
+
+def check_import_cancelled():
+    """
+    Raises GitImportErrorCancelled if the import running in the current thread
+    or task was cancelled
+    """
+    cancel_check = _import_cancel_check.get()
+    if cancel_check is not None and cancel_check():
+        raise GitImportErrorCancelled()
+
+
+def clean_killed_fetch(rdirp, cloned):
+    """
+    Brings a repo whose git commands were killed back to a usable state: a
+    partial clone is removed, an interrupted pull is reset to its HEAD
+    :param rdirp: path of the repo
+    :param cloned: whether the repo was being cloned
+    """
+    if cloned:
+        shutil.rmtree(rdirp, ignore_errors=True)
+        return
+    index_lock = os.path.join(rdirp, ".git", "index.lock")
+    if os.path.exists(index_lock):
+        os.remove(index_lock)
+    token = _import_cancel_check.set(None)
+    try:
+        cmd_log(["git", "reset", "--hard", "--quiet"], rdirp)
+    except (subprocess.CalledProcessError, GitImportError):
+        log.exception("Unable to reset %s after killing its git commands", rdirp)
+    finally:
+        _import_cancel_check.reset(token)
+
+
+def fetch_repo(repo, git_repo_dir, rdir, branch=None, progress=None):
+    """
+    Clones or pulls a repo into GIT_REPO_DIR and checks out its branch
+    :return tuple: git log of the commands and id of the checked out commit
+    """
     rdirp = "{0}/{1}".format(git_repo_dir, rdir)
     if os.path.exists(rdirp):
-        log.info("directory already exists, doing a git pull instead " "of git clone")
+        log.info("directory already exists, doing a git pull instead of git clone")
         cmd = [
             "git",
             "pull",
@@ -279,6 +948,8 @@ def add_repo(repo, rdir_in=None, branch=None):
         raise GitImportErrorCannotPull()
 
     if branch:
+        if progress is not None:
+            progress(STAGE_SWITCHING_BRANCH)
         switch_branch(branch, rdirp)
 
     # get commit id
@@ -312,53 +983,121 @@ def add_repo(repo, rdir_in=None, branch=None):
         raise GitImportErrorBadRepo()
 
     ret_git += "{0}Branch: {1}".format("   \n", branch)
+    return ret_git, commit_id
+
+
+def import_repo(
+    repo,
+    rdir_in=None,
+    branch=None,
+    progress=None,
+    log_level=None,
+    logger_names=None,
+    cancel_check=None,
+):  # pylint: disable=too-many-arguments
+    """
+    Imports a git repo into the modulestore, see add_repo.
+    progress is called with every STAGE_* the import goes through.
+    log_level and logger_names set what is captured into the import log, see
+    get_import_log_level and get_import_logger_names.
+    cancel_check is called before every CANCELLABLE_STAGES and while the git
+    commands run, the import stops with GitImportErrorCancelled once it returns
+    True. The course import itself always runs to its end.
+    Returns the CourseGitLog of the import.
+    """
+    token = _import_cancel_check.set(cancel_check)
+    try:
+        rdir = get_repo_dir(repo, rdir_in)
+        with mark_import_running(rdir):
+            wait_for_maintenance(rdir)
+            return _import_repo(
+                repo, rdir_in, branch, progress, log_level, logger_names
+            )
+    finally:
+        _import_cancel_check.reset(token)
 
-    # Get XML logging logger and capture debug to parse results
-    output = StringIO()
-    import_log_handler = logging.StreamHandler(output)
-    import_log_handler.setLevel(logging.DEBUG)
 
-    logger_names = [
-        "xmodule.modulestore.xml_importer",
-        "git_add_course",
-        "xmodule.modulestore.xml",
-        "xmodule.seq_module",
-    ]
-    loggers = []
+def _import_repo(repo, rdir_in, branch, progress, log_level, logger_names):
+    """Imports a git repo into the modulestore, see import_repo"""
+    # pylint: disable=too-many-statements
+
+    def report(stage):
+        if stage in CANCELLABLE_STAGES:
+            check_import_cancelled()
+        if progress is not None:
+            progress(stage)
+
+    git_repo_dir = getattr(settings, "GIT_REPO_DIR", DEFAULT_GIT_REPO_DIR)
+    log_level = get_import_log_level(log_level)
+    logger_names = get_import_logger_names(logger_names)
+
+    if not os.path.isdir(git_repo_dir):
+        raise GitImportErrorNoDir(git_repo_dir)
+    # pull from git
+    if not (
+        repo.endswith(".git") or repo.startswith(("http:", "https:", "git:", "file:"))
+    ):
+        raise GitImportErrorUrlBad()
 
-    for logger_name in logger_names:
-        logger = logging.getLogger(logger_name)
-        logger.setLevel(logging.DEBUG)
-        logger.addHandler(import_log_handler)
-        loggers.append(logger)
+    rdir = get_repo_dir(repo, rdir_in)
+    log.debug("rdir = %s", rdir)
 
+    start = time.monotonic()
+    report(STAGE_FETCHING)
+    rdirp = "{0}/{1}".format(git_repo_dir, rdir)
+    cloned = not os.path.exists(rdirp)
     try:
-        management.call_command(
-            "import",
-            git_repo_dir,
+        ret_git, commit_id = fetch_repo(repo, git_repo_dir, rdir, branch, report)
+    except GitImportErrorCancelled:
+        clean_killed_fetch(rdirp, cloned)
+        raise
+    except GitImportErrorLimitExceeded as ex:
+        clean_killed_fetch(rdirp, cloned)
+        # Recorded, so that repos which hang or blow up show in the Git Logs
+        ex.course_git_log = save_course_git_log(
+            get_course_key_from_xml(rdirp) if os.path.isdir(rdirp) else None,
             rdir,
-            nostatic=not git_import_static,
-            nopythonlib=not git_import_python_lib,
-            python_lib_filename=python_lib_filename,
+            "",
+            "",
+            ImportLogHandler(),
+            time.monotonic() - start,
+            import_error=ex,
         )
-    except CommandError:
-        raise GitImportErrorXmlImportFailed()
-    except NotImplementedError:
-        raise GitImportErrorUnsupportedStore()
+        raise
+
+    # Get XML logging logger and capture its output to parse results
+    import_log_handler = ImportLogHandler()
+    import_log_handler.setLevel(log_level)
 
-    ret_import = output.getvalue()
+    report(STAGE_IMPORTING)
+    import_error = None
+    import_result = None
+    try:
+        with capture_import_log(import_log_handler, logger_names, log_level):
+            if getattr(settings, "GIT_IMPORT_ISOLATED", False):
+                import_result = import_course_in_process(
+                    git_repo_dir, rdir, log_level, logger_names
+                )
+            else:
+                import_result = import_course(git_repo_dir, rdir)
+    except (
+        GitImportErrorXmlImportFailed,
+        GitImportErrorUnsupportedStore,
+        GitImportErrorLimitExceeded,
+    ) as ex:
+        import_error = ex
 
-    # Remove handler hijacks
-    for logger in loggers:
-        logger.setLevel(logging.NOTSET)
-        logger.removeHandler(import_log_handler)
+    ret_import = import_log_handler.getvalue()
 
     course_key = None
 
-    # extract course ID from output of import-command-run and make symlink
+    # take course ID from the import result, or extract it from output of
+    # import-command-run, and make symlink
     # this is needed in order for custom course scripts to work
     match = re.search(r"(?ms)===> IMPORTING courselike (\S+)", ret_import)
-    if match:
+    if import_result is not None and import_result.course_keys:
+        course_key = import_result.course_keys[0]
+    elif match:
         course_id = match.group(1).split("/")
         # we need to transform course key extracted from logs into CourseLocator instance, because
         # we are using split module store and course keys store as instance of CourseLocator.
@@ -366,6 +1105,24 @@ def add_repo(repo, rdir_in=None, branch=None):
         # We want set course id in CourseGitLog as CourseLocator. So that in split module
         # environment course id remain consistent as CourseLocator instance.
         course_key = CourseLocator(*course_id)
+    elif log_level > logging.DEBUG:
+        course_key = get_course_key_from_xml(rdirp)
+
+    if import_error is not None:
+        report(STAGE_SAVING_LOG)
+        import_error.course_git_log = save_course_git_log(
+            course_key,
+            rdir,
+            ret_git,
+            commit_id,
+            import_log_handler,
+            time.monotonic() - start,
+            import_error=import_error,
+        )
+        raise import_error
+
+    if course_key is not None:
+        report(STAGE_PUBLISHING)
         update_outline_from_modulestore(course_key)
         SignalHandler.course_published.send(
             sender=course_key.course, course_key=course_key
@@ -405,16 +1162,12 @@ def add_repo(repo, rdir_in=None, branch=None):
                 )
             )
 
-    cgl = CourseGitLog.objects.create(
-        course_id=course_key,
-        repo_dir=rdir,
-        created=timezone.now(),
-        course_import_log=ret_import,
-        git_log=ret_git,
+    report(STAGE_SAVING_LOG)
+    return save_course_git_log(
+        course_key,
+        rdir,
+        ret_git,
+        commit_id,
+        import_log_handler,
+        time.monotonic() - start,
     )
-
-    log.debug(f"saved CourseGitLog for {cgl.course_id}")
-
-    removed_logs_count = remove_old_course_import_logs(course_key)
-    if removed_logs_count > 0:
-        log.debug(f"removed {removed_logs_count} old CourseGitLog for {course_key}")
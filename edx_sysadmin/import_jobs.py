@@ -0,0 +1,335 @@
+"""
+Git imports queued from the dashboard, run in the background by Celery workers
+"""
+# pylint: disable=wrong-import-order
+
+import json
+import logging
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from uuid import uuid4
+
+from celery import shared_task
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from edx_sysadmin.git_import import (
+    DEFAULT_GIT_IMPORT_TIMEOUT,
+    IMPORT_LOGGER_NAMES,
+    GitImportError,
+    GitImportErrorCancelled,
+    get_repo_dir,
+    import_repo,
+)
+from edx_sysadmin.import_log import capture_import_log
+from edx_sysadmin.models import CourseGitLog, ImportJob, ImportJobEvent
+
+log = logging.getLogger(__name__)
+
+# Log lines of a running job are written every FLUSH_SIZE lines or FLUSH_INTERVAL
+# seconds, whichever comes first
+IMPORT_JOB_EVENTS_FLUSH_SIZE = 50
+IMPORT_JOB_EVENTS_FLUSH_INTERVAL = 1.0
+# Events are only kept for following imports live, the full log is in CourseGitLog
+IMPORT_JOB_EVENTS_MAX_AGE = timedelta(days=1)
+IMPORT_JOB_EVENTS_BATCH_SIZE = 500
+DEFAULT_IMPORT_EVENTS_STREAM_TIMEOUT = 5
+IMPORT_EVENTS_POLL_INTERVAL = 1.0
+# Queued jobs no worker picked up by then are failed by fail_stale_import_jobs,
+# as are running jobs past the import timeout and this grace period, for the git
+# commands and saving the log
+IMPORT_JOB_QUEUED_MAX_AGE = timedelta(days=1)
+IMPORT_JOB_RUNNING_GRACE_PERIOD = timedelta(hours=1)
+ERROR_NOT_QUEUED = "The import job could not be queued"
+ERROR_NEVER_STARTED = "The import job was never picked up by a worker"
+ERROR_LOST = "The worker running the import job stopped before it finished"
+# The git commands are logged by git_import itself
+IMPORT_JOB_LOGGER_NAMES = IMPORT_LOGGER_NAMES + ["edx_sysadmin.git_import"]
+
+
+class ImportJobEventHandler(logging.Handler):
+    """
+    Logging handler writing the log lines of a running job as ImportJobEvent
+    rows, in batches
+    """
+
+    def __init__(self, job_id):
+        super().__init__(logging.DEBUG)
+        self.job_id = job_id
+        self.events = []
+        self.last_flush = time.monotonic()
+
+    def emit(self, record):
+        try:
+            message = self.format(record)
+        except Exception:  # pylint: disable=broad-except
+            self.handleError(record)
+            return
+        self.events.append(
+            ImportJobEvent(
+                job_id=self.job_id,
+                kind=ImportJobEvent.KIND_LOG,
+                level=record.levelno,
+                message=message,
+            )
+        )
+        if (
+            len(self.events) >= IMPORT_JOB_EVENTS_FLUSH_SIZE
+            or time.monotonic() - self.last_flush >= IMPORT_JOB_EVENTS_FLUSH_INTERVAL
+        ):
+            self.flush()
+
+    def flush(self):
+        """Write the buffered log lines"""
+        events, self.events = self.events, []
+        if events:
+            ImportJobEvent.objects.bulk_create(events)
+        self.last_flush = time.monotonic()
+
+
+@contextmanager
+def capture_import_job_events(job_id):
+    """
+    Records the log lines of the import loggers as events of the job for the
+    duration of the block, only those of the current thread or task. Yields the
+    progress callback of import_repo, which records the stage changes.
+    """
+    handler = ImportJobEventHandler(job_id)
+
+    def progress(stage):
+        # Log lines written so far come before the stage change
+        handler.flush()
+        ImportJob.objects.filter(id=job_id).update(stage=stage)
+        ImportJobEvent.objects.create(
+            job_id=job_id, kind=ImportJobEvent.KIND_STAGE, message=stage
+        )
+
+    # The levels of the loggers are left to the import log capture of import_repo
+    try:
+        with capture_import_log(handler, IMPORT_JOB_LOGGER_NAMES, level=None):
+            yield progress
+    finally:
+        handler.flush()
+
+
+def queue_import_job(repo, branch=None, user=None):
+    """
+    Records an import job and queues it for a worker
+    :param repo: url of the git repository
+    :param branch: branch to import, defaults to the current one of the repo
+    :param user: User who asked for the import
+    :return ImportJob: the queued job
+    """
+    job = ImportJob.objects.create(
+        repo=repo,
+        branch=branch or None,
+        repo_dir=get_repo_dir(repo),
+        user=user,
+        task_id=str(uuid4()),
+    )
+    try:
+        run_import_job.apply_async((job.id,), task_id=job.task_id)
+    except Exception:  # pylint: disable=broad-except
+        # No worker would ever pick it up
+        log.exception("Unable to queue import job %s", job.id)
+        finish_import_job(job.id, ImportJob.STATUS_FAILED, error=ERROR_NOT_QUEUED)
+        job.refresh_from_db()
+    return job
+
+
+def finish_import_job(job_id, status, error=None, course_git_log=None):
+    """
+    Records the outcome of a running job
+    """
+    ImportJob.objects.filter(id=job_id).update(
+        status=status,
+        error=error,
+        course_git_log=course_git_log,
+        finished=timezone.now(),
+    )
+
+
+def cancel_import_job(job_id):
+    """
+    Cancels a job. A queued job is cancelled right away, a running one is
+    stopped by its worker at its next check, unless its course import already
+    started.
+    :return bool: False if the job was already finished
+    """
+    cancelled = ImportJob.objects.filter(
+        id=job_id, status=ImportJob.STATUS_QUEUED
+    ).update(status=ImportJob.STATUS_CANCELLED, finished=timezone.now())
+    if cancelled:
+        log.info("Cancelled queued import job %s", job_id)
+        return True
+    requested = ImportJob.objects.filter(
+        id=job_id, status=ImportJob.STATUS_RUNNING
+    ).update(cancel_requested=True)
+    if requested:
+        log.info("Requested the cancellation of running import job %s", job_id)
+    return bool(requested)
+
+
+def is_import_job_cancelled(job_id):
+    """Checks if the cancellation of a running job was requested"""
+    return ImportJob.objects.filter(id=job_id, cancel_requested=True).exists()
+
+
+@shared_task()
+def run_import_job(job_id):
+    """
+    Runs a queued ImportJob. Jobs which are not queued anymore, e.g because the
+    task was delivered twice, are left alone.
+    """
+    started = ImportJob.objects.filter(
+        id=job_id, status=ImportJob.STATUS_QUEUED
+    ).update(status=ImportJob.STATUS_RUNNING, started=timezone.now())
+    if not started:
+        log.warning("Import job %s is not queued, skipping it", job_id)
+        return
+    # Pruned as jobs run, so that it doesn't depend on scheduling prune_git_logs
+    prune_import_job_events()
+
+    job = ImportJob.objects.get(id=job_id)
+    try:
+        # The events are all written before the job is marked as finished
+        with capture_import_job_events(job_id) as progress:
+            course_git_log = import_repo(
+                job.repo,
+                None,
+                job.branch,
+                progress=progress,
+                cancel_check=lambda: is_import_job_cancelled(job_id),
+            )
+    except GitImportErrorCancelled as ex:
+        finish_import_job(job_id, ImportJob.STATUS_CANCELLED, error=str(ex))
+    except GitImportError as ex:
+        finish_import_job(
+            job_id,
+            ImportJob.STATUS_FAILED,
+            error=str(ex),
+            course_git_log=getattr(ex, "course_git_log", None),
+        )
+    except Exception as ex:  # pylint: disable=broad-except
+        log.exception("Import job %s failed", job_id)
+        finish_import_job(job_id, ImportJob.STATUS_FAILED, error=str(ex))
+        raise
+    else:
+        if course_git_log.status == CourseGitLog.STATUS_SUCCEEDED:
+            finish_import_job(
+                job_id, ImportJob.STATUS_SUCCEEDED, course_git_log=course_git_log
+            )
+        else:
+            finish_import_job(
+                job_id,
+                ImportJob.STATUS_FAILED,
+                error=course_git_log.first_error,
+                course_git_log=course_git_log,
+            )
+
+
+def format_server_sent_event(event, data, event_id=None):
+    """
+    Formats a Server-Sent Event
+    :param event: type of the event
+    :param data: JSON serializable data of the event
+    :param event_id: id sent back by the browser in Last-Event-ID on reconnection
+    """
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, cls=DjangoJSONEncoder)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def stream_import_job_events(job_id, after_id=0, timeout=None):
+    """
+    Streams the events of a job written after after_id as Server-Sent Events.
+    This is a long poll, so that the request doesn't hold on to a worker of
+    the LMS: it polls until some events were sent, the job is finished, where
+    an "end" event is sent, or timeout seconds passed. The browser then
+    reconnects and resumes from the last event it got.
+    :param job_id: id of the ImportJob
+    :param after_id: id of the last event already sent
+    :param timeout: seconds to stream for, defaults to the
+        SYSADMIN_IMPORT_EVENTS_STREAM_TIMEOUT setting
+    :return generator: the events, formatted for a text/event-stream response
+    """
+    if timeout is None:
+        timeout = getattr(
+            settings,
+            "SYSADMIN_IMPORT_EVENTS_STREAM_TIMEOUT",
+            DEFAULT_IMPORT_EVENTS_STREAM_TIMEOUT,
+        )
+    deadline = time.monotonic() + timeout
+    # Milliseconds the browser waits before reconnecting
+    yield f"retry: {int(IMPORT_EVENTS_POLL_INTERVAL * 1000)}\n\n"
+
+    job_finished = False
+    while True:
+        events = list(
+            ImportJobEvent.objects.filter(job_id=job_id, id__gt=after_id).order_by(
+                "id"
+            )[:IMPORT_JOB_EVENTS_BATCH_SIZE]
+        )
+        for event in events:
+            after_id = event.id
+            yield format_server_sent_event(
+                event.kind,
+                {"level": event.level, "message": event.message},
+                event_id=event.id,
+            )
+        if len(events) == IMPORT_JOB_EVENTS_BATCH_SIZE:
+            continue
+        if job_finished:
+            job = ImportJob.objects.get(id=job_id)
+            yield format_server_sent_event(
+                "end", {"status": job.status, "error": job.error}
+            )
+            return
+        job_finished = ImportJob.objects.filter(
+            id=job_id, status__in=ImportJob.FINISHED_STATUSES
+        ).exists()
+        if job_finished:
+            # Read the events once more, they may have been written since the
+            # query above
+            continue
+        if events or time.monotonic() >= deadline:
+            return
+        time.sleep(IMPORT_EVENTS_POLL_INTERVAL)
+
+
+def fail_stale_import_jobs(now=None):
+    """
+    Fails the jobs left queued or running by a broker or a worker which went
+    away, e.g. a worker killed during the import
+    :return int: Count of failed jobs
+    """
+    now = now or timezone.now()
+    failed = ImportJob.objects.filter(
+        status=ImportJob.STATUS_QUEUED, created__lt=now - IMPORT_JOB_QUEUED_MAX_AGE
+    ).update(status=ImportJob.STATUS_FAILED, error=ERROR_NEVER_STARTED, finished=now)
+    import_timeout = getattr(settings, "GIT_IMPORT_TIMEOUT", DEFAULT_GIT_IMPORT_TIMEOUT)
+    # Without an import timeout a running job may legitimately run for ever
+    if import_timeout:
+        failed += ImportJob.objects.filter(
+            status=ImportJob.STATUS_RUNNING,
+            started__lt=now
+            - timedelta(seconds=import_timeout)
+            - IMPORT_JOB_RUNNING_GRACE_PERIOD,
+        ).update(status=ImportJob.STATUS_FAILED, error=ERROR_LOST, finished=now)
+    return failed
+
+
+def prune_import_job_events(max_age=IMPORT_JOB_EVENTS_MAX_AGE):
+    """
+    Removes the events of the jobs finished more than max_age ago
+    :return int: Count of deleted events
+    """
+    deletion_count, _ = ImportJobEvent.objects.filter(
+        job__finished__lt=timezone.now() - max_age
+    ).delete()
+    return deletion_count
@@ -0,0 +1,278 @@
+"""
+Capture and indexing of the logs written while importing a course from git
+"""
+# pylint: disable=wrong-import-order
+
+import logging
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from io import StringIO
+
+from edx_sysadmin.models import CourseGitLog, CourseGitLogMessage, CourseGitLogTerm
+
+# Upper bounds on what is indexed for a single import, so that a badly broken
+# course can't flood the search index
+MAX_INDEXED_MESSAGES = 1000
+MAX_TERMS_PER_MESSAGE = 64
+TERM_MAX_LENGTH = 64
+TERM_MIN_LENGTH = 2
+TERM_PATTERN = re.compile(r"\w+")
+
+SEVERITY_LEVELS = {
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+}
+
+
+class ImportLogHandler(logging.StreamHandler):
+    """
+    Logging handler capturing the text of an import log, which also keeps the
+    warning and error records aside so they can be indexed for search
+    """
+
+    def __init__(self):
+        super().__init__(StringIO())
+        self.messages = []
+        self.warning_count = 0
+        self.error_count = 0
+        self.first_error = None
+
+    def emit(self, record):
+        super().emit(record)
+        if record.levelno < logging.WARNING:
+            return
+        try:
+            message = record.getMessage()
+        except Exception:  # pylint: disable=broad-except
+            self.handleError(record)
+            return
+        if record.levelno >= logging.ERROR:
+            self.error_count += 1
+            if self.first_error is None:
+                self.first_error = message
+        else:
+            self.warning_count += 1
+        if len(self.messages) < MAX_INDEXED_MESSAGES:
+            self.messages.append((record.levelno, message))
+
+    def getvalue(self):
+        """The text captured so far"""
+        return self.stream.getvalue()
+
+    def get_summary(self):
+        """
+        The warning and error counts and the first error of the captured log, as
+        stored on CourseGitLog
+        """
+        first_error = self.first_error
+        if first_error is not None:
+            first_error = first_error.strip().split("\n", 1)[0]
+            first_error = first_error[: CourseGitLog.FIRST_ERROR_MAX_LENGTH]
+        return {
+            "warning_count": self.warning_count,
+            "error_count": self.error_count,
+            "first_error": first_error,
+        }
+
+
+# (handler, logger names) capturing the import running in the current thread
+# or task, see capture_import_log
+_import_log_handlers = ContextVar("import_log_handlers", default=())
+# Loggers captured by at least one import: name -> [original level, levels of
+# the imports capturing it]
+_captured_loggers = {}
+_captured_loggers_lock = threading.Lock()
+
+
+class ImportLogDispatcher(logging.Handler):
+    """
+    Handler shared by all the imports of the process, passing every record on to
+    the handlers of the import it was logged by, so that concurrent imports in
+    threads or tasks of the same process only capture their own lines. Every
+    handler only gets the records of the loggers it captures and their children.
+    """
+
+    def emit(self, record):
+        # A record reaching several captured loggers is only captured once
+        if getattr(record, "import_log_dispatched", False):
+            return
+        record.import_log_dispatched = True
+        for handler, logger_names in _import_log_handlers.get():
+            if record.levelno >= handler.level and is_logged_by(record, logger_names):
+                handler.handle(record)
+
+
+def is_logged_by(record, logger_names):
+    """Whether the record was logged by one of the loggers or their children"""
+    return any(
+        record.name == logger_name or record.name.startswith(logger_name + ".")
+        for logger_name in logger_names
+    )
+
+
+_import_log_dispatcher = ImportLogDispatcher()
+
+
+def _capture_loggers(logger_names, level):
+    """Attach the dispatcher to the loggers, lowering them to level if needed"""
+    with _captured_loggers_lock:
+        for logger_name in logger_names:
+            logger = logging.getLogger(logger_name)
+            if logger_name not in _captured_loggers:
+                _captured_loggers[logger_name] = [logger.level, []]
+                logger.addHandler(_import_log_dispatcher)
+            levels = _captured_loggers[logger_name][1]
+            levels.append(level)
+            _set_captured_level(logger, _captured_loggers[logger_name])
+
+
+def _release_loggers(logger_names, level):
+    """
+    Undo _capture_loggers, the loggers get their level back once no import
+    captures them anymore
+    """
+    with _captured_loggers_lock:
+        for logger_name in logger_names:
+            logger = logging.getLogger(logger_name)
+            levels = _captured_loggers[logger_name][1]
+            levels.remove(level)
+            if levels:
+                _set_captured_level(logger, _captured_loggers[logger_name])
+            else:
+                original_level, _ = _captured_loggers.pop(logger_name)
+                logger.removeHandler(_import_log_dispatcher)
+                logger.setLevel(original_level)
+
+
+def _set_captured_level(logger, captured_logger):
+    """Let through the records of the most verbose of the running imports"""
+    original_level, levels = captured_logger
+    levels = [level for level in levels if level is not None]
+    logger.setLevel(min(levels) if levels else original_level)
+
+
+@contextmanager
+def capture_import_log(handler, logger_names, level=logging.DEBUG):
+    """
+    Capture the records of the given loggers into handler for the duration of
+    the block. Only the records logged from the current thread or task are
+    captured, other imports running at the same time capture theirs.
+    :param handler: logging.Handler to capture into
+    :param logger_names: names of the loggers to capture
+    :param level: level the loggers are lowered to while capturing, None leaves
+        them as they are
+    """
+    logger_names = tuple(logger_names)
+    token = _import_log_handlers.set(
+        _import_log_handlers.get() + ((handler, logger_names),)
+    )
+    _capture_loggers(logger_names, level)
+    try:
+        yield handler
+    finally:
+        _release_loggers(logger_names, level)
+        _import_log_handlers.reset(token)
+
+
+def tokenize(text):
+    """
+    Split a message or a search query into lower cased search terms
+    :param text: text to split
+    :return list: unique terms in order of appearance
+    """
+    terms = []
+    for term in TERM_PATTERN.findall(text.lower()):
+        term = term[:TERM_MAX_LENGTH]
+        if len(term) >= TERM_MIN_LENGTH and term not in terms:
+            terms.append(term)
+    return terms
+
+
+def index_import_log_messages(course_git_log, messages):
+    """
+    Store the warnings and errors of an import along with their search terms
+    :param course_git_log: CourseGitLog of the import
+    :param messages: list of (level, message) as collected by ImportLogHandler
+    :return int: number of indexed messages
+    """
+    messages = messages[:MAX_INDEXED_MESSAGES]
+    if not messages:
+        return 0
+
+    CourseGitLogMessage.objects.bulk_create(
+        CourseGitLogMessage(
+            course_git_log=course_git_log,
+            course_id=course_git_log.course_id,
+            created=course_git_log.created,
+            position=position,
+            level=level,
+            message=message,
+        )
+        for position, (level, message) in enumerate(messages)
+    )
+    # bulk_create doesn't return primary keys on every backend, read them back
+    message_ids = dict(
+        CourseGitLogMessage.objects.filter(course_git_log=course_git_log).values_list(
+            "position", "id"
+        )
+    )
+    CourseGitLogTerm.objects.bulk_create(
+        CourseGitLogTerm(message_id=message_ids[position], term=term)
+        for position, (_, message) in enumerate(messages)
+        for term in tokenize(message)[:MAX_TERMS_PER_MESSAGE]
+    )
+    return len(messages)
+
+
+def search_import_log_messages(
+    query=None, course_id=None, since=None, until=None, severity=None
+):
+    """
+    Search the indexed warnings and errors of the import logs. Every term of the
+    query must match the start of a term of the message.
+    :param query: text to search for
+    :param course_id: only search the imports of this course
+    :param since: only search imports created at or after this datetime
+    :param until: only search imports created before this datetime
+    :param severity: one of SEVERITY_LEVELS, the minimum level of the messages
+    :return QuerySet: matching CourseGitLogMessage objects
+    """
+    messages = CourseGitLogMessage.objects.all()
+    if course_id is not None:
+        messages = messages.filter(course_id=course_id)
+    if since is not None:
+        messages = messages.filter(created__gte=since)
+    if until is not None:
+        messages = messages.filter(created__lt=until)
+    if severity is not None:
+        messages = messages.filter(level__gte=SEVERITY_LEVELS[severity])
+    for term in tokenize(query or ""):
+        messages = messages.filter(
+            id__in=CourseGitLogTerm.objects.filter(term__startswith=term).values(
+                "message_id"
+            )
+        )
+    return messages
+
+
+def make_excerpt(message, query=None, width=200):
+    """
+    Cut a message down to width characters around the first term of the query
+    """
+    if len(message) <= width:
+        return message
+    start = 0
+    for term in tokenize(query or ""):
+        position = message.lower().find(term)
+        if position != -1:
+            start = max(0, min(position - width // 4, len(message) - width))
+            break
+    end = start + width
+    excerpt = message[start:end]
+    if start > 0:
+        excerpt = "..." + excerpt
+    if end < len(message):
+        excerpt += "..."
+    return excerpt
@@ -0,0 +1,296 @@
+"""
+Runs the course imports in a child process with its own memory cap, so that the
+memory the importer leaves behind is given back whenever the child is recycled
+instead of piling up in the worker.
+
+The parent sends one JSON request per line on the stdin of the child, which
+answers on its stdout with the records logged by the import, replayed into the
+loggers of the parent, and then the outcome of the import.
+"""
+# pylint: disable=wrong-import-order
+
+import json
+import logging
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+import django
+from django.conf import settings
+
+from edx_sysadmin.utils.limits import limit_command
+
+log = logging.getLogger(__name__)
+
+DEFAULT_GIT_IMPORT_PROCESS_MAX_IMPORTS = 10
+# Seconds a child has on top of the import timeout to report the outcome
+IMPORT_PROCESS_GRACE_PERIOD = 60
+# Seconds a child has to exit once asked to
+IMPORT_PROCESS_STOP_TIMEOUT = 10
+# Outcome of an import whose child died or stopped answering
+ERROR_PROCESS_DIED = "process_died"
+ERROR_PROCESS_TIMEOUT = "process_timeout"
+# Outcome of an import which ran out of memory in the child
+ERROR_MEMORY_LIMIT = "memory_limit"
+# Outcome of an import which failed with an unexpected error in the child
+ERROR_IMPORT_FAILED = "import_failed"
+
+
+def limit_import_process_memory(cmd):
+    """
+    Applies the GIT_IMPORT_MEMORY_LIMIT setting to the command of the child,
+    see limit_command
+    """
+    return limit_command(
+        cmd, memory_limit=getattr(settings, "GIT_IMPORT_MEMORY_LIMIT", None)
+    )
+
+
+class ImportProcess:
+    """
+    A child process running course imports one at a time, replaced after
+    max_imports imports or when it dies
+    """
+
+    def __init__(self, max_imports=None, command=None):
+        if max_imports is None:
+            max_imports = getattr(
+                settings,
+                "GIT_IMPORT_PROCESS_MAX_IMPORTS",
+                DEFAULT_GIT_IMPORT_PROCESS_MAX_IMPORTS,
+            )
+        self.max_imports = max_imports
+        self.command = command or [sys.executable, "-m", __name__]
+        self.process = None
+        self.responses = None
+        self.import_count = 0
+
+    def is_alive(self):
+        """Whether the child is running"""
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        """Starts the child, with the environment and import path of the worker"""
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, sys.path)))
+        self.process = subprocess.Popen(  # pylint: disable=consider-using-with
+            limit_import_process_memory(self.command),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=env,
+        )
+        # Read by a thread so that waiting on the child can time out
+        self.responses = queue.Queue()
+        threading.Thread(
+            target=read_responses,
+            args=(self.process.stdout, self.responses),
+            daemon=True,
+        ).start()
+        self.import_count = 0
+        log.info("Started import process %s", self.process.pid)
+
+    def stop(self, kill=False):
+        """Asks the child to exit, killing it if it doesn't or if kill is True"""
+        if self.process is None:
+            return
+        try:
+            if kill:
+                self.process.kill()
+            self.process.stdin.close()
+            self.process.wait(IMPORT_PROCESS_STOP_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+        log.info("Stopped import process %s", self.process.pid)
+        self.process = None
+
+    def run_import(self, request, timeout=None):
+        """
+        Runs an import in the child, replaying the records it logs
+        :param request: JSON serializable arguments of the import, see
+            serve_imports
+        :param timeout: seconds to wait for the outcome, None waits forever
+        :return dict: the outcome, with the error the import failed with, the
+            name of a GitImportError class, one of the ERROR_* or None if it
+            succeeded, and the CourseImportResult fields of a successful import.
+            The outcome of a child which died also has its returncode, negative
+            when it was killed by a signal.
+        """
+        if not self.is_alive():
+            self.start()
+        try:
+            self.process.stdin.write(json.dumps(request).encode("utf-8") + b"\n")
+            self.process.stdin.flush()
+        except OSError:
+            log.exception("Unable to send the import to the import process")
+            self.stop()
+            return {"error": ERROR_PROCESS_DIED}
+
+        result = self.wait_for_result(timeout)
+        error = result["error"]
+        self.import_count += 1
+        if error in (ERROR_PROCESS_DIED, ERROR_PROCESS_TIMEOUT, ERROR_MEMORY_LIMIT):
+            self.stop(kill=error == ERROR_PROCESS_TIMEOUT)
+        elif self.import_count >= self.max_imports:
+            # Recycled, so that the memory the imports left behind is freed
+            self.stop()
+        return result
+
+    def wait_for_result(self, timeout=None):
+        """Replays the records of the running import until its outcome arrives"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                response = self.responses.get(
+                    timeout=None
+                    if deadline is None
+                    else max(0, deadline - time.monotonic())
+                )
+            except queue.Empty:
+                log.error("The import process didn't finish its import in time")
+                return {"error": ERROR_PROCESS_TIMEOUT}
+            if response is None:
+                returncode = self.process.wait()
+                log.error(
+                    "The import process exited with %s during an import", returncode
+                )
+                return {"error": ERROR_PROCESS_DIED, "returncode": returncode}
+            if "record" in response:
+                replay_record(response["record"])
+            else:
+                return response["result"]
+
+
+def read_responses(stream, responses):
+    """Queues the responses of a child, then None once it exited"""
+    for line in stream:
+        try:
+            responses.put(json.loads(line))
+        except ValueError:
+            log.warning("Unexpected output of the import process: %r", line)
+    responses.put(None)
+
+
+def replay_record(record):
+    """Hands a record logged in the child to the same logger of the parent"""
+    logging.getLogger(record["name"]).handle(
+        logging.makeLogRecord(
+            {
+                "name": record["name"],
+                "levelno": record["levelno"],
+                "levelname": logging.getLevelName(record["levelno"]),
+                "msg": record["message"],
+            }
+        )
+    )
+
+
+_import_processes = threading.local()
+
+
+def run_import_in_process(request, timeout=None):
+    """
+    Runs an import in the import process of the current thread, see
+    ImportProcess.run_import
+    """
+    if getattr(_import_processes, "process", None) is None:
+        _import_processes.process = ImportProcess()
+    return _import_processes.process.run_import(request, timeout)
+
+
+class RecordForwarder(logging.Handler):
+    """Sends the records of the import to the parent"""
+
+    def __init__(self, responses):
+        super().__init__()
+        self.responses = responses
+
+    def emit(self, record):
+        try:
+            message = self.format(record)
+        except Exception:  # pylint: disable=broad-except
+            self.handleError(record)
+            return
+        write_response(
+            self.responses,
+            {
+                "record": {
+                    "name": record.name,
+                    "levelno": record.levelno,
+                    "message": message,
+                }
+            },
+        )
+
+
+def write_response(responses, response):
+    """Writes a response line to the parent"""
+    responses.write(json.dumps(response) + "\n")
+    responses.flush()
+
+
+def serve_imports(requests, responses):
+    """
+    Runs the imports requested by the parent until it closes the requests.
+    Every request has the git_repo_dir, rdir, log_level and logger_names of an
+    import, see git_import.import_course.
+    """
+    # Django is only set up once the child started
+    # pylint: disable=import-outside-toplevel
+    from edx_sysadmin.git_import import (
+        GitImportError,
+        course_import_log,
+        import_course,
+    )
+    from edx_sysadmin.import_log import capture_import_log
+
+    for line in requests:
+        request = json.loads(line)
+        handler = RecordForwarder(responses)
+        handler.setLevel(request["log_level"])
+        result = {"error": None}
+        import_result = None
+        try:
+            with capture_import_log(
+                handler, request["logger_names"], request["log_level"]
+            ):
+                try:
+                    import_result = import_course(
+                        request["git_repo_dir"], request["rdir"]
+                    )
+                except (GitImportError, MemoryError):
+                    raise
+                except Exception:  # pylint: disable=broad-except
+                    # Logged while captured, so that the traceback reaches the
+                    # import log, and the child goes on serving imports
+                    course_import_log.exception("The course import failed")
+                    result["error"] = ERROR_IMPORT_FAILED
+        except GitImportError as ex:
+            result["error"] = ex.__class__.__name__
+        except MemoryError:
+            # The process can't be trusted anymore, it exits after answering
+            result["error"] = ERROR_MEMORY_LIMIT
+        else:
+            if import_result is not None:
+                result.update(
+                    import_result._asdict(),
+                    course_keys=[str(key) for key in import_result.course_keys],
+                )
+        write_response(responses, {"result": result})
+        if result["error"] == ERROR_MEMORY_LIMIT:
+            return
+
+
+def main():
+    """Entry point of the child"""
+    # Only the responses go to the parent, anything else printed goes to stderr
+    responses = os.fdopen(os.dup(sys.stdout.fileno()), "w")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    django.setup()
+    serve_imports(sys.stdin, responses)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Housekeeping for the course repositories checked out under GIT_REPO_DIR.
+"""
+# pylint: disable=wrong-import-order
+
+import logging
+import os
+import shutil
+import subprocess
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from xmodule.modulestore.django import modulestore
+
+from edx_sysadmin.git_import import (
+    DEFAULT_GIT_REPO_DIR,
+    GitImportErrorLimitExceeded,
+    cmd_log,
+    is_import_running,
+    mark_maintenance_running,
+)
+from edx_sysadmin.models import CourseGitLog
+
+log = logging.getLogger(__name__)
+
+# Directories modified more recently than this (in seconds) are never treated as
+# orphans, so a clone that is still in progress is left alone.
+DEFAULT_ORPHANED_REPO_MIN_AGE = 24 * 60 * 60
+
+DEFAULT_GIT_MAINTENANCE_CONCURRENCY = 2
+
+# Commands run in order on every repo by run_git_maintenance: pack everything into
+# a single pack, drop unreachable loose objects older than git gc would keep them
+# and write a commit-graph to speed up history walks.
+GIT_MAINTENANCE_COMMANDS = [
+    ["git", "repack", "-a", "-d", "--quiet"],
+    ["git", "prune", "--expire=2.weeks.ago"],
+    ["git", "commit-graph", "write", "--reachable"],
+]
+
+OrphanedRepoPath = namedtuple(
+    "OrphanedRepoPath", ["path", "is_symlink", "size", "reason"]
+)
+GitMaintenanceResult = namedtuple(
+    "GitMaintenanceResult",
+    ["repo_dir", "status", "duration", "size_before", "size_after", "error"],
+)
+
+
+def get_git_repo_dir():
+    """
+    Returns the configured directory holding the imported course repositories
+    """
+    return getattr(settings, "GIT_REPO_DIR", DEFAULT_GIT_REPO_DIR)
+
+
+def get_disk_usage(path):
+    """
+    Returns the number of bytes allocated on disk for the given path.
+    Symlinks are never followed, so a course symlink only accounts for itself.
+    """
+    stat = os.lstat(path)
+    total = getattr(stat, "st_blocks", 0) * 512 or stat.st_size
+    if os.path.islink(path) or not os.path.isdir(path):
+        return total
+
+    for dirpath, dirnames, filenames in os.walk(path):
+        for name in dirnames + filenames:
+            try:
+                stat = os.lstat(os.path.join(dirpath, name))
+            except OSError:
+                continue
+            total += getattr(stat, "st_blocks", 0) * 512 or stat.st_size
+    return total
+
+
+def find_orphaned_repos(git_repo_dir=None, min_age=None):
+    """
+    Finds repo directories and course symlinks in GIT_REPO_DIR that no longer belong
+    to any course in the modulestore.
+
+    A symlink is orphaned when its target is gone or no course uses its name as
+    course code. A directory is orphaned when no course uses it as course code,
+    no live symlink points at it and no CourseGitLog of an existing course refers to it.
+
+    :param git_repo_dir: directory to scan, defaults to settings.GIT_REPO_DIR
+    :param min_age: seconds since last modification before a directory can be an orphan
+    :return list: OrphanedRepoPath for every orphaned entry
+    """
+    git_repo_dir = os.path.abspath(git_repo_dir or get_git_repo_dir())
+    if min_age is None:
+        min_age = getattr(
+            settings, "SYSADMIN_ORPHANED_REPO_MIN_AGE", DEFAULT_ORPHANED_REPO_MIN_AGE
+        )
+    if not os.path.isdir(git_repo_dir):
+        return []
+
+    course_keys = {summary.id for summary in modulestore().get_course_summaries()}
+    course_codes = {course_key.course for course_key in course_keys}
+    registered_dirs = {
+        repo_dir
+        for course_id, repo_dir in CourseGitLog.objects.values_list(
+            "course_id", "repo_dir"
+        ).distinct()
+        if course_id in course_keys
+    }
+
+    orphans = []
+    linked_dirs = set()
+    directories = []
+    with os.scandir(git_repo_dir) as entries:
+        for entry in entries:
+            if entry.is_symlink():
+                target = os.path.realpath(entry.path)
+                if not os.path.exists(target):
+                    reason = "dangling symlink"
+                elif entry.name not in course_codes:
+                    reason = "no matching course"
+                else:
+                    linked_dirs.add(target)
+                    continue
+                orphans.append(
+                    OrphanedRepoPath(
+                        entry.path, True, get_disk_usage(entry.path), reason
+                    )
+                )
+            elif entry.is_dir() and not entry.name.startswith("."):
+                directories.append(entry)
+
+    now = time.time()
+    for entry in directories:
+        if (
+            entry.name in course_codes
+            or entry.name in registered_dirs
+            or os.path.realpath(entry.path) in linked_dirs
+        ):
+            continue
+        if is_import_running(entry.name) or (
+            now - entry.stat(follow_symlinks=False).st_mtime < min_age
+        ):
+            log.debug("Skipping repo directory in use %s", entry.path)
+            continue
+        orphans.append(
+            OrphanedRepoPath(
+                entry.path,
+                False,
+                get_disk_usage(entry.path),
+                "no matching course or import log",
+            )
+        )
+
+    return sorted(orphans, key=lambda orphan: orphan.path)
+
+
+def remove_orphaned_repos(orphans, git_repo_dir=None):
+    """
+    Removes the given orphaned repo directories and symlinks
+    :param orphans: list of OrphanedRepoPath as returned by find_orphaned_repos
+    :param git_repo_dir: directory the orphans must live in, defaults to settings.GIT_REPO_DIR
+    :return list: OrphanedRepoPath entries which were removed
+    """
+    git_repo_dir = os.path.abspath(git_repo_dir or get_git_repo_dir())
+    removed = []
+    for orphan in orphans:
+        # Never touch anything that isn't a direct child of the repo directory
+        if os.path.dirname(os.path.abspath(orphan.path)) != git_repo_dir:
+            log.warning(
+                "Refusing to remove %s outside of %s", orphan.path, git_repo_dir
+            )
+            continue
+        try:
+            if orphan.is_symlink:
+                os.unlink(orphan.path)
+            else:
+                shutil.rmtree(orphan.path)
+        except OSError:
+            log.exception("Unable to remove orphaned repo path %s", orphan.path)
+            continue
+        log.info("Removed orphaned repo path %s (%s bytes)", orphan.path, orphan.size)
+        removed.append(orphan)
+    return removed
+
+
+def get_git_repos(git_repo_dir=None):
+    """
+    Returns the names of all git repositories checked out in GIT_REPO_DIR.
+    Course symlinks are skipped so that every repo is listed only once.
+    """
+    git_repo_dir = git_repo_dir or get_git_repo_dir()
+    if not os.path.isdir(git_repo_dir):
+        return []
+    with os.scandir(git_repo_dir) as entries:
+        return sorted(
+            entry.name
+            for entry in entries
+            if not entry.is_symlink()
+            and entry.is_dir()
+            and os.path.isdir(os.path.join(entry.path, ".git"))
+        )
+
+
+def run_git_maintenance(repo_dir, git_repo_dir=None):
+    """
+    Repacks, prunes and writes the commit-graph of a single repo in GIT_REPO_DIR.
+    Repos with an import in progress are skipped, imports starting meanwhile
+    wait for the maintenance to end.
+    :param repo_dir: name of the repo directory inside GIT_REPO_DIR
+    :return GitMaintenanceResult: outcome, time taken and size of .git before and after
+    """
+    git_repo_dir = git_repo_dir or get_git_repo_dir()
+    repo_path = os.path.abspath(os.path.join(git_repo_dir, repo_dir))
+    git_dir = os.path.join(repo_path, ".git")
+    if not os.path.isdir(git_dir):
+        log.warning("Skipping git maintenance of %s, not a git repo", repo_dir)
+        return GitMaintenanceResult(
+            repo_dir, "skipped", 0, None, None, "not a git repo"
+        )
+
+    with mark_maintenance_running(repo_dir) as marked:
+        if not marked:
+            log.info("Skipping git maintenance of %s, an import is running", repo_dir)
+            return GitMaintenanceResult(repo_dir, "skipped", 0, None, None, None)
+        return _run_git_maintenance(repo_dir, repo_path, git_dir)
+
+
+def _run_git_maintenance(repo_dir, repo_path, git_dir):
+    """Runs GIT_MAINTENANCE_COMMANDS on a repo, see run_git_maintenance"""
+    size_before = get_disk_usage(git_dir)
+    start = time.monotonic()
+    status, error = "succeeded", None
+    for cmd in GIT_MAINTENANCE_COMMANDS:
+        try:
+            cmd_log(cmd, repo_path)
+        except subprocess.CalledProcessError as ex:
+            log.exception("Git maintenance of %s failed: %r", repo_dir, ex.output)
+            status, error = "failed", ex.output
+            break
+        except GitImportErrorLimitExceeded as ex:
+            log.error("Git maintenance of %s failed: %s", repo_dir, ex)
+            status, error = "failed", str(ex)
+            break
+    duration = time.monotonic() - start
+    size_after = get_disk_usage(git_dir)
+
+    log.info(
+        "Git maintenance of %s %s in %.1fs, %d bytes saved",
+        repo_dir,
+        status,
+        duration,
+        size_before - size_after,
+    )
+    return GitMaintenanceResult(
+        repo_dir, status, duration, size_before, size_after, error
+    )
+
+
+def run_git_maintenance_for_all(repo_dirs=None, concurrency=None, git_repo_dir=None):
+    """
+    Runs run_git_maintenance on every repo in GIT_REPO_DIR with at most
+    concurrency repos being worked on at the same time.
+    :param repo_dirs: names of the repos to maintain, defaults to all of them
+    :param concurrency: number of repos to work on in parallel
+    :return list: GitMaintenanceResult of every repo
+    """
+    git_repo_dir = git_repo_dir or get_git_repo_dir()
+    if repo_dirs is None:
+        repo_dirs = get_git_repos(git_repo_dir)
+    if concurrency is None:
+        concurrency = getattr(
+            settings,
+            "SYSADMIN_GIT_MAINTENANCE_CONCURRENCY",
+            DEFAULT_GIT_MAINTENANCE_CONCURRENCY,
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        return list(
+            executor.map(
+                lambda repo_dir: run_git_maintenance(repo_dir, git_repo_dir),
+                repo_dirs,
+            )
+        )
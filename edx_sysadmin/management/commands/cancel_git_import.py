@@ -0,0 +1,44 @@
+"""
+Script for cancelling the git imports queued or run by the Celery workers
+"""
+# pylint: disable=wrong-import-order
+
+from django.core.management.base import BaseCommand, CommandError
+
+from edx_sysadmin.import_jobs import cancel_import_job
+from edx_sysadmin.models import ImportJob
+
+
+class Command(BaseCommand):
+    """
+    Cancel import jobs started from the Git Import panel.
+    """
+
+    help = (
+        "Cancel the given import jobs. Queued jobs are cancelled right away, "
+        "running ones are stopped by their worker before their course import starts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("job_ids", nargs="*", type=int)
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Cancel every queued or running import job",
+        )
+
+    def handle(self, *args, **options):
+        """Cancel the jobs and report the outcome for every one of them"""
+        job_ids = options["job_ids"]
+        if options["all"]:
+            job_ids = list(
+                ImportJob.objects.exclude(
+                    status__in=ImportJob.FINISHED_STATUSES
+                ).values_list("id", flat=True)
+            )
+        elif not job_ids:
+            raise CommandError("Give the ids of the jobs to cancel, or --all")
+
+        for job_id in job_ids:
+            outcome = "cancelling" if cancel_import_job(job_id) else "finished"
+            self.stdout.write("{0}\t{1}".format(job_id, outcome))
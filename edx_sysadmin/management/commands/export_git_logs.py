@@ -0,0 +1,95 @@
+"""
+Script for exporting the git import logs, e.g to load them into a data warehouse
+"""
+# pylint: disable=wrong-import-order
+
+from django.core.management.base import BaseCommand, CommandError
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+
+from edx_sysadmin.models import CourseGitLog
+from edx_sysadmin.utils.export import (
+    EXPORT_FORMATS,
+    export_git_logs,
+    get_git_logs_for_export,
+)
+from edx_sysadmin.utils.utils import parse_datetime_param
+
+
+class Command(BaseCommand):
+    """
+    Write the git import logs as NDJSON or CSV, oldest first.
+    """
+
+    help = (
+        "Export the git import logs as NDJSON or CSV to stdout or a file. "
+        "Rows are read in chunks, so any number of logs can be exported."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format",
+            dest="file_format",
+            choices=EXPORT_FORMATS,
+            default=EXPORT_FORMATS[0],
+            help="Format of the export",
+        )
+        parser.add_argument(
+            "--course-id", help="Only export the imports of this course"
+        )
+        parser.add_argument(
+            "--since", help="Only export imports created on or after this date"
+        )
+        parser.add_argument(
+            "--until", help="Only export imports created before this date"
+        )
+        parser.add_argument(
+            "--status",
+            choices=[choice for choice, _ in CourseGitLog.STATUS_CHOICES],
+            help="Only export imports with this status",
+        )
+        parser.add_argument(
+            "--include-import-log",
+            action="store_true",
+            help="Also export the full import logs",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=None,
+            help="Number of logs read per query",
+        )
+        parser.add_argument(
+            "--output", help="File to write the export to, defaults to stdout"
+        )
+
+    def handle(self, *args, **options):
+        """Write the export"""
+        try:
+            queryset = get_git_logs_for_export(
+                course_id=CourseKey.from_string(options["course_id"])
+                if options["course_id"]
+                else None,
+                since=parse_datetime_param(options["since"])
+                if options["since"]
+                else None,
+                until=parse_datetime_param(options["until"])
+                if options["until"]
+                else None,
+                status=options["status"],
+            )
+        except (InvalidKeyError, ValueError) as e:
+            raise CommandError(str(e))
+
+        lines = export_git_logs(
+            queryset,
+            options["file_format"],
+            include_import_log=options["include_import_log"],
+            chunk_size=options["chunk_size"],
+        )
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8", newline="") as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending="")
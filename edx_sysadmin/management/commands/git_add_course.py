@@ -40,6 +40,15 @@ class Command(BaseCommand):
         parser.add_argument("repository_url")
         parser.add_argument("--directory_path", action="store")
         parser.add_argument("--repository_branch", action="store")
+        parser.add_argument(
+            "--log_level",
+            action="store",
+            choices=sorted(git_import.IMPORT_LOG_LEVELS),
+            help=(
+                "Level the import log is captured at, defaults to "
+                "GIT_IMPORT_LOG_LEVEL"
+            ),
+        )
 
     def handle(self, *args, **options):
         """Check inputs and run the command"""
@@ -54,6 +63,11 @@ class Command(BaseCommand):
             branch = options["repository_branch"]
 
         try:
-            git_import.add_repo(options["repository_url"], rdir_arg, branch)
+            git_import.add_repo(
+                options["repository_url"],
+                rdir_arg,
+                branch,
+                log_level=options["log_level"],
+            )
         except git_import.GitImportError as ex:
             raise CommandError(str(ex))  # pylint: disable=raise-missing-from
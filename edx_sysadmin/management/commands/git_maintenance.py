@@ -0,0 +1,55 @@
+"""
+Script for running git housekeeping on the imported course repositories
+"""
+# pylint: disable=wrong-import-order
+
+from django.core.management.base import BaseCommand, CommandError
+
+from edx_sysadmin import maintenance
+from edx_sysadmin.management.commands.git_remove_orphaned_repos import format_size
+
+
+class Command(BaseCommand):
+    """
+    Repack, prune and write commit-graphs for the repos in GIT_REPO_DIR.
+    """
+
+    help = (
+        "Repack, prune and write commit-graphs for every repo in GIT_REPO_DIR, "
+        "or only for the given repo directories. Repos being imported are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("repo_dirs", nargs="*")
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=None,
+            help="Number of repos to work on in parallel",
+        )
+
+    def handle(self, *args, **options):
+        """Run the maintenance and report the outcome of every repo"""
+        repo_dirs = options["repo_dirs"] or None
+        if repo_dirs:
+            unknown = set(repo_dirs) - set(maintenance.get_git_repos())
+            if unknown:
+                raise CommandError(
+                    "Not git repos in GIT_REPO_DIR: {0}".format(
+                        ", ".join(sorted(unknown))
+                    )
+                )
+        results = maintenance.run_git_maintenance_for_all(
+            repo_dirs=repo_dirs,
+            concurrency=options["concurrency"],
+        )
+        for result in results:
+            if result.size_before is None:
+                saved = "-"
+            else:
+                saved = format_size(result.size_before - result.size_after)
+            self.stdout.write(
+                "{0}\t{1}\t{2:.1f}s\t{3}".format(
+                    result.repo_dir, result.status, result.duration, saved
+                )
+            )
@@ -0,0 +1,66 @@
+"""
+Script for reclaiming disk space used by orphaned course repositories
+"""
+# pylint: disable=wrong-import-order
+
+from django.core.management.base import BaseCommand
+
+from edx_sysadmin import maintenance
+
+
+def format_size(size):
+    """Formats a size in bytes to a human readable string"""
+    for unit in ["B", "KB", "MB", "GB"]:
+        if size < 1024:
+            return "{0:.1f} {1}".format(size, unit)
+        size /= 1024.0
+    return "{0:.1f} TB".format(size)
+
+
+class Command(BaseCommand):
+    """
+    Find repo directories and course symlinks in GIT_REPO_DIR which no longer
+    belong to any course, and optionally remove them.
+    """
+
+    help = (
+        "Report repo directories and course symlinks in GIT_REPO_DIR with no matching "
+        "course or import log. Nothing is removed unless --delete is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--delete",
+            action="store_true",
+            help="Remove the orphaned paths instead of only reporting them",
+        )
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=None,
+            help="Only consider directories not modified for this many seconds",
+        )
+
+    def handle(self, *args, **options):
+        """Find the orphans and report or remove them"""
+        orphans = maintenance.find_orphaned_repos(min_age=options["min_age"])
+        if not orphans:
+            self.stdout.write("No orphaned repo paths found.")
+            return
+
+        if options["delete"]:
+            orphans = maintenance.remove_orphaned_repos(orphans)
+
+        for orphan in orphans:
+            self.stdout.write(
+                "{0}\t{1}\t{2}".format(
+                    format_size(orphan.size), orphan.path, orphan.reason
+                )
+            )
+        self.stdout.write(
+            "{0} {1} orphaned repo paths, {2} in total.".format(
+                "Removed" if options["delete"] else "Found (dry run)",
+                len(orphans),
+                format_size(sum(orphan.size for orphan in orphans)),
+            )
+        )
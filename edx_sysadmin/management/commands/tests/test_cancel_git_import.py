@@ -0,0 +1,51 @@
+"""
+Provide tests for cancel_git_import management command.
+"""
+# pylint: disable=wrong-import-order
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from edx_sysadmin.models import ImportJob
+
+
+class TestCancelGitImport(TestCase):
+    """
+    Tests the cancel_git_import management command.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.queued_job = ImportJob.objects.create(repo="https://example.com/a.git")
+        self.finished_job = ImportJob.objects.create(
+            repo="https://example.com/b.git", status=ImportJob.STATUS_SUCCEEDED
+        )
+
+    def test_cancel_jobs(self):
+        """Every given job is reported along with its outcome"""
+        output = StringIO()
+        call_command(
+            "cancel_git_import",
+            str(self.queued_job.id),
+            str(self.finished_job.id),
+            stdout=output,
+        )
+        self.assertEqual(
+            output.getvalue(),
+            f"{self.queued_job.id}\tcancelling\n{self.finished_job.id}\tfinished\n",
+        )
+        self.queued_job.refresh_from_db()
+        self.assertEqual(self.queued_job.status, ImportJob.STATUS_CANCELLED)
+
+    def test_cancel_all(self):
+        """--all only cancels the jobs which aren't finished"""
+        output = StringIO()
+        call_command("cancel_git_import", "--all", stdout=output)
+        self.assertEqual(output.getvalue(), f"{self.queued_job.id}\tcancelling\n")
+
+    def test_no_jobs(self):
+        """Job ids or --all are required"""
+        with self.assertRaises(CommandError):
+            call_command("cancel_git_import")
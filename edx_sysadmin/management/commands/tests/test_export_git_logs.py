@@ -0,0 +1,97 @@
+"""
+Provide tests for export_git_logs management command.
+"""
+# pylint: disable=wrong-import-order
+import csv
+import json
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from opaque_keys.edx.locator import CourseLocator
+
+from edx_sysadmin.models import CourseGitLog
+
+
+class TestExportGitLogs(TestCase):
+    """
+    Tests the export_git_logs management command.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.course_a = CourseLocator("MITx", "a", "run")
+        self.course_b = CourseLocator("MITx", "b", "run")
+        now = timezone.now()
+        for index in range(5):
+            cgl = CourseGitLog.objects.create(
+                course_id=self.course_a if index % 2 else self.course_b,
+                repo_dir="repo",
+                git_log=f"log {index}",
+                status=CourseGitLog.STATUS_FAILED
+                if index == 4
+                else CourseGitLog.STATUS_SUCCEEDED,
+                import_log=f"import log {index}",
+            )
+            # created is auto_now_add, so it can only be changed once saved
+            CourseGitLog.objects.filter(pk=cgl.pk).update(
+                created=now - timedelta(days=5 - index)
+            )
+
+    def call_command(self, *args):
+        """Runs the command and returns its output"""
+        output = StringIO()
+        call_command("export_git_logs", *args, stdout=output)
+        return output.getvalue()
+
+    def test_ndjson_in_chunks(self):
+        """
+        Every log is exported in id order, whatever the chunk size
+        """
+        rows = [
+            json.loads(line)
+            for line in self.call_command("--chunk-size", "2").splitlines()
+        ]
+        self.assertEqual(
+            [row["git_log"] for row in rows], [f"log {index}" for index in range(5)]
+        )
+        self.assertNotIn("import_log", rows[0])
+
+    def test_csv_with_filters(self):
+        """
+        The CSV export has a header and only the filtered logs
+        """
+        rows = list(
+            csv.DictReader(
+                StringIO(
+                    self.call_command(
+                        "--format",
+                        "csv",
+                        "--course-id",
+                        str(self.course_b),
+                        "--status",
+                        "succeeded",
+                        "--include-import-log",
+                    )
+                )
+            )
+        )
+        self.assertEqual([row["git_log"] for row in rows], ["log 0", "log 2"])
+        self.assertEqual(rows[0]["import_log"], "import log 0")
+        self.assertEqual(rows[0]["course_id"], str(self.course_b))
+
+    def test_date_range(self):
+        """
+        Only logs created in the date range are exported
+        """
+        since = (timezone.now() - timedelta(days=3, hours=1)).isoformat()
+        until = (timezone.now() - timedelta(days=1, hours=1)).isoformat()
+        rows = [
+            json.loads(line)
+            for line in self.call_command(
+                "--since", since, "--until", until
+            ).splitlines()
+        ]
+        self.assertEqual([row["git_log"] for row in rows], ["log 2", "log 3"])
@@ -5,8 +5,11 @@ Provide tests for git_add_course management command.
 import logging
 import os
 import shutil
+import signal
 import subprocess
+import time
 from io import StringIO
+from unittest.mock import patch
 from uuid import uuid4
 
 from django.conf import settings
@@ -21,11 +24,18 @@ from edx_sysadmin import git_import
 from edx_sysadmin.git_import import (
     GitImportError,
     GitImportErrorBadRepo,
+    GitImportErrorCancelled,
     GitImportErrorCannotPull,
+    GitImportErrorGitTimeout,
+    GitImportErrorImportMemoryLimit,
+    GitImportErrorImportTimeout,
     GitImportErrorNoDir,
     GitImportErrorRemoteBranchMissing,
     GitImportErrorUrlBad,
+    GitImportErrorXmlImportFailed,
 )
+from edx_sysadmin.import_process import ERROR_PROCESS_DIED
+from edx_sysadmin.models import CourseGitLog
 
 
 @override_settings(
@@ -157,6 +167,118 @@ class TestGitAddCourse(SharedModuleStoreTestCase):
         with self.assertRaises(GitImportErrorCannotPull):
             git_import.add_repo(self.TEST_REPO, repo_dir / "edx4edx_lite", None)
 
+    def test_import_log_level(self):
+        """
+        Lean imports don't capture the debug lines but still find their course
+        """
+        repo_dir = self.git_repo_dir
+        if not os.path.isdir(repo_dir):
+            os.mkdir(repo_dir)
+        self.addCleanup(shutil.rmtree, repo_dir)
+
+        with self.assertRaises(ValueError):
+            git_import.add_repo(self.TEST_REPO, None, None, log_level="TRACE")
+        with self.assertRaises(ValueError):
+            git_import.add_repo(self.TEST_REPO, None, None, log_level=logging.ERROR)
+        self.assertEqual(git_import.get_import_log_level("info"), logging.INFO)
+        with override_settings(GIT_IMPORT_LOG_LEVEL=logging.WARNING):
+            self.assertEqual(git_import.get_import_log_level(), logging.WARNING)
+
+        call_command("git_add_course", self.TEST_REPO, "--log_level", "WARNING")
+        cgl = CourseGitLog.objects.latest("created")
+        self.assertEqual(cgl.course_id, self.TEST_COURSE_KEY)
+        self.assertNotIn("===> IMPORTING courselike", cgl.import_log)
+        self.assertIsNotNone(modulestore().get_course(self.TEST_COURSE_KEY))
+
+    def test_import_course(self):
+        """
+        Courses imported with the XML importer report their keys and duration, those
+        imported with the import command don't
+        """
+        repo_dir = self.git_repo_dir
+        if not os.path.isdir(repo_dir):
+            os.mkdir(repo_dir)
+        self.addCleanup(shutil.rmtree, repo_dir)
+        git_import.add_repo(self.TEST_REPO, None, None)
+        self.assertIn("Imported", CourseGitLog.objects.latest("created").import_log)
+
+        result = git_import.import_course(repo_dir, "edx4edx_lite")
+        self.assertEqual(result.course_keys, [self.TEST_COURSE_KEY])
+        self.assertGreaterEqual(result.duration, 0)
+
+        with override_settings(GIT_IMPORT_USE_COMMAND=True):
+            self.assertIsNone(git_import.import_course(repo_dir, "edx4edx_lite"))
+
+    def test_git_command_timeout(self):
+        """
+        Git commands running past their timeout are killed
+        """
+        with self.assertRaises(GitImportErrorGitTimeout):
+            git_import.cmd_log(["sleep", "5"], settings.TEST_ROOT, timeout=0.1)
+
+    def test_import_cancelled(self):
+        """
+        Cancelled imports stop before touching the repo directory
+        """
+        repo_dir = self.git_repo_dir
+        if not os.path.isdir(repo_dir):
+            os.mkdir(repo_dir)
+        self.addCleanup(shutil.rmtree, repo_dir)
+
+        with self.assertRaises(GitImportErrorCancelled):
+            git_import.import_repo(self.TEST_REPO, cancel_check=lambda: True)
+        self.assertFalse(os.path.exists(repo_dir / "edx4edx_lite"))
+
+    def test_import_timeout(self):
+        """
+        Imports running past their timeout are stopped and recorded as such
+        """
+        repo_dir = self.git_repo_dir
+        if not os.path.isdir(repo_dir):
+            os.mkdir(repo_dir)
+        self.addCleanup(shutil.rmtree, repo_dir)
+
+        with override_settings(GIT_IMPORT_TIMEOUT=0.5), patch(
+            "edx_sysadmin.git_import.import_course_from_xml",
+            side_effect=lambda *args, **kwargs: time.sleep(5),
+        ):
+            with self.assertRaises(GitImportErrorImportTimeout) as context:
+                git_import.add_repo(self.TEST_REPO, None, None)
+        cgl = CourseGitLog.objects.latest("created")
+        self.assertEqual(context.exception.course_git_log, cgl)
+        self.assertEqual(cgl.status, CourseGitLog.STATUS_LIMIT_EXCEEDED)
+        self.assertEqual(cgl.first_error, str(GitImportErrorImportTimeout()))
+
+    def test_isolated_import_memory_limit(self):
+        """
+        Isolated imports whose process was killed under a memory limit are recorded
+        as exceeding it, those whose process exited are failed imports
+        """
+        repo_dir = self.git_repo_dir
+        if not os.path.isdir(repo_dir):
+            os.mkdir(repo_dir)
+        self.addCleanup(shutil.rmtree, repo_dir)
+
+        with override_settings(
+            GIT_IMPORT_ISOLATED=True, GIT_IMPORT_MEMORY_LIMIT=2**30
+        ), patch(
+            "edx_sysadmin.git_import.run_import_in_process",
+            return_value={"error": ERROR_PROCESS_DIED, "returncode": -signal.SIGKILL},
+        ) as run_import_in_process:
+            with self.assertRaises(GitImportErrorImportMemoryLimit):
+                git_import.add_repo(self.TEST_REPO, None, None)
+            request = run_import_in_process.call_args[0][0]
+            self.assertEqual(request["rdir"], "edx4edx_lite")
+            cgl = CourseGitLog.objects.latest("created")
+            self.assertEqual(cgl.status, CourseGitLog.STATUS_LIMIT_EXCEEDED)
+
+            run_import_in_process.return_value = {
+                "error": ERROR_PROCESS_DIED,
+                "returncode": 1,
+            }
+            with self.assertRaises(GitImportErrorXmlImportFailed):
+                git_import.add_repo(self.TEST_REPO, None, None)
+
     def test_branching(self):
         """
         Exercise branching code of import
@@ -0,0 +1,112 @@
+"""
+Provide tests for git_maintenance management command.
+"""
+# pylint: disable=wrong-import-order
+import os
+import shutil
+import subprocess
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from edx_sysadmin.git_import import (
+    MAINTENANCE_RUNNING_CACHE_KEY,
+    is_import_running,
+    mark_import_running,
+    mark_maintenance_running,
+    wait_for_maintenance,
+)
+from edx_sysadmin.maintenance import run_git_maintenance
+
+
+class TestGitMaintenance(TestCase):
+    """
+    Tests the git_maintenance management command.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.git_repo_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.git_repo_dir)
+        self.repo_path = os.path.join(self.git_repo_dir, "edx4edx_lite")
+        os.mkdir(self.repo_path)
+        for cmd in [
+            ["git", "init", "-q"],
+            ["git", "config", "user.email", "test@example.com"],
+            ["git", "config", "user.name", "test"],
+            ["git", "commit", "-q", "--allow-empty", "-m", "initial"],
+        ]:
+            subprocess.check_output(cmd, cwd=self.repo_path, stderr=subprocess.STDOUT)
+
+    def call_command(self, *args):
+        """Runs the command against the temporary repo dir"""
+        output = StringIO()
+        with self.settings(GIT_REPO_DIR=self.git_repo_dir):
+            call_command("git_maintenance", *args, stdout=output)
+        return output.getvalue()
+
+    def test_maintenance(self):
+        """
+        Repos are repacked and get a commit-graph
+        """
+        output = self.call_command()
+        self.assertIn("edx4edx_lite\tsucceeded", output)
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(self.repo_path, ".git", "objects", "info", "commit-graph")
+            )
+        )
+
+    def test_skip_running_import(self):
+        """
+        Repos with an import in progress are left alone
+        """
+        with mark_import_running("edx4edx_lite"):
+            output = self.call_command()
+        self.assertIn("edx4edx_lite\tskipped", output)
+
+    def test_overlapping_imports(self):
+        """
+        A repo stays flagged until the last of its overlapping imports ends
+        """
+        with mark_import_running("edx4edx_lite"):
+            with mark_import_running("edx4edx_lite"):
+                self.assertTrue(is_import_running("edx4edx_lite"))
+            self.assertTrue(is_import_running("edx4edx_lite"))
+        self.assertFalse(is_import_running("edx4edx_lite"))
+
+    def test_missing_repo_dir(self):
+        """
+        Repo directories which aren't git repos in GIT_REPO_DIR are rejected up front
+        """
+        with self.assertRaises(CommandError):
+            self.call_command("edx4edx_lite", "missing")
+        result = run_git_maintenance("missing", self.git_repo_dir)
+        self.assertEqual(result.status, "skipped")
+
+    def test_import_waits_for_maintenance(self):
+        """
+        Imports wait for the maintenance of their repo, which leaves repos
+        being imported alone
+        """
+        with mark_maintenance_running("edx4edx_lite") as marked:
+            self.assertTrue(marked)
+            with mark_maintenance_running("edx4edx_lite") as marked_again:
+                self.assertFalse(marked_again)
+            with patch(
+                "edx_sysadmin.git_import.time.sleep",
+                side_effect=lambda interval: cache.delete(
+                    MAINTENANCE_RUNNING_CACHE_KEY.format("edx4edx_lite")
+                ),
+            ) as sleep:
+                wait_for_maintenance("edx4edx_lite")
+            sleep.assert_called_once()
+
+        with mark_import_running("edx4edx_lite"):
+            with mark_maintenance_running("edx4edx_lite") as marked:
+                self.assertFalse(marked)
@@ -0,0 +1,87 @@
+"""
+Provide tests for git_remove_orphaned_repos management command.
+"""
+# pylint: disable=wrong-import-order
+import os
+import shutil
+import tempfile
+from io import StringIO
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase
+from opaque_keys.edx.locator import CourseLocator
+
+from edx_sysadmin.models import CourseGitLog
+
+
+class TestGitRemoveOrphanedRepos(TestCase):
+    """
+    Tests the git_remove_orphaned_repos management command.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.git_repo_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.git_repo_dir)
+        self.course_key = CourseLocator("MITx", "edx4edx", "edx4edx")
+
+        # A live course: repo dir, symlink named after the course code and an import log
+        os.mkdir(os.path.join(self.git_repo_dir, "edx4edx_lite"))
+        os.symlink(
+            os.path.join(self.git_repo_dir, "edx4edx_lite"),
+            os.path.join(self.git_repo_dir, "edx4edx"),
+        )
+        CourseGitLog.objects.create(course_id=self.course_key, repo_dir="edx4edx_lite")
+
+        # Leftovers of a deleted course and of a failed import
+        os.mkdir(os.path.join(self.git_repo_dir, "deleted_repo"))
+        with open(
+            os.path.join(self.git_repo_dir, "deleted_repo", "course.xml"), "w"
+        ) as f:
+            f.write("<course/>")
+        os.symlink(
+            os.path.join(self.git_repo_dir, "deleted_repo"),
+            os.path.join(self.git_repo_dir, "deleted"),
+        )
+        os.symlink(
+            os.path.join(self.git_repo_dir, "missing"),
+            os.path.join(self.git_repo_dir, "dangling"),
+        )
+
+        patcher = patch("edx_sysadmin.maintenance.modulestore")
+        mocked_modulestore = patcher.start()
+        self.addCleanup(patcher.stop)
+        mocked_modulestore.return_value.get_course_summaries.return_value = [
+            SimpleNamespace(id=self.course_key)
+        ]
+
+    def call_command(self, **kwargs):
+        """Runs the command against the temporary repo dir"""
+        output = StringIO()
+        with self.settings(GIT_REPO_DIR=self.git_repo_dir):
+            call_command(
+                "git_remove_orphaned_repos", min_age=0, stdout=output, **kwargs
+            )
+        return output.getvalue()
+
+    def test_dry_run(self):
+        """
+        Orphans are reported, but nothing is removed by default
+        """
+        output = self.call_command()
+        for name in ["deleted_repo", "deleted", "dangling"]:
+            self.assertIn(os.path.join(self.git_repo_dir, name), output)
+            self.assertTrue(os.path.lexists(os.path.join(self.git_repo_dir, name)))
+        self.assertNotIn(os.path.join(self.git_repo_dir, "edx4edx_lite"), output)
+        self.assertIn("Found (dry run) 3 orphaned repo paths", output)
+
+    def test_delete(self):
+        """
+        Orphans are removed with --delete while live course paths are kept
+        """
+        self.call_command(delete=True)
+        self.assertEqual(
+            sorted(os.listdir(self.git_repo_dir)), ["edx4edx", "edx4edx_lite"]
+        )
@@ -0,0 +1,74 @@
+import json
+import zlib
+
+from django.db import migrations, models
+
+BATCH_SIZE = 100
+
+
+def _import_log_text(import_log):
+    """Import logs are stored as JSON strings, anything else is kept as its JSON"""
+    return import_log if isinstance(import_log, str) else json.dumps(import_log)
+
+
+def compress_import_logs(apps, schema_editor):
+    """Move the import logs of existing rows to the compressed column, in batches"""
+    CourseGitLog = apps.get_model("edx_sysadmin", "CourseGitLog")
+    last_id = 0
+    while True:
+        batch = list(
+            CourseGitLog.objects.filter(id__gt=last_id, course_import_log__isnull=False)
+            .order_by("id")
+            .only("id", "course_import_log")[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for course_git_log in batch:
+            course_git_log.course_import_log_compressed = zlib.compress(
+                _import_log_text(course_git_log.course_import_log).encode("utf-8")
+            )
+            course_git_log.course_import_log = None
+        CourseGitLog.objects.bulk_update(
+            batch, ["course_import_log", "course_import_log_compressed"]
+        )
+        last_id = batch[-1].id
+
+
+def decompress_import_logs(apps, schema_editor):
+    """Move the compressed import logs back to the uncompressed column, in batches"""
+    CourseGitLog = apps.get_model("edx_sysadmin", "CourseGitLog")
+    last_id = 0
+    while True:
+        batch = list(
+            CourseGitLog.objects.filter(
+                id__gt=last_id, course_import_log_compressed__isnull=False
+            )
+            .order_by("id")
+            .only("id", "course_import_log_compressed")[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for course_git_log in batch:
+            course_git_log.course_import_log = zlib.decompress(
+                bytes(course_git_log.course_import_log_compressed)
+            ).decode("utf-8")
+            course_git_log.course_import_log_compressed = None
+        CourseGitLog.objects.bulk_update(
+            batch, ["course_import_log", "course_import_log_compressed"]
+        )
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("edx_sysadmin", "0001_course_git_log"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="coursegitlog",
+            name="course_import_log_compressed",
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.RunPython(compress_import_logs, decompress_import_logs),
+    ]
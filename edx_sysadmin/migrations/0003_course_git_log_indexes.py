@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("edx_sysadmin", "0002_course_git_log_compressed_import_log"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="coursegitlog",
+            index=models.Index(
+                fields=["course_id", "created", "id"],
+                name="sysadmin_gitlog_course_crtd",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="coursegitlog",
+            index=models.Index(
+                fields=["created", "id"], name="sysadmin_gitlog_created"
+            ),
+        ),
+    ]
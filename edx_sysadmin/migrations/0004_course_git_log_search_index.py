@@ -0,0 +1,92 @@
+import django.db.models.deletion
+import opaque_keys.edx.django.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("edx_sysadmin", "0003_course_git_log_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CourseGitLogMessage",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "course_id",
+                    opaque_keys.edx.django.models.CourseKeyField(max_length=255),
+                ),
+                ("created", models.DateTimeField(null=True)),
+                ("position", models.PositiveIntegerField()),
+                ("level", models.PositiveSmallIntegerField()),
+                ("message", models.TextField()),
+                (
+                    "course_git_log",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="messages",
+                        to="edx_sysadmin.coursegitlog",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("course_git_log", "position")},
+            },
+        ),
+        migrations.CreateModel(
+            name="CourseGitLogTerm",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("term", models.CharField(max_length=64)),
+                (
+                    "message",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="terms",
+                        to="edx_sysadmin.coursegitlogmessage",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="coursegitlogmessage",
+            index=models.Index(
+                fields=["course_id", "created", "id"], name="sysadmin_gitlogmsg_course"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="coursegitlogmessage",
+            index=models.Index(
+                fields=["level", "created", "id"], name="sysadmin_gitlogmsg_level"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="coursegitlogmessage",
+            index=models.Index(
+                fields=["created", "id"], name="sysadmin_gitlogmsg_created"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="coursegitlogterm",
+            index=models.Index(
+                fields=["term", "message"], name="sysadmin_gitlogterm_term"
+            ),
+        ),
+    ]
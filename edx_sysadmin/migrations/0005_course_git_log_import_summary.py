@@ -0,0 +1,45 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("edx_sysadmin", "0004_course_git_log_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="coursegitlog",
+            name="status",
+            field=models.CharField(
+                choices=[("succeeded", "Succeeded"), ("failed", "Failed")],
+                max_length=20,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="coursegitlog",
+            name="warning_count",
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name="coursegitlog",
+            name="error_count",
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name="coursegitlog",
+            name="first_error",
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name="coursegitlog",
+            name="duration",
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name="coursegitlog",
+            index=models.Index(
+                fields=["status", "created", "id"], name="sysadmin_gitlog_status"
+            ),
+        ),
+    ]
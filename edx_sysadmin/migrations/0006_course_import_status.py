@@ -0,0 +1,110 @@
+import django.db.models.deletion
+import opaque_keys.edx.django.models
+from django.db import migrations, models
+from django.db.models import Max
+
+BATCH_SIZE = 500
+
+SUMMARY_FIELDS = (
+    "repo_dir",
+    "commit",
+    "status",
+    "error_count",
+    "first_error",
+    "duration",
+)
+
+
+def fill_course_import_status(apps, schema_editor):
+    """
+    Create the import status of every course from its latest git log
+    """
+    CourseGitLog = apps.get_model("edx_sysadmin", "CourseGitLog")
+    CourseImportStatus = apps.get_model("edx_sysadmin", "CourseImportStatus")
+
+    latest_ids = list(
+        CourseGitLog.objects.exclude(course_id="")
+        .values("course_id")
+        .annotate(latest_id=Max("id"))
+        .values_list("latest_id", flat=True)
+    )
+    for start in range(0, len(latest_ids), BATCH_SIZE):
+        git_logs = CourseGitLog.objects.filter(
+            id__in=latest_ids[start : start + BATCH_SIZE]
+        ).only("id", "course_id", "created", *SUMMARY_FIELDS)
+        CourseImportStatus.objects.bulk_create(
+            [
+                CourseImportStatus(
+                    course_id=git_log.course_id,
+                    course_git_log_id=git_log.id,
+                    last_import=git_log.created,
+                    **{field: getattr(git_log, field) for field in SUMMARY_FIELDS},
+                )
+                for git_log in git_logs
+            ]
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("edx_sysadmin", "0005_course_git_log_import_summary"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CourseImportStatus",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "course_id",
+                    opaque_keys.edx.django.models.CourseKeyField(
+                        max_length=255, unique=True
+                    ),
+                ),
+                ("repo_dir", models.CharField(max_length=255)),
+                ("commit", models.CharField(max_length=40, null=True)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("succeeded", "Succeeded"), ("failed", "Failed")],
+                        max_length=20,
+                        null=True,
+                    ),
+                ),
+                ("error_count", models.PositiveIntegerField(null=True)),
+                ("first_error", models.CharField(max_length=255, null=True)),
+                ("duration", models.FloatField(null=True)),
+                ("last_import", models.DateTimeField(null=True)),
+                (
+                    "course_git_log",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="edx_sysadmin.coursegitlog",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="courseimportstatus",
+            index=models.Index(
+                fields=["status", "last_import"], name="sysadmin_importstatus_status"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="courseimportstatus",
+            index=models.Index(
+                fields=["last_import"], name="sysadmin_importstatus_import"
+            ),
+        ),
+        migrations.RunPython(fill_course_import_status, migrations.RunPython.noop),
+    ]
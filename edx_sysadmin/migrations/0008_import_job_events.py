@@ -0,0 +1,52 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("edx_sysadmin", "0007_import_job"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="repo_dir",
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name="importjob",
+            name="stage",
+            field=models.CharField(max_length=30, null=True),
+        ),
+        migrations.CreateModel(
+            name="ImportJobEvent",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("stage", "Stage"), ("log", "Log")], max_length=10
+                    ),
+                ),
+                ("level", models.PositiveSmallIntegerField(null=True)),
+                ("message", models.TextField()),
+                (
+                    "job",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="events",
+                        to="edx_sysadmin.importjob",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("edx_sysadmin", "0008_import_job_events"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="coursegitlog",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("succeeded", "Succeeded"),
+                    ("failed", "Failed"),
+                    ("limit_exceeded", "Limit exceeded"),
+                ],
+                max_length=20,
+                null=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="courseimportstatus",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("succeeded", "Succeeded"),
+                    ("failed", "Failed"),
+                    ("limit_exceeded", "Limit exceeded"),
+                ],
+                max_length=20,
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("edx_sysadmin", "0010_import_job_cancel"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="coursegitlogterm",
+            name="message",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="terms",
+                to="edx_sysadmin.coursegitlogmessage",
+            ),
+        ),
+    ]
@@ -1,19 +1,245 @@
 """
 Database models for edx_sysadmin.
 """
+import zlib
+
+from django.conf import settings
 from django.db import models
 from jsonfield.fields import JSONField
 
 from opaque_keys.edx.django.models import CourseKeyField
 
 
+def compress_import_log(import_log):
+    """Compress the text of an import log for storage"""
+    if import_log is None:
+        return None
+    return zlib.compress(import_log.encode("utf-8"))
+
+
+def decompress_import_log(compressed_import_log):
+    """Decompress an import log stored by compress_import_log"""
+    if compressed_import_log is None:
+        return None
+    return zlib.decompress(bytes(compressed_import_log)).decode("utf-8")
+
+
 class CourseGitLog(models.Model):
     """CourseGitLog to store git-logs of courses imported from github"""
 
+    # Both import log columns can be huge, list queries should defer them
+    IMPORT_LOG_FIELDS = ("course_import_log", "course_import_log_compressed")
+
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    # Stopped by one of the time or resource limits of the git commands or import
+    STATUS_LIMIT_EXCEEDED = "limit_exceeded"
+    STATUS_CHOICES = (
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+        (STATUS_LIMIT_EXCEEDED, "Limit exceeded"),
+    )
+    FIRST_ERROR_MAX_LENGTH = 255
+
     course_id = CourseKeyField(max_length=255, db_index=True)
+    # Import logs of older rows, new ones are stored in course_import_log_compressed
     course_import_log = JSONField(null=True, blank=True)
+    course_import_log_compressed = models.BinaryField(null=True, blank=True)
     git_log = models.TextField(null=True, blank=True)
     repo_dir = models.CharField(max_length=255)
     commit = models.CharField(max_length=40, null=True)
     author = models.CharField(max_length=255)
     created = models.DateTimeField(auto_now_add=True, null=True)
+    # Summary of the import, computed when the log is written. Logs written
+    # before the summary was added have it empty.
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, null=True)
+    warning_count = models.PositiveIntegerField(null=True)
+    error_count = models.PositiveIntegerField(null=True)
+    first_error = models.CharField(max_length=FIRST_ERROR_MAX_LENGTH, null=True)
+    # Seconds taken by the git commands and the import
+    duration = models.FloatField(null=True)
+
+    class Meta:
+        indexes = [
+            # Git Logs pages and retention pruning list the logs of a course by date
+            models.Index(
+                fields=["course_id", "created", "id"],
+                name="sysadmin_gitlog_course_crtd",
+            ),
+            # Staff see the logs of every course by date
+            models.Index(fields=["created", "id"], name="sysadmin_gitlog_created"),
+            # Git Logs pages filtered on the outcome of the imports
+            models.Index(
+                fields=["status", "created", "id"], name="sysadmin_gitlog_status"
+            ),
+        ]
+
+    @property
+    def import_log(self):
+        """The import log text, decompressed when the row is stored compressed"""
+        if self.course_import_log_compressed is not None:
+            return decompress_import_log(self.course_import_log_compressed)
+        return self.course_import_log
+
+    @import_log.setter
+    def import_log(self, value):
+        self.course_import_log_compressed = compress_import_log(value)
+        self.course_import_log = None
+
+
+class CourseGitLogMessage(models.Model):
+    """A warning or error written while importing a course, indexed for search"""
+
+    course_git_log = models.ForeignKey(
+        CourseGitLog, on_delete=models.CASCADE, related_name="messages"
+    )
+    # Copied from the CourseGitLog so searches don't need to join it
+    course_id = CourseKeyField(max_length=255)
+    created = models.DateTimeField(null=True)
+    position = models.PositiveIntegerField()
+    level = models.PositiveSmallIntegerField()
+    message = models.TextField()
+
+    class Meta:
+        unique_together = [("course_git_log", "position")]
+        indexes = [
+            models.Index(
+                fields=["course_id", "created", "id"], name="sysadmin_gitlogmsg_course"
+            ),
+            models.Index(
+                fields=["level", "created", "id"], name="sysadmin_gitlogmsg_level"
+            ),
+            models.Index(fields=["created", "id"], name="sysadmin_gitlogmsg_created"),
+        ]
+
+
+class CourseGitLogTerm(models.Model):
+    """A search term of a CourseGitLogMessage, the inverted index of the messages"""
+
+    # Deleted explicitly along with their messages, see
+    # delete_course_git_logs_in_batches, so that deleting messages doesn't load
+    # them to cascade
+    message = models.ForeignKey(
+        CourseGitLogMessage, on_delete=models.DO_NOTHING, related_name="terms"
+    )
+    term = models.CharField(max_length=64)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["term", "message"], name="sysadmin_gitlogterm_term"),
+        ]
+
+
+class CourseImportStatus(models.Model):
+    """
+    The outcome of the latest git import of a course, kept up to date by every
+    import so the current state of all courses can be listed without going
+    through their logs
+    """
+
+    course_id = CourseKeyField(max_length=255, unique=True)
+    course_git_log = models.ForeignKey(
+        CourseGitLog, on_delete=models.SET_NULL, null=True, related_name="+"
+    )
+    repo_dir = models.CharField(max_length=255)
+    commit = models.CharField(max_length=40, null=True)
+    status = models.CharField(
+        max_length=20, choices=CourseGitLog.STATUS_CHOICES, null=True
+    )
+    error_count = models.PositiveIntegerField(null=True)
+    first_error = models.CharField(
+        max_length=CourseGitLog.FIRST_ERROR_MAX_LENGTH, null=True
+    )
+    duration = models.FloatField(null=True)
+    last_import = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [
+            # Broken courses first, the stalest of them first
+            models.Index(
+                fields=["status", "last_import"], name="sysadmin_importstatus_status"
+            ),
+            models.Index(fields=["last_import"], name="sysadmin_importstatus_import"),
+        ]
+
+
+class ImportJob(models.Model):
+    """A git import queued from the dashboard and run by a Celery worker"""
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUS_CANCELLED = "cancelled"
+    STATUS_CHOICES = (
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+        (STATUS_CANCELLED, "Cancelled"),
+    )
+    FINISHED_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED, STATUS_CANCELLED)
+
+    repo = models.CharField(max_length=255)
+    branch = models.CharField(max_length=255, null=True, blank=True)
+    # Directory of GIT_REPO_DIR the repo is imported into
+    repo_dir = models.CharField(max_length=255, null=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="+",
+    )
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED
+    )
+    # Latest git_import.STAGE_* reached by a running job
+    stage = models.CharField(max_length=30, null=True)
+    error = models.TextField(null=True, blank=True)
+    # Set on a running job to have its worker stop it at the next check
+    cancel_requested = models.BooleanField(default=False)
+    course_git_log = models.ForeignKey(
+        CourseGitLog, on_delete=models.SET_NULL, null=True, related_name="+"
+    )
+    task_id = models.CharField(max_length=255, null=True)
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True)
+    finished = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created", "id"], name="sysadmin_importjob_created"),
+        ]
+
+    @property
+    def is_finished(self):
+        """Whether the job is done, successfully or not"""
+        return self.status in self.FINISHED_STATUSES
+
+    @property
+    def duration(self):
+        """Seconds the job ran for, None until it finished"""
+        if self.started is None or self.finished is None:
+            return None
+        return (self.finished - self.started).total_seconds()
+
+
+class ImportJobEvent(models.Model):
+    """
+    A stage change or log line of a running ImportJob, written by the worker as
+    the import goes and read incrementally, in id order, by the browser
+    """
+
+    KIND_STAGE = "stage"
+    KIND_LOG = "log"
+    KIND_CHOICES = (
+        (KIND_STAGE, "Stage"),
+        (KIND_LOG, "Log"),
+    )
+
+    # The index of the foreign key also covers reading the events of a job by id
+    job = models.ForeignKey(ImportJob, on_delete=models.CASCADE, related_name="events")
+    created = models.DateTimeField(auto_now_add=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    level = models.PositiveSmallIntegerField(null=True)
+    message = models.TextField()
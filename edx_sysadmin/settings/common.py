@@ -10,3 +10,26 @@ def plugin_settings(settings):
     settings.GIT_REPO_DIR = "/edx/var/edxapp/course_repos"
     settings.GIT_IMPORT_STATIC = True
     settings.GIT_IMPORT_PYTHON_LIB = True
+    settings.GIT_IMPORT_USE_COMMAND = False
+    settings.GIT_IMPORT_LOG_LEVEL = "DEBUG"
+    settings.GIT_IMPORT_LOGGERS = None
+    settings.SYSADMIN_WEBHOOK_IMPORT_LOG_LEVEL = "WARNING"
+    settings.SYSADMIN_ORPHANED_REPO_MIN_AGE = 24 * 60 * 60
+    settings.SYSADMIN_GIT_MAINTENANCE_CONCURRENCY = 2
+    settings.GIT_IMPORT_RUNNING_TIMEOUT = 60 * 60
+    settings.GIT_COMMAND_TIMEOUT = 10 * 60
+    settings.GIT_COMMAND_CPU_LIMIT = None
+    settings.GIT_COMMAND_MEMORY_LIMIT = None
+    settings.GIT_IMPORT_TIMEOUT = 60 * 60
+    settings.GIT_IMPORT_CPU_LIMIT = None
+    settings.GIT_IMPORT_ISOLATED = False
+    settings.GIT_IMPORT_MEMORY_LIMIT = None
+    settings.GIT_IMPORT_PROCESS_MAX_IMPORTS = 10
+    settings.SYSADMIN_GIT_COURSE_DETAILS_CACHE_TIMEOUT = 24 * 60 * 60
+    settings.SYSADMIN_MAX_GIT_LOGS_THRESHOLD = None
+    settings.SYSADMIN_GIT_LOGS_MAX_AGE_DAYS = None
+    settings.SYSADMIN_GIT_LOGS_PRUNE_BATCH_SIZE = 1000
+    settings.SYSADMIN_GIT_LOGS_SHOW_COUNT = False
+    settings.SYSADMIN_GIT_LOGS_EXPORT_CHUNK_SIZE = 1000
+    settings.SYSADMIN_PERMISSIONS_CACHE_TIMEOUT = 5 * 60
+    settings.SYSADMIN_IMPORT_EVENTS_STREAM_TIMEOUT = 5
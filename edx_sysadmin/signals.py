@@ -0,0 +1,22 @@
+"""
+Signal handlers for edx_sysadmin.
+"""
+# pylint: disable=wrong-import-order
+from common.djangoapps.student.models import CourseAccessRole
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from edx_sysadmin.utils.utils import clear_instructor_course_ids
+
+
+@receiver(post_save, sender=CourseAccessRole)
+@receiver(post_delete, sender=CourseAccessRole)
+def course_access_role_changed(sender, instance, **kwargs):
+    """
+    Drop the cached instructor courses of a user whose roles changed. They are
+    dropped again on commit, in case another request cached them in between.
+    """
+    # pylint: disable=unused-argument
+    clear_instructor_course_ids(instance.user_id)
+    transaction.on_commit(lambda: clear_instructor_course_ids(instance.user_id))
@@ -0,0 +1,57 @@
+// Follows the import jobs listed with a data-events-url through their stream of
+// Server-Sent Events, showing the stage and log lines as the worker writes them.
+// The browser reconnects by itself when the server ends a stream, resuming after
+// the last event received.
+function followImportJob(row) {
+    let log = $("#import-job-log-" + row.data("job-id"));
+    let source = new EventSource(row.data("events-url"));
+
+    log.closest(".import-job-log").show();
+    source.addEventListener("stage", function(e) {
+        row.find(".job-stage").text(JSON.parse(e.data).message);
+    });
+    source.addEventListener("log", function(e) {
+        log.append(document.createTextNode(JSON.parse(e.data).message + "\n"));
+        log.scrollTop(log.prop("scrollHeight"));
+    });
+    source.addEventListener("end", function() {
+        source.close();
+        row.find(".job-stage").text("");
+        row.find(".job-cancel").empty();
+        updateImportJob(row);
+    });
+    source.addEventListener("error", function() {
+        if (source.readyState === EventSource.CLOSED) {
+            row.find(".job-error").text(row.data("error-text"));
+        }
+    });
+}
+
+// Shows the outcome of a finished job, pages without the job details reload to
+// list the new import log instead
+function updateImportJob(row) {
+    if (!row.data("job-url")) {
+        window.location.reload();
+        return;
+    }
+    $.getJSON(row.data("job-url")).done(function(job) {
+        row.find(".job-status").text(job.status_display);
+        row.find(".job-error").text(job.error || "");
+        if (job.duration !== null) {
+            row.find(".job-duration").text(job.duration.toFixed(1) + "s");
+        }
+        if (job.logs_url) {
+            row.find(".job-course").empty().append(
+                $("<a>").attr("href", job.logs_url).text(job.course_id)
+            );
+        }
+    }).fail(function() {
+        row.find(".job-error").text(row.data("error-text"));
+    });
+}
+
+$(function() {
+    $(".import-job[data-events-url]").each(function() {
+        followImportJob($(this));
+    });
+});
@@ -0,0 +1,79 @@
+"""
+Celery tasks for edx_sysadmin.
+
+The course import tasks themselves live in edx_sysadmin.git_import and
+edx_sysadmin.import_jobs, they are imported here so that workers discovering this
+module register every task of the plugin.
+"""
+# pylint: disable=wrong-import-order,unused-import
+
+import logging
+
+from celery import shared_task
+
+from edx_sysadmin import maintenance
+from edx_sysadmin.git_import import add_repo
+from edx_sysadmin.import_jobs import (
+    fail_stale_import_jobs,
+    prune_import_job_events,
+    run_import_job,
+)
+from edx_sysadmin.utils.utils import prune_course_git_logs
+
+log = logging.getLogger(__name__)
+
+
+@shared_task()
+def remove_orphaned_repos(delete=False):
+    """
+    Finds (and optionally removes) repo directories and course symlinks in
+    GIT_REPO_DIR that no longer belong to any course.
+    Runs as a dry run unless delete is True.
+    """
+    orphans = maintenance.find_orphaned_repos()
+    if delete:
+        orphans = maintenance.remove_orphaned_repos(orphans)
+
+    total_size = sum(orphan.size for orphan in orphans)
+    log.info(
+        "%s %d orphaned repo paths using %d bytes",
+        "Removed" if delete else "Found",
+        len(orphans),
+        total_size,
+    )
+    return [orphan._asdict() for orphan in orphans]
+
+
+@shared_task()
+def run_git_maintenance(concurrency=None):
+    """
+    Repacks, prunes and writes commit-graphs for every repo in GIT_REPO_DIR
+    """
+    results = maintenance.run_git_maintenance_for_all(concurrency=concurrency)
+    log.info(
+        "Git maintenance finished for %d repos, %d bytes saved",
+        len(results),
+        sum(
+            result.size_before - result.size_after
+            for result in results
+            if result.size_before is not None
+        ),
+    )
+    return [result._asdict() for result in results]
+
+
+@shared_task()
+def prune_git_logs():
+    """
+    Removes the CourseGitLog rows beyond the configured per course count and age,
+    along with the events of the import jobs finished long enough ago. Import
+    jobs left behind by a lost worker are failed first, so that their events
+    get pruned too.
+    """
+    stale_count = fail_stale_import_jobs()
+    log.info("Failed %d stale import jobs", stale_count)
+    deletion_count = prune_course_git_logs()
+    log.info("Pruned %d CourseGitLog rows", deletion_count)
+    event_count = prune_import_job_events()
+    log.info("Pruned %d ImportJobEvent rows", event_count)
+    return deletion_count
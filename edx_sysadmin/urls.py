@@ -8,7 +8,11 @@ from edx_sysadmin.views import (
     CoursesPanel,
     UsersPanel,
     GitImport,
+    ImportJobStatus,
+    ImportJobEvents,
+    GitLogImportLog,
     GitLogs,
+    ImportStatusPanel,
 )
 
 app_name = "sysadmin"
@@ -18,8 +22,24 @@ urlpatterns = [
     url("^$", SysadminDashboardRedirectionView.as_view(), name="sysadmin"),
     url(r"^courses/?$", CoursesPanel.as_view(), name="courses"),
     url(r"^gitimport/$", GitImport.as_view(), name="gitimport"),
+    url(
+        r"^gitimport/jobs/(?P<job_id>\d+)/$",
+        ImportJobStatus.as_view(),
+        name="gitimport_job",
+    ),
+    url(
+        r"^gitimport/jobs/(?P<job_id>\d+)/events/$",
+        ImportJobEvents.as_view(),
+        name="gitimport_job_events",
+    ),
     url(r"^gitlogs/?$", GitLogs.as_view(), name="gitlogs"),
+    url(
+        r"^gitlogs/(?P<log_id>\d+)/import_log/$",
+        GitLogImportLog.as_view(),
+        name="gitlog_import_log",
+    ),
     url(r"^gitlogs/(?P<course_id>.+)$", GitLogs.as_view(), name="gitlogs_detail"),
+    url(r"^importstatus/$", ImportStatusPanel.as_view(), name="importstatus"),
     url(r"^users/$", UsersPanel.as_view(), name="users"),
     url(r"^api/", include("edx_sysadmin.api.urls", namespace="api")),
 ]
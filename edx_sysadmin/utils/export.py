@@ -0,0 +1,137 @@
+"""
+Helpers for exporting git import logs.
+"""
+import csv
+import json
+
+from django.conf import settings
+
+from edx_sysadmin.models import CourseGitLog
+
+DEFAULT_GIT_LOGS_EXPORT_CHUNK_SIZE = 1000
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+EXPORT_FIELDS = (
+    "id",
+    "course_id",
+    "repo_dir",
+    "commit",
+    "author",
+    "created",
+    "status",
+    "warning_count",
+    "error_count",
+    "first_error",
+    "duration",
+    "git_log",
+)
+
+
+class Echo:
+    """
+    File-like object which returns what is written to it, so that csv.writer
+    can format a single row at a time
+    """
+
+    def write(self, value):
+        """Return the value instead of storing it"""
+        return value
+
+
+def get_git_logs_for_export(course_id=None, since=None, until=None, status=None):
+    """
+    Get the git logs to export
+    :param course_id: only export the logs of this course
+    :param since: only export logs created at or after this datetime
+    :param until: only export logs created before this datetime
+    :param status: only export logs of imports with this status
+    :return QuerySet: CourseGitLog objects, without their import logs
+    """
+    queryset = CourseGitLog.objects.defer(*CourseGitLog.IMPORT_LOG_FIELDS)
+    if course_id is not None:
+        queryset = queryset.filter(course_id=course_id)
+    if since is not None:
+        queryset = queryset.filter(created__gte=since)
+    if until is not None:
+        queryset = queryset.filter(created__lt=until)
+    if status is not None:
+        queryset = queryset.filter(status=status)
+    return queryset
+
+
+def iterate_in_chunks(queryset, chunk_size=None):
+    """
+    Iterate over a queryset in id order, fetching chunk_size rows per query.
+    Every chunk starts after the last id of the previous one, so memory stays
+    constant and the database never has to skip over exported rows.
+    """
+    if chunk_size is None:
+        chunk_size = getattr(
+            settings,
+            "SYSADMIN_GIT_LOGS_EXPORT_CHUNK_SIZE",
+            DEFAULT_GIT_LOGS_EXPORT_CHUNK_SIZE,
+        )
+    last_id = 0
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id).order_by("id")[:chunk_size])
+        yield from chunk
+        if len(chunk) < chunk_size:
+            return
+        last_id = chunk[-1].id
+
+
+def serialize_git_log(course_git_log, include_import_log=False):
+    """
+    Get the exported values of a git log
+    :return dict: values of EXPORT_FIELDS, and the import log if asked for
+    """
+    data = {
+        "id": course_git_log.id,
+        "course_id": str(course_git_log.course_id or ""),
+        "repo_dir": course_git_log.repo_dir,
+        "commit": course_git_log.commit,
+        "author": course_git_log.author,
+        "created": (
+            course_git_log.created.isoformat() if course_git_log.created else None
+        ),
+        "status": course_git_log.status,
+        "warning_count": course_git_log.warning_count,
+        "error_count": course_git_log.error_count,
+        "first_error": course_git_log.first_error,
+        "duration": course_git_log.duration,
+        "git_log": course_git_log.git_log,
+    }
+    if include_import_log:
+        data["import_log"] = course_git_log.import_log
+    return data
+
+
+def export_git_logs(queryset, file_format, include_import_log=False, chunk_size=None):
+    """
+    Stream git logs as NDJSON or CSV
+    :param queryset: CourseGitLog objects to export, e.g from get_git_logs_for_export
+    :param file_format: one of EXPORT_FORMATS
+    :param include_import_log: also export the (possibly huge) import logs
+    :param chunk_size: number of rows fetched per query
+    :return generator: the export, one line (or CSV row) at a time
+    """
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {file_format}")
+    if include_import_log:
+        queryset = queryset.defer(None)
+
+    fields = EXPORT_FIELDS + (("import_log",) if include_import_log else ())
+    writer = csv.writer(Echo())
+    if file_format == "csv":
+        yield writer.writerow(fields)
+
+    for course_git_log in iterate_in_chunks(queryset, chunk_size):
+        data = serialize_git_log(course_git_log, include_import_log)
+        if file_format == "csv":
+            yield writer.writerow([data[field] for field in fields])
+        else:
+            yield json.dumps(data) + "\n"
@@ -0,0 +1,24 @@
+"""
+Resource limits of the commands started by the plugin.
+"""
+
+
+def limit_command(cmd, cpu_limit=None, memory_limit=None):
+    """
+    Wraps a command in a shell applying the limits with ulimit before it starts.
+    The limits can't be set from a preexec_fn, which may deadlock the child
+    between fork and exec when the parent runs threads.
+    :param cmd: list of the command and its arguments
+    :param cpu_limit: seconds of CPU time, None for no limit
+    :param memory_limit: bytes of address space, None for no limit
+    :return list: the wrapped command, cmd itself when there's no limit
+    """
+    limits = []
+    if cpu_limit:
+        limits.append(f"ulimit -t {int(cpu_limit)}")
+    if memory_limit:
+        limits.append(f"ulimit -v {int(memory_limit) // 1024}")
+    if not limits:
+        return cmd
+    # The shell is replaced by the command, which keeps its pid and exit status
+    return ["/bin/sh", "-c", " && ".join(limits) + ' && exec "$@"', "sh"] + list(cmd)
@@ -0,0 +1,131 @@
+"""
+Helpers for cursor based pagination.
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """
+    Raised when a pagination cursor can't be decoded.
+    """
+
+
+def encode_cursor(*position):
+    """
+    Encodes the position of the last item of a page into an opaque cursor
+    :param position: JSON serializable values identifying the item
+    :return str: url-safe cursor
+    """
+    return (
+        base64.urlsafe_b64encode(json.dumps(position).encode("utf-8"))
+        .decode("ascii")
+        .rstrip("=")
+    )
+
+
+def decode_cursor(cursor, length):
+    """
+    Decodes a cursor made by encode_cursor
+    :param cursor: cursor from the request, may be empty
+    :param length: number of values the position must contain
+    :return list: the position or None if there was no cursor
+    """
+    if not cursor:
+        return None
+    try:
+        position = json.loads(
+            base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        )
+    except (ValueError, UnicodeDecodeError) as error:
+        raise InvalidCursor(str(error)) from error
+    if not isinstance(position, list) or len(position) != length:
+        raise InvalidCursor("Unexpected cursor position")
+    return position
+
+
+class KeysetPage:
+    """
+    A page of rows of a keyset paginated queryset.
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _created_position(obj):
+    """The keyset position of a row: its creation time and id"""
+    return encode_cursor(obj.created.isoformat(), obj.id)
+
+
+def _decode_created_position(cursor):
+    """Decodes a cursor made by _created_position"""
+    position = decode_cursor(cursor, 2)
+    if position is None:
+        return None
+    try:
+        return datetime.fromisoformat(position[0]), int(position[1])
+    except (TypeError, ValueError) as error:
+        raise InvalidCursor(str(error)) from error
+
+
+def paginate_by_created(queryset, page_size, after=None, before=None):
+    """
+    Paginates a queryset newest first on (created, id), so that every page is a single
+    indexed range query whatever its depth, without counting or skipping rows.
+    :param queryset: rows with created and id fields
+    :param page_size: number of rows per page
+    :param after: next_cursor of a page, to get the page of older rows following it
+    :param before: previous_cursor of a page, to get the page of newer rows preceding it
+    :return KeysetPage: the requested page
+    """
+    before_position = _decode_created_position(before)
+    after_position = _decode_created_position(after)
+
+    if before_position is not None:
+        created, pk = before_position
+        rows = list(
+            queryset.filter(
+                Q(created__gt=created) | Q(created=created, id__gt=pk)
+            ).order_by("created", "id")[: page_size + 1]
+        )
+        has_previous = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        has_next = True
+    else:
+        if after_position is not None:
+            created, pk = after_position
+            queryset = queryset.filter(
+                Q(created__lt=created) | Q(created=created, id__lt=pk)
+            )
+        rows = list(queryset.order_by("-created", "-id")[: page_size + 1])
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        has_previous = after_position is not None
+
+    if not rows:
+        return KeysetPage(rows)
+    return KeysetPage(
+        rows,
+        next_cursor=_created_position(rows[-1]) if has_next else None,
+        previous_cursor=_created_position(rows[0]) if has_previous else None,
+    )
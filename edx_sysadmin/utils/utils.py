@@ -6,31 +6,62 @@ import json
 import logging
 import os
 import urllib.parse
+from datetime import datetime, time, timedelta
 
 import requests
-from common.djangoapps.student.models import UserProfile
+from common.djangoapps.student.models import CourseAccessRole, UserProfile
 from common.djangoapps.student.roles import CourseInstructorRole
 from common.djangoapps.util.password_policy_validators import normalize_password
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count, Max, Q
 from django.http import Http404
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.functional import cached_property
 from django.utils.translation import gettext as _
 from django_countries import countries
+from edx_django_utils.cache import RequestCache
 from git import InvalidGitRepositoryError, NoSuchPathError, Repo
 from openedx.core.djangoapps.user_authn.toggles import (
     is_require_third_party_auth_enabled,
 )
+from opaque_keys.edx.keys import CourseKey
 from xmodule.modulestore.django import modulestore
 
-from edx_sysadmin.models import CourseGitLog
+from edx_sysadmin.models import (
+    CourseGitLog,
+    CourseGitLogMessage,
+    CourseGitLogTerm,
+    CourseImportStatus,
+)
 from edx_sysadmin.utils.markup import HTML, Text
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
 DEFAULT_GIT_REPO_PREFIX = "refs/heads/"
+DEFAULT_GIT_LOGS_PRUNE_BATCH_SIZE = 1000
+INSTRUCTOR_COURSE_IDS_CACHE_NAMESPACE = "edx_sysadmin.instructor_course_ids"
+SYSADMIN_PERMISSIONS_CACHE_NAMESPACE = "edx_sysadmin.permissions"
+INSTRUCTOR_COURSE_IDS_CACHE_KEY = "edx_sysadmin.instructor_course_ids.{0}"
+DEFAULT_PERMISSIONS_CACHE_TIMEOUT = 5 * 60
+# Orderings of the course import statuses, "status" lists failed imports first
+# and, like "last_import", the stalest courses first
+IMPORT_STATUS_ORDERINGS = {
+    "status": ("status", "last_import", "id"),
+    "-status": ("-status", "last_import", "id"),
+    "last_import": ("last_import", "id"),
+    "-last_import": ("-last_import", "-id"),
+    "error_count": ("error_count", "last_import", "id"),
+    "-error_count": ("-error_count", "last_import", "id"),
+    "duration": ("duration", "id"),
+    "-duration": ("-duration", "id"),
+}
+DEFAULT_IMPORT_STATUS_ORDERING = "status"
 
 
 def get_course_by_id(course_key, depth=0):
@@ -333,20 +364,90 @@ def get_fields_and_default_values_map():
     }
 
 
+class SysadminPermissions:
+    """
+    The sysadmin panels a user has access to, computed once per request by
+    get_sysadmin_permissions
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.is_staff = bool(user and user.is_staff)
+
+    @cached_property
+    def instructor_course_ids(self):
+        """Ids of the courses the user is an instructor of"""
+        return get_instructor_course_ids(self.user)
+
+    @property
+    def users_panel(self):
+        """Access to the "Users" panel"""
+        return self.is_staff
+
+    @property
+    def courses_panel(self):
+        """Access to the "Courses" panel"""
+        return self.is_staff
+
+    @property
+    def git_import_panel(self):
+        """Access to the "Git Import" panel"""
+        return self.is_staff
+
+    @property
+    def git_logs_panel(self):
+        """Access to the "Git Logs" panel, staff don't need the role query"""
+        return self.is_staff or bool(self.instructor_course_ids)
+
+    @property
+    def import_status_panel(self):
+        """Access to the "Import Status" panel"""
+        return self.git_logs_panel
+
+    @property
+    def sysadmin(self):
+        """Access to any of the panels"""
+        return (
+            self.users_panel
+            or self.courses_panel
+            or self.git_logs_panel
+            or self.git_import_panel
+        )
+
+    def can_view_course_logs(self, course_id):
+        """
+        Checks if the user may see the git logs of a course
+        :param course_id: CourseKey object
+        :return boolean: True for staff and instructors of the course else False
+        """
+        return self.is_staff or course_id in self.instructor_course_ids
+
+
+def get_sysadmin_permissions(user):
+    """
+    Get the sysadmin permissions of a user, memoized for the current request so
+    that the access checks of the decorators, views and templates share them
+    :param user: User object of currently loggedin user
+    :return SysadminPermissions: permissions of the user
+    """
+    if not (user and user.is_authenticated):
+        return SysadminPermissions(user)
+    request_cache = RequestCache(SYSADMIN_PERMISSIONS_CACHE_NAMESPACE)
+    cached_response = request_cache.get_cached_response(user.id)
+    if cached_response.is_found and cached_response.value.user is user:
+        return cached_response.value
+    permissions = SysadminPermissions(user)
+    request_cache.set(user.id, permissions)
+    return permissions
+
+
 def user_has_access_to_sysadmin(user):
     """
     Checks if user has access to sysadmin panel or not
     :param user: User object of currently loggedin user
     :return boolean: True if user has access to syadmin else False
     """
-    if (
-        user_has_access_to_users_panel(user)
-        or user_has_access_to_courses_panel(user)
-        or user_has_access_to_git_logs_panel(user)
-        or user_has_access_to_git_import_panel(user)
-    ):
-        return True
-    return False
+    return get_sysadmin_permissions(user).sysadmin
 
 
 def show_sysadmin_dashboard(user):
@@ -363,9 +464,7 @@ def user_has_access_to_users_panel(user):
     :param user: User object of currently loggedin user
     :return boolean: True if user has access to "Users" panel else False
     """
-    if user and user.is_staff:
-        return True
-    return False
+    return get_sysadmin_permissions(user).users_panel
 
 
 def user_has_access_to_courses_panel(user):
@@ -374,9 +473,65 @@ def user_has_access_to_courses_panel(user):
     :param user: User object of currently loggedin user
     :return boolean: True if user has access to "Courses" panel else False
     """
-    if user and user.is_staff:
-        return True
-    return False
+    return get_sysadmin_permissions(user).courses_panel
+
+
+def get_instructor_course_roles(user):
+    """
+    Get the instructor roles of a user, e.g as a subquery of the user's courses
+    :param user: User object
+    :return QuerySet: CourseAccessRole objects
+    """
+    return CourseAccessRole.objects.filter(user=user, role=CourseInstructorRole.ROLE)
+
+
+def get_instructor_course_ids(user):
+    """
+    Get the ids of the courses a user is an instructor of. They are kept in the
+    request cache and, for SYSADMIN_PERMISSIONS_CACHE_TIMEOUT seconds, in the
+    django cache, and dropped from both when the user's roles change.
+    :param user: User object
+    :return frozenset: CourseKey objects
+    """
+    if not (user and user.is_authenticated):
+        return frozenset()
+    request_cache = RequestCache(INSTRUCTOR_COURSE_IDS_CACHE_NAMESPACE)
+    cached_response = request_cache.get_cached_response(user.id)
+    if cached_response.is_found:
+        return cached_response.value
+
+    cache_key = INSTRUCTOR_COURSE_IDS_CACHE_KEY.format(user.id)
+    course_ids = cache.get(cache_key)
+    if course_ids is None:
+        course_ids = [
+            str(course_id)
+            for course_id in get_instructor_course_roles(user).values_list(
+                "course_id", flat=True
+            )
+            if course_id
+        ]
+        cache.set(
+            cache_key,
+            course_ids,
+            getattr(
+                settings,
+                "SYSADMIN_PERMISSIONS_CACHE_TIMEOUT",
+                DEFAULT_PERMISSIONS_CACHE_TIMEOUT,
+            ),
+        )
+    course_ids = frozenset(CourseKey.from_string(course_id) for course_id in course_ids)
+    request_cache.set(user.id, course_ids)
+    return course_ids
+
+
+def clear_instructor_course_ids(user_id):
+    """
+    Drop the cached instructor courses and permissions of a user
+    :param user_id: id of the User
+    """
+    cache.delete(INSTRUCTOR_COURSE_IDS_CACHE_KEY.format(user_id))
+    RequestCache(INSTRUCTOR_COURSE_IDS_CACHE_NAMESPACE).delete(user_id)
+    RequestCache(SYSADMIN_PERMISSIONS_CACHE_NAMESPACE).delete(user_id)
 
 
 def user_has_access_to_git_logs_panel(user):
@@ -385,12 +540,16 @@ def user_has_access_to_git_logs_panel(user):
     :param user: User object of currently loggedin user
     :return boolean: True if user has access to "Git Logs" panel else False
     """
-    if user and (
-        user.is_staff
-        or user.courseaccessrole_set.filter(role=CourseInstructorRole.ROLE).exists()
-    ):
-        return True
-    return False
+    return get_sysadmin_permissions(user).git_logs_panel
+
+
+def user_has_access_to_import_status_panel(user):
+    """
+    Checks if user has access to "Import Status" panel or not
+    :param user: User object of currently loggedin user
+    :return boolean: True if user has access to "Import Status" panel else False
+    """
+    return get_sysadmin_permissions(user).import_status_panel
 
 
 def user_has_access_to_git_import_panel(user):
@@ -399,32 +558,173 @@ def user_has_access_to_git_import_panel(user):
     :param user: User object of currently loggedin user
     :return boolean: True if user has access to "Git Import" panel else False
     """
-    if user and user.is_staff:
-        return True
-    return False
+    return get_sysadmin_permissions(user).git_import_panel
+
+
+def delete_course_git_logs_in_batches(queryset, batch_size):
+    """
+    Deletes the CourseGitLog of a queryset batch_size rows at a time, so that
+    no statement locks or lists more than batch_size rows
+    :param queryset: CourseGitLog queryset to delete
+    :param batch_size: number of rows deleted per statement
+    :return int: Count of deleted logs
+    """
+    deletion_count = 0
+    while True:
+        ids = list(queryset.values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return deletion_count
+        # The terms don't cascade, so that the messages and terms are each
+        # removed by a single statement instead of being loaded in memory
+        CourseGitLogTerm.objects.filter(message__course_git_log_id__in=ids).delete()
+        CourseGitLogMessage.objects.filter(course_git_log_id__in=ids).delete()
+        _, deleted = CourseGitLog.objects.filter(id__in=ids).delete()
+        deletion_count += deleted.get(CourseGitLog._meta.label, 0)
 
 
-def remove_old_course_import_logs(course_id):
+def remove_old_course_import_logs(course_id, threshold, batch_size=None):
     """
-    Removes old CourseGitLog if the log count increases the settings.SYSADMIN_MAX_GIT_LOGS_THRESHOLD
+    Removes the CourseGitLog of a course beyond the threshold latest ones
     :param course_id: CourseLocation object to target specific logs
+    :param threshold: number of latest logs to keep
+    :param batch_size: number of rows deleted per statement
     :return int: Count of deleted logs if anything gets deleted else 0
     """
-    if hasattr(settings, "SYSADMIN_MAX_GIT_LOGS_THRESHOLD") and isinstance(
-        settings.SYSADMIN_MAX_GIT_LOGS_THRESHOLD, int
-    ):
-        threshold = settings.SYSADMIN_MAX_GIT_LOGS_THRESHOLD
-        deletion_count, _ = CourseGitLog.objects.filter(
-            id__in=list(
-                CourseGitLog.objects.filter(course_id=course_id)
-                .order_by("-created")
-                .values_list("id", flat=True)[threshold:]
+    course_logs = CourseGitLog.objects.filter(course_id=course_id)
+    cutoff = (
+        course_logs.order_by("-created", "-id")
+        .values_list("created", "id")[threshold:]
+        .first()
+    )
+    if cutoff is None:
+        return 0
+
+    created, pk = cutoff
+    return delete_course_git_logs_in_batches(
+        course_logs.filter(Q(created__lt=created) | Q(created=created, id__lte=pk)),
+        batch_size or DEFAULT_GIT_LOGS_PRUNE_BATCH_SIZE,
+    )
+
+
+def get_retention_setting(name):
+    """
+    Reads a retention setting of the git logs as a number of logs or days
+    :return int: the setting, None if it isn't set
+    """
+    value = getattr(settings, name, None)
+    if value is None or value == "":
+        return None
+    return int(value)
+
+
+def prune_course_git_logs(max_per_course=None, max_age_days=None, batch_size=None):
+    """
+    Applies the retention policy to the CourseGitLog of every course
+    :param max_per_course: number of latest logs kept per course,
+        defaults to settings.SYSADMIN_MAX_GIT_LOGS_THRESHOLD
+    :param max_age_days: logs older than this many days are removed,
+        defaults to settings.SYSADMIN_GIT_LOGS_MAX_AGE_DAYS
+    :param batch_size: number of rows deleted per statement,
+        defaults to settings.SYSADMIN_GIT_LOGS_PRUNE_BATCH_SIZE
+    :return int: Count of deleted logs
+    """
+    if max_per_course is None:
+        max_per_course = get_retention_setting("SYSADMIN_MAX_GIT_LOGS_THRESHOLD")
+    if max_age_days is None:
+        max_age_days = get_retention_setting("SYSADMIN_GIT_LOGS_MAX_AGE_DAYS")
+    if batch_size is None:
+        batch_size = getattr(
+            settings,
+            "SYSADMIN_GIT_LOGS_PRUNE_BATCH_SIZE",
+            DEFAULT_GIT_LOGS_PRUNE_BATCH_SIZE,
+        )
+
+    deletion_count = 0
+    if max_age_days is not None:
+        deletion_count += delete_course_git_logs_in_batches(
+            CourseGitLog.objects.filter(
+                created__lt=timezone.now() - timedelta(days=max_age_days)
+            ),
+            batch_size,
+        )
+
+    if max_per_course is not None:
+        courses_over_threshold = (
+            CourseGitLog.objects.values("course_id")
+            .annotate(log_count=Count("id"))
+            .filter(log_count__gt=max_per_course)
+            .values_list("course_id", flat=True)
+        )
+        for course_id in list(courses_over_threshold):
+            deletion_count += remove_old_course_import_logs(
+                course_id, max_per_course, batch_size
             )
-        ).delete()
 
-        return deletion_count
-    else:
-        return 0
+    return deletion_count
+
+
+def get_latest_course_git_logs(course_keys):
+    """
+    Get the latest CourseGitLog of every given course, without its import log
+    :param course_keys: list of CourseLocator objects
+    :return dict: CourseGitLog objects keyed by course id
+    """
+    latest_ids = (
+        CourseGitLog.objects.filter(course_id__in=course_keys)
+        .values("course_id")
+        .annotate(latest_id=Max("id"))
+        .values("latest_id")
+    )
+    return {
+        course_git_log.course_id: course_git_log
+        for course_git_log in CourseGitLog.objects.filter(id__in=latest_ids).defer(
+            *CourseGitLog.IMPORT_LOG_FIELDS
+        )
+    }
+
+
+def update_course_import_status(course_git_log):
+    """
+    Record a git log as the latest import of its course
+    :param course_git_log: CourseGitLog of the import
+    :return CourseImportStatus: the updated status, None if no course was imported
+    """
+    if not course_git_log.course_id:
+        return None
+    course_import_status, _created = CourseImportStatus.objects.update_or_create(
+        course_id=course_git_log.course_id,
+        defaults={
+            "course_git_log": course_git_log,
+            "repo_dir": course_git_log.repo_dir,
+            "commit": course_git_log.commit,
+            "status": course_git_log.status,
+            "error_count": course_git_log.error_count,
+            "first_error": course_git_log.first_error,
+            "duration": course_git_log.duration,
+            "last_import": course_git_log.created,
+        },
+    )
+    return course_import_status
+
+
+def get_course_import_statuses(user=None, status=None, sort=None):
+    """
+    Get the latest import of every course
+    :param user: only get the courses this user is an instructor of, unless staff
+    :param status: only get the courses whose latest import has this status
+    :param sort: one of IMPORT_STATUS_ORDERINGS, by default failed imports first
+    :return QuerySet: CourseImportStatus objects
+    """
+    queryset = CourseImportStatus.objects.all()
+    if user is not None and not user.is_staff:
+        queryset = queryset.filter(
+            course_id__in=get_instructor_course_roles(user).values("course_id")
+        )
+    if status:
+        queryset = queryset.filter(status=status)
+    return queryset.order_by(
+        *IMPORT_STATUS_ORDERINGS[sort or DEFAULT_IMPORT_STATUS_ORDERING]
+    )
 
 
 def get_local_course_repo(repo_name):
@@ -458,6 +758,37 @@ def get_local_active_branch(repo):
         return None
 
 
+def get_git_ref_state(git_dir):
+    """
+    Get the state of the checked out ref of a repo using only a few stat calls
+    :params git_dir (str): path of a course repo
+    :return tuple: identifies HEAD and the mtimes of its ref files, any fetch or reset
+        changes it. None if the state can't be determined (e.g not a git repo)
+    """
+    dot_git = os.path.join(git_dir, ".git")
+    head_path = os.path.join(dot_git, "HEAD")
+    try:
+        with open(head_path) as head_file:
+            head = head_file.read().strip()
+    except OSError:
+        return None
+
+    state = [os.path.realpath(git_dir), head]
+    ref_paths = [head_path, os.path.join(dot_git, "FETCH_HEAD")]
+    if head.startswith("ref: "):
+        ref_paths += [
+            os.path.join(dot_git, head.partition("ref: ")[2]),
+            os.path.join(dot_git, "packed-refs"),
+        ]
+    for ref_path in ref_paths:
+        try:
+            stat = os.stat(ref_path)
+            state.append((stat.st_ino, stat.st_mtime_ns))
+        except FileNotFoundError:
+            state.append(None)
+    return tuple(state)
+
+
 def get_clean_branch_name(branch_name):
     """
     Get a clean branch name from pushed branch of a webhook payload
@@ -466,3 +797,20 @@ def get_clean_branch_name(branch_name):
     """
 
     return branch_name.replace(DEFAULT_GIT_REPO_PREFIX, "")
+
+
+def parse_datetime_param(value):
+    """
+    Parse a date or datetime given as a request or command parameter
+    :params value (str): ISO 8601 date (e.g 2021-05-04) or datetime
+    :return datetime: timezone aware datetime, dates are taken as midnight UTC
+    """
+    parsed = parse_datetime(value)
+    if parsed is None:
+        date = parse_date(value)
+        if date is None:
+            raise ValueError(_("Invalid date: {}").format(value))
+        parsed = datetime.combine(date, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.utc)
+    return parsed
@@ -3,43 +3,60 @@ Views for the Open edX SysAdmin Plugin
 """
 # pylint: disable=wrong-import-order
 import logging
-from io import StringIO
+from hashlib import sha1
 
-from common.djangoapps.student.roles import CourseInstructorRole
+from django.conf import settings
 from django.contrib.auth.decorators import user_passes_test
-from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
-from django.http import Http404
+from django.db import transaction
+from django.db.models import Count, Max, Min
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from django.shortcuts import render
 from django.urls import reverse
+from django.utils.cache import patch_cache_control
 from django.utils.decorators import method_decorator
 from django.utils.html import escape
+from django.utils.translation import get_language
 from django.utils.translation import gettext as _
-from django.views.decorators.cache import cache_control
+from django.views.decorators.cache import cache_control, never_cache
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.views.decorators.http import condition
-from django.views.generic.base import RedirectView, TemplateView
+from django.views.generic.base import RedirectView, TemplateView, View
+from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
 from opaque_keys.edx.keys import CourseKey
 from xmodule.modulestore.django import modulestore
 
-from edx_sysadmin import git_import
 from edx_sysadmin.forms import UserRegistrationForm
-from edx_sysadmin.git_import import GitImportError
-from edx_sysadmin.models import CourseGitLog
+from edx_sysadmin.import_jobs import (
+    cancel_import_job,
+    queue_import_job,
+    stream_import_job_events,
+)
+from edx_sysadmin.models import CourseGitLog, CourseImportStatus, ImportJob
 from edx_sysadmin.utils.markup import HTML, Text
+from edx_sysadmin.utils.pagination import InvalidCursor, paginate_by_created
 from edx_sysadmin.utils.utils import (
     create_user_account,
+    IMPORT_STATUS_ORDERINGS,
     get_course_by_id,
+    get_course_import_statuses,
+    get_instructor_course_roles,
+    get_sysadmin_permissions,
     get_registration_required_extra_fields_with_values,
     is_registration_api_functional,
     user_has_access_to_courses_panel,
     user_has_access_to_git_import_panel,
     user_has_access_to_git_logs_panel,
+    user_has_access_to_import_status_panel,
     user_has_access_to_sysadmin,
     user_has_access_to_users_panel,
 )
 
 log = logging.getLogger(__name__)
 
+# Number of latest import jobs listed in the Git Import panel
+IMPORT_JOBS_SHOWN = 20
+
 
 @method_decorator(
     user_passes_test(
@@ -53,13 +70,14 @@ class SysadminDashboardRedirectionView(RedirectView):
     def get_redirect_url(self, *args, **kwargs):
         """Override redirection_url"""
 
-        if user_has_access_to_users_panel(self.request.user):
+        permissions = get_sysadmin_permissions(self.request.user)
+        if permissions.users_panel:
             return reverse("sysadmin:users")
-        elif user_has_access_to_courses_panel(self.request.user):
+        elif permissions.courses_panel:
             return reverse("sysadmin:courses")
-        elif user_has_access_to_git_logs_panel(self.request.user):
+        elif permissions.git_logs_panel:
             return reverse("sysadmin:gitlogs")
-        elif user_has_access_to_git_import_panel(self.request.user):
+        elif permissions.git_import_panel:
             return reverse("sysadmin:gitimport")
         else:
             raise Http404
@@ -72,30 +90,75 @@ class SysadminDashboardRedirectionView(RedirectView):
     ),
     name="dispatch",
 )
-@method_decorator(
-    cache_control(no_cache=True, no_store=True, must_revalidate=True), name="dispatch"
-)
-@method_decorator(condition(etag_func=None), name="dispatch")
 class SysadminDashboardBaseView(TemplateView):
     """Base view for SysAdmin Dashboard's Panels."""
 
     template_name = "edx_sysadmin/base.html"
 
+    def get_panel_version(self):
+        """
+        Returns a value that changes whenever the data shown by the panel changes,
+        used to answer conditional GET requests. None disables them for the panel.
+        """
+        return None
+
+    def get_last_modified(self, request, *args, **kwargs):
+        """
+        Returns the time the data shown by the panel last changed, or None
+        """
+        return None
+
+    def get_etag(self, request, *args, **kwargs):
+        """
+        Builds the ETag of a GET request from the panel version and everything
+        else that changes the rendered page (user, csrf cookie, url and language)
+        """
+        if request.method not in ("GET", "HEAD"):
+            return None
+        version = self.get_panel_version()
+        if version is None:
+            return None
+        return sha1(
+            repr(
+                (
+                    request.user.pk,
+                    request.COOKIES.get(settings.CSRF_COOKIE_NAME),
+                    request.get_full_path(),
+                    get_language(),
+                    version,
+                )
+            ).encode("utf-8")
+        ).hexdigest()
+
+    def dispatch(self, request, *args, **kwargs):
+        """
+        Answers conditional GET requests with 304 when the panel is unchanged
+        """
+        response = condition(
+            etag_func=self.get_etag, last_modified_func=self.get_last_modified
+        )(super().dispatch)(request, *args, **kwargs)
+
+        # Pages with validators are stored by the browser but always revalidated,
+        # everything else must not be stored at all.
+        patch_cache_control(response, private=True, no_cache=True, must_revalidate=True)
+        if not response.has_header("ETag"):
+            patch_cache_control(response, no_store=True)
+        return response
+
     def get_context_data(self, **kwargs):
         """
         Overriding get_context_data method to add custom fields
         """
         context = super().get_context_data(**kwargs)
+        permissions = get_sysadmin_permissions(self.request.user)
         context.update(
             {
-                "show_users_tab": user_has_access_to_users_panel(self.request.user),
-                "show_courses_tab": user_has_access_to_courses_panel(self.request.user),
-                "show_git_logs_tab": user_has_access_to_git_logs_panel(
-                    self.request.user
-                ),
-                "show_git_import_tab": user_has_access_to_git_import_panel(
-                    self.request.user
-                ),
+                "permissions": permissions,
+                "show_users_tab": permissions.users_panel,
+                "show_courses_tab": permissions.courses_panel,
+                "show_git_logs_tab": permissions.git_logs_panel,
+                "show_git_import_tab": permissions.git_import_panel,
+                "show_import_status_tab": permissions.import_status_panel,
             }
         )
         return context
@@ -115,6 +178,27 @@ class CoursesPanel(SysadminDashboardBaseView):
     template_name = "edx_sysadmin/courses.html"
     datatable = []
 
+    def get_course_overviews_version(self):
+        """
+        Get the number and the latest modification time of the course overviews,
+        which are updated on every course publish and delete.
+        """
+        if not hasattr(self, "_course_overviews_version"):
+            self._course_overviews_version = CourseOverview.objects.aggregate(
+                count=Count("id"), modified=Max("modified")
+            )
+        return self._course_overviews_version
+
+    def get_panel_version(self):
+        """The course table changes along with the course overviews"""
+        return tuple(sorted(self.get_course_overviews_version().items()))
+
+    def get_last_modified(self, request, *args, **kwargs):
+        """The course table last changed with the latest course overview"""
+        if request.method not in ("GET", "HEAD"):
+            return None
+        return self.get_course_overviews_version()["modified"]
+
     def get_course_summaries(self):
         """Get an iterable list of course summaries."""
 
@@ -188,6 +272,7 @@ class CoursesPanel(SysadminDashboardBaseView):
             if course_found:
                 # delete course that is stored with mongodb backend
                 modulestore().delete_course(course.id, request.user.id)
+                CourseImportStatus.objects.filter(course_id=course.id).delete()
                 # don't delete user permission groups, though
                 message += Text(
                     _(
@@ -267,6 +352,8 @@ class UsersPanel(SysadminDashboardBaseView):
     ),
     name="dispatch",
 )
+# The job has to be committed before a worker picks up its task
+@method_decorator(transaction.non_atomic_requests, name="dispatch")
 class GitImport(SysadminDashboardBaseView):
     """
     This provide the view to load or update courses from github
@@ -279,11 +366,23 @@ class GitImport(SysadminDashboardBaseView):
         Overriding get_context_data method to add custom fields
         """
         context = super().get_context_data(**kwargs)
-        context["is_git_import_tab"] = True
+        context.update(
+            {
+                "is_git_import_tab": True,
+                "import_jobs": ImportJob.objects.select_related("course_git_log")
+                .defer(
+                    *(
+                        f"course_git_log__{field}"
+                        for field in CourseGitLog.IMPORT_LOG_FIELDS
+                    )
+                )
+                .order_by("-created", "-id")[:IMPORT_JOBS_SHOWN],
+            }
+        )
         return context
 
     def get_course_from_git(self, gitloc, branch):
-        """This downloads and runs the checks for importing a course in git"""
+        """This runs the checks for importing a course in git and queues the import"""
 
         if not (
             gitloc.endswith(".git")
@@ -296,59 +395,38 @@ class GitImport(SysadminDashboardBaseView):
             )
             return message
 
-        return self.import_mongo_course(gitloc, branch)
+        return self.queue_import(gitloc, branch)
 
-    def import_mongo_course(self, gitloc, branch):
+    def queue_import(self, gitloc, branch):
         """
-        Imports course using management command and captures logging output
-        at debug level for display in template
+        Queues the import of the course for a Celery worker, its progress is
+        shown in the table of import jobs
         """
+        log.debug("Queueing import of course using git repo %s", gitloc)
+        import_job = queue_import_job(gitloc, branch, self.request.user)
+        if import_job.status == ImportJob.STATUS_FAILED:
+            return HTML("<p style='color:#cb0712'>{0}</p>").format(
+                Text(_("Unable to queue the import of {repo}: {error}")).format(
+                    repo=gitloc, error=import_job.error
+                )
+            )
+        return HTML("<h4 style='color:#008000'>{0}</h4>").format(
+            Text(_("Import of {repo} queued as job {job_id}")).format(
+                repo=gitloc, job_id=import_job.id
+            )
+        )
 
-        message = ""
-
-        log.debug("Adding course using git repo %s", gitloc)
-
-        # Grab logging output for debugging imports
-        output = StringIO()
-        import_log_handler = logging.StreamHandler(output)
-        import_log_handler.setLevel(logging.DEBUG)
-
-        logger_names = [
-            "xmodule.modulestore.xml_importer",
-            "edx_sysadmin.git_import",
-            "xmodule.modulestore.xml",
-            "xmodule.seq_module",
-        ]
-        loggers = []
-
-        for logger_name in logger_names:
-            logger = logging.getLogger(logger_name)
-            logger.setLevel(logging.DEBUG)
-            logger.addHandler(import_log_handler)
-            loggers.append(logger)
-
-        error_msg = ""
-        try:
-            git_import.add_repo(gitloc, None, branch)
-        except GitImportError as ex:
-            error_msg = str(ex)
-        ret = output.getvalue()
-
-        # Remove handler hijacks
-        for logger in loggers:
-            logger.setLevel(logging.NOTSET)
-            logger.removeHandler(import_log_handler)
-
-        if error_msg:
-            msg_header = error_msg
-            color = "#cb0712"
-        else:
-            msg_header = _("Added Course")
-            color = "#008000"
-
-        message = HTML("<h4 style='color:{0}'>{1}</h4>").format(color, msg_header)
-        message += HTML("<pre>{0}</pre>").format(escape(ret))
-        return message
+    def cancel_job(self, job_id):
+        """Cancels an import job which isn't finished yet"""
+        if not job_id.isdigit():
+            raise Http404
+        if cancel_import_job(int(job_id)):
+            return HTML("<h4 style='color:#008000'>{0}</h4>").format(
+                Text(_("Cancelling import job {job_id}")).format(job_id=job_id)
+            )
+        return HTML("<p style='color:#cb0712'>{0}</p>").format(
+            Text(_("Import job {job_id} is already finished")).format(job_id=job_id)
+        )
 
     def post(self, request):
         """Handle all actions from courses view"""
@@ -370,12 +448,106 @@ class GitImport(SysadminDashboardBaseView):
                 .replace(";", "")
             )
             message += self.get_course_from_git(gitloc, branch)
+        elif action == "cancel_job":
+            message += self.cancel_job(request.POST.get("job_id", ""))
 
         context = self.get_context_data()
         context.update({"msg": message})
         return render(request, self.template_name, context)
 
 
+def serialize_import_job(import_job):
+    """The details of an import job shown in the Git Import panel"""
+    course_id = (
+        import_job.course_git_log.course_id if import_job.course_git_log else None
+    )
+    return {
+        "id": import_job.id,
+        "repo": import_job.repo,
+        "branch": import_job.branch,
+        "status": import_job.status,
+        "status_display": import_job.get_status_display(),
+        "is_finished": import_job.is_finished,
+        "error": import_job.error,
+        "created": import_job.created,
+        "started": import_job.started,
+        "finished": import_job.finished,
+        "duration": import_job.duration,
+        "course_id": str(course_id) if course_id else None,
+        "logs_url": (
+            reverse("sysadmin:gitlogs_detail", kwargs={"course_id": str(course_id)})
+            if course_id
+            else None
+        ),
+    }
+
+
+@method_decorator(
+    user_passes_test(
+        user_has_access_to_git_import_panel, login_url="/404", redirect_field_name=None
+    ),
+    name="dispatch",
+)
+@method_decorator(never_cache, name="dispatch")
+class ImportJobStatus(View):
+    """
+    Returns the status of an import job as JSON, polled by the Git Import panel
+    until the job is finished
+    """
+
+    def get(self, request, job_id):
+        """Return the details of the job"""
+        import_job = get_object_or_404(
+            ImportJob.objects.select_related("course_git_log").defer(
+                *(
+                    f"course_git_log__{field}"
+                    for field in CourseGitLog.IMPORT_LOG_FIELDS
+                )
+            ),
+            id=job_id,
+        )
+        return JsonResponse(serialize_import_job(import_job))
+
+
+@method_decorator(
+    user_passes_test(
+        user_has_access_to_git_logs_panel, login_url="/404", redirect_field_name=None
+    ),
+    name="dispatch",
+)
+@method_decorator(never_cache, name="dispatch")
+class ImportJobEvents(View):
+    """
+    Streams the stage changes and log lines of an import job as Server-Sent
+    Events while the worker writes them, for the Git Import panel and the Git
+    Logs of the course being imported
+    """
+
+    def get(self, request, job_id):
+        """Stream the events written after the last one the browser got"""
+        import_job = get_object_or_404(ImportJob, id=job_id)
+        permissions = get_sysadmin_permissions(request.user)
+        if not permissions.git_import_panel and not any(
+            permissions.can_view_course_logs(course_id)
+            for course_id in CourseGitLog.objects.filter(repo_dir=import_job.repo_dir)
+            .values_list("course_id", flat=True)
+            .distinct()
+        ):
+            raise Http404
+        after_id = request.headers.get("Last-Event-ID") or request.GET.get("after")
+        try:
+            after_id = int(after_id or 0)
+        except ValueError:
+            after_id = 0
+        response = StreamingHttpResponse(
+            stream_import_job_events(import_job.id, after_id),
+            content_type="text/event-stream",
+        )
+        # Keep proxies from buffering the stream
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
 @method_decorator(
     user_passes_test(
         user_has_access_to_git_logs_panel, login_url="/404", redirect_field_name=None
@@ -399,58 +571,230 @@ class GitLogs(SysadminDashboardBaseView):
         context["is_git_logs_tab"] = True
         return context
 
-    def get(self, request, *args, **kwargs):
-        """Shows logs of imports that happened as a result of a git import"""
-        course_id = kwargs.get("course_id")
+    def get_course_id(self):
+        """Get the course key of the course whose logs are shown, if any"""
+        course_id = self.kwargs.get("course_id")
         if course_id:
-            course_id = CourseKey.from_string(course_id)
+            return CourseKey.from_string(course_id)
+        return None
 
-        page_size = 10
-        error_msg = ""
+    def get_queryset(self):
+        """Get the logs visible to the user, latest first"""
+        request = self.request
+        course_id = self.get_course_id()
 
         if course_id is None:
-            if not request.user.is_staff:
-                user_courses = request.user.courseaccessrole_set.filter(
-                    role=CourseInstructorRole.ROLE
-                ).values_list("course_id", flat=True)
+            if not get_sysadmin_permissions(request.user).is_staff:
+                # A subquery, so that instructors of many courses don't send
+                # huge IN lists to the database
                 cilset = CourseGitLog.objects.filter(
-                    course_id__in=user_courses
+                    course_id__in=get_instructor_course_roles(request.user).values(
+                        "course_id"
+                    )
                 ).order_by("-created")
             else:
                 cilset = CourseGitLog.objects.order_by("-created")
         else:
             # Allow only course-admin and staff users
-            if not (
-                request.user.is_staff
-                or CourseInstructorRole(course_id).has_user(request.user)
+            if not get_sysadmin_permissions(request.user).can_view_course_logs(
+                course_id
             ):
                 raise Http404
             log.debug("course_id=%s", course_id)
             cilset = CourseGitLog.objects.filter(course_id=course_id).order_by(
                 "-created"
             )
-            log.debug("cilset length=%s", len(cilset))
+        status = self.get_status()
+        if status:
+            cilset = cilset.filter(status=status)
+        # The import logs can be huge, they are loaded on demand by GitLogImportLog
+        return cilset.defer(*CourseGitLog.IMPORT_LOG_FIELDS)
+
+    def get_status(self):
+        """Get the import status the logs are filtered on, if any"""
+        status = self.request.GET.get("status")
+        if status in dict(CourseGitLog.STATUS_CHOICES):
+            return status
+        return None
+
+    def get_import_jobs(self):
+        """
+        Get the unfinished import jobs of the repos the course was imported from,
+        followed live on the page of the course
+        """
+        course_id = self.get_course_id()
+        if course_id is None:
+            return []
+        if not hasattr(self, "_import_jobs"):
+            self._import_jobs = list(
+                ImportJob.objects.filter(
+                    repo_dir__in=CourseGitLog.objects.filter(
+                        course_id=course_id
+                    ).values("repo_dir")
+                )
+                .exclude(status__in=ImportJob.FINISHED_STATUSES)
+                .order_by("created", "id")
+            )
+        return self._import_jobs
+
+    def get_logs_version(self):
+        """
+        Get the id range and latest creation time of the visible logs,
+        which change whenever a log is added or pruned.
+        """
+        if not hasattr(self, "_logs_version"):
+            self._logs_version = self.get_queryset().aggregate(
+                max_id=Max("id"), min_id=Min("id"), created=Max("created")
+            )
+        return self._logs_version
+
+    def get_panel_version(self):
+        """
+        The listed logs change along with their id range, and the page along
+        with the import jobs in progress
+        """
+        return (
+            tuple(sorted(self.get_logs_version().items())),
+            tuple(import_job.id for import_job in self.get_import_jobs()),
+        )
+
+    def get_last_modified(self, request, *args, **kwargs):
+        """The listed logs last changed with the latest log"""
+        if request.method not in ("GET", "HEAD"):
+            return None
+        return self.get_logs_version()["created"]
+
+    def get(self, request, *args, **kwargs):
+        """Shows logs of imports that happened as a result of a git import"""
+        course_id = self.get_course_id()
+        page_size = 10
+        error_msg = ""
+        cilset = self.get_queryset()
 
         # Paginate the query set
-        paginator = Paginator(cilset, page_size)
         try:
-            logs = paginator.page(request.GET.get("page"))
-        except PageNotAnInteger:
-            logs = paginator.page(1)
-        except EmptyPage:
-            # If the page is too high or low
-            given_page = int(request.GET.get("page"))
-            page = min(max(1, given_page), paginator.num_pages)
-            logs = paginator.page(page)
+            logs = paginate_by_created(
+                cilset,
+                page_size,
+                after=request.GET.get("after"),
+                before=request.GET.get("before"),
+            )
+        except InvalidCursor:
+            logs = paginate_by_created(cilset, page_size)
 
         context = self.get_context_data(**kwargs)
+        if getattr(settings, "SYSADMIN_GIT_LOGS_SHOW_COUNT", False):
+            context["logs_count"] = cilset.count()
         context.update(
             {
                 "logs": logs,
                 "course_id": course_id if course_id else None,
                 "error_msg": error_msg,
                 "page_size": page_size,
+                "status": self.get_status(),
+                "status_choices": CourseGitLog.STATUS_CHOICES,
+                "import_jobs": self.get_import_jobs(),
             }
         )
 
         return render(request, self.template_name, context)
+
+
+@method_decorator(
+    user_passes_test(
+        user_has_access_to_import_status_panel,
+        login_url="/404",
+        redirect_field_name=None,
+    ),
+    name="dispatch",
+)
+class ImportStatusPanel(SysadminDashboardBaseView):
+    """
+    Shows the outcome of the latest git import of every course, so that broken
+    or stale courses can be found without going through the git logs
+    """
+
+    template_name = "edx_sysadmin/importstatus.html"
+
+    def get_status(self):
+        """Get the import status the courses are filtered on, if any"""
+        status = self.request.GET.get("status")
+        if status in dict(CourseGitLog.STATUS_CHOICES):
+            return status
+        return None
+
+    def get_sort(self):
+        """Get the requested ordering of the courses"""
+        sort = self.request.GET.get("sort")
+        if sort in IMPORT_STATUS_ORDERINGS:
+            return sort
+        return None
+
+    def get_queryset(self):
+        """Get the import statuses visible to the user"""
+        return get_course_import_statuses(
+            user=self.request.user, status=self.get_status(), sort=self.get_sort()
+        )
+
+    def get_panel_version(self):
+        """
+        The table changes with every import of the listed courses, and when
+        courses enter or leave it
+        """
+        if not hasattr(self, "_panel_version"):
+            self._panel_version = tuple(
+                sorted(
+                    self.get_queryset()
+                    .order_by()
+                    .aggregate(count=Count("id"), last_import=Max("last_import"))
+                    .items()
+                )
+            )
+        return self._panel_version
+
+    def get_context_data(self, **kwargs):
+        """
+        Overriding get_context_data method to add custom fields
+        """
+        context = super().get_context_data(**kwargs)
+        context.update(
+            {
+                "is_import_status_tab": True,
+                "import_statuses": self.get_queryset(),
+                "status": self.get_status(),
+                "status_choices": CourseGitLog.STATUS_CHOICES,
+                "sort": self.get_sort(),
+            }
+        )
+        return context
+
+
+@method_decorator(
+    user_passes_test(
+        user_has_access_to_git_logs_panel, login_url="/404", redirect_field_name=None
+    ),
+    name="dispatch",
+)
+@method_decorator(cache_control(private=True, max_age=60 * 60), name="dispatch")
+class GitLogImportLog(View):
+    """
+    Returns the full import log of a single CourseGitLog as plain text, so that
+    the Git Logs panel only loads it when it is expanded
+    """
+
+    def get(self, request, log_id):
+        """Return the import log if the user may see the logs of its course"""
+        course_git_log = get_object_or_404(
+            CourseGitLog.objects.only(
+                "id", "course_id", *CourseGitLog.IMPORT_LOG_FIELDS
+            ),
+            id=log_id,
+        )
+        if not get_sysadmin_permissions(request.user).can_view_course_logs(
+            course_git_log.course_id
+        ):
+            raise Http404
+        return HttpResponse(
+            course_git_log.import_log or "",
+            content_type="text/plain; charset=utf-8",
+        )
@@ -0,0 +1,261 @@
+"""
+Tests for the `edx-sysadmin` import_jobs module.
+"""
+import json
+import logging
+from datetime import timedelta
+from unittest.mock import ANY, patch
+
+import pytest
+from django.test.utils import override_settings
+from django.utils import timezone
+from opaque_keys.edx.locator import CourseLocator
+
+from edx_sysadmin.git_import import (
+    STAGE_FETCHING,
+    GitImportErrorCancelled,
+    GitImportErrorCannotPull,
+)
+from edx_sysadmin.import_jobs import (
+    ERROR_LOST,
+    ERROR_NOT_QUEUED,
+    IMPORT_JOB_QUEUED_MAX_AGE,
+    IMPORT_JOB_RUNNING_GRACE_PERIOD,
+    cancel_import_job,
+    capture_import_job_events,
+    fail_stale_import_jobs,
+    prune_import_job_events,
+    queue_import_job,
+    run_import_job,
+    stream_import_job_events,
+)
+from edx_sysadmin.models import CourseGitLog, ImportJob, ImportJobEvent
+
+pytestmark = [pytest.mark.django_db]
+
+REPO = "https://github.com/edx/edx4edx_lite.git"
+
+
+@patch("edx_sysadmin.import_jobs.run_import_job.apply_async")
+def test_queue_import_job(mocked_apply_async):
+    """Jobs are recorded as queued and sent to the workers with their task id"""
+    job = queue_import_job(REPO, "")
+    assert job.status == ImportJob.STATUS_QUEUED
+    assert job.branch is None
+    assert job.repo_dir == "edx4edx_lite"
+    mocked_apply_async.assert_called_once_with((job.id,), task_id=job.task_id)
+
+
+@patch(
+    "edx_sysadmin.import_jobs.run_import_job.apply_async",
+    side_effect=ConnectionError,
+)
+def test_queue_import_job_error(mocked_apply_async):  # pylint: disable=unused-argument
+    """Jobs which can't be sent to the workers are failed right away"""
+    job = queue_import_job(REPO, "")
+    assert job.status == ImportJob.STATUS_FAILED
+    assert job.error == ERROR_NOT_QUEUED
+    assert job.finished is not None
+
+
+@override_settings(GIT_IMPORT_TIMEOUT=3600)
+def test_fail_stale_import_jobs():
+    """Jobs left queued or running for too long are failed, recent ones are kept"""
+    now = timezone.now()
+    old_queued = ImportJob.objects.create(repo=REPO)
+    ImportJob.objects.filter(id=old_queued.id).update(
+        created=now - IMPORT_JOB_QUEUED_MAX_AGE - timedelta(minutes=1)
+    )
+    queued = ImportJob.objects.create(repo=REPO)
+    old_running = ImportJob.objects.create(
+        repo=REPO,
+        status=ImportJob.STATUS_RUNNING,
+        started=now - timedelta(hours=1) - IMPORT_JOB_RUNNING_GRACE_PERIOD,
+    )
+    running = ImportJob.objects.create(
+        repo=REPO, status=ImportJob.STATUS_RUNNING, started=now
+    )
+
+    assert fail_stale_import_jobs(now=now + timedelta(minutes=1)) == 2
+    statuses = dict(ImportJob.objects.values_list("id", "status"))
+    assert statuses == {
+        old_queued.id: ImportJob.STATUS_FAILED,
+        queued.id: ImportJob.STATUS_QUEUED,
+        old_running.id: ImportJob.STATUS_FAILED,
+        running.id: ImportJob.STATUS_RUNNING,
+    }
+    assert ImportJob.objects.get(id=old_running.id).error == ERROR_LOST
+
+    with override_settings(GIT_IMPORT_TIMEOUT=None):
+        ImportJob.objects.filter(id=old_running.id).update(
+            status=ImportJob.STATUS_RUNNING
+        )
+        assert fail_stale_import_jobs() == 0
+
+
+@pytest.mark.parametrize(
+    "import_status, job_status",
+    [
+        (CourseGitLog.STATUS_SUCCEEDED, ImportJob.STATUS_SUCCEEDED),
+        (CourseGitLog.STATUS_FAILED, ImportJob.STATUS_FAILED),
+    ],
+)
+def test_run_import_job(import_status, job_status):
+    """The job follows the outcome of the import and links to its log"""
+    course_git_log = CourseGitLog.objects.create(
+        course_id=CourseLocator("MITx", "edx4edx", "edx4edx"),
+        repo_dir="edx4edx_lite",
+        status=import_status,
+        first_error="Broken problem" if import_status == "failed" else None,
+    )
+    job = ImportJob.objects.create(repo=REPO)
+    with patch(
+        "edx_sysadmin.import_jobs.import_repo", return_value=course_git_log
+    ) as mocked_import_repo:
+        run_import_job(job.id)
+    mocked_import_repo.assert_called_once_with(
+        REPO, None, None, progress=ANY, cancel_check=ANY
+    )
+
+    job.refresh_from_db()
+    assert job.status == job_status
+    assert job.course_git_log == course_git_log
+    assert job.duration is not None
+    assert job.error == course_git_log.first_error
+
+
+def test_run_import_job_error():
+    """Import errors are recorded on the job, jobs are only run once"""
+    job = ImportJob.objects.create(repo=REPO)
+    with patch(
+        "edx_sysadmin.import_jobs.import_repo",
+        side_effect=GitImportErrorCannotPull(),
+    ) as mocked_import_repo:
+        run_import_job(job.id)
+        run_import_job(job.id)
+    assert mocked_import_repo.call_count == 1
+
+    job.refresh_from_db()
+    assert job.status == ImportJob.STATUS_FAILED
+    assert job.error == str(GitImportErrorCannotPull())
+
+
+def test_cancel_import_job():
+    """
+    Queued jobs are cancelled right away, running ones are flagged for their
+    worker and finished ones are left alone
+    """
+    queued_job = ImportJob.objects.create(repo=REPO)
+    running_job = ImportJob.objects.create(repo=REPO, status=ImportJob.STATUS_RUNNING)
+    finished_job = ImportJob.objects.create(
+        repo=REPO, status=ImportJob.STATUS_SUCCEEDED
+    )
+
+    assert cancel_import_job(queued_job.id)
+    assert cancel_import_job(running_job.id)
+    assert not cancel_import_job(finished_job.id)
+
+    queued_job.refresh_from_db()
+    assert queued_job.status == ImportJob.STATUS_CANCELLED
+    with patch("edx_sysadmin.import_jobs.import_repo") as mocked_import_repo:
+        run_import_job(queued_job.id)
+    mocked_import_repo.assert_not_called()
+
+    running_job.refresh_from_db()
+    assert running_job.status == ImportJob.STATUS_RUNNING
+    assert running_job.cancel_requested
+
+
+def test_run_import_job_cancelled():
+    """Jobs stopped by their cancellation check are recorded as cancelled"""
+    job = ImportJob.objects.create(repo=REPO)
+
+    def import_repo(*args, cancel_check, **kwargs):
+        cancel_import_job(job.id)
+        assert cancel_check()
+        raise GitImportErrorCancelled()
+
+    with patch("edx_sysadmin.import_jobs.import_repo", side_effect=import_repo):
+        run_import_job(job.id)
+
+    job.refresh_from_db()
+    assert job.status == ImportJob.STATUS_CANCELLED
+    assert job.is_finished
+
+
+def test_capture_import_job_events():
+    """Stage changes and log lines of the import loggers are recorded in order"""
+    job = ImportJob.objects.create(repo=REPO)
+    with capture_import_job_events(job.id) as progress:
+        progress(STAGE_FETCHING)
+        logging.getLogger("edx_sysadmin.git_import").warning("Cloning repo")
+    logging.getLogger("edx_sysadmin.git_import").warning("Not captured")
+
+    job.refresh_from_db()
+    assert job.stage == STAGE_FETCHING
+    assert list(
+        ImportJobEvent.objects.filter(job=job)
+        .order_by("id")
+        .values_list("kind", "level", "message")
+    ) == [
+        (ImportJobEvent.KIND_STAGE, None, STAGE_FETCHING),
+        (ImportJobEvent.KIND_LOG, logging.WARNING, "Cloning repo"),
+    ]
+
+
+def test_stream_import_job_events():
+    """Events after the given id are streamed, then the end of the job"""
+    job = ImportJob.objects.create(repo=REPO, status=ImportJob.STATUS_SUCCEEDED)
+    first = ImportJobEvent.objects.create(
+        job=job, kind=ImportJobEvent.KIND_STAGE, message=STAGE_FETCHING
+    )
+    second = ImportJobEvent.objects.create(
+        job=job, kind=ImportJobEvent.KIND_LOG, level=logging.INFO, message="Done"
+    )
+
+    stream = list(stream_import_job_events(job.id, after_id=first.id, timeout=0))
+    assert stream[0].startswith("retry: ")
+    assert stream[1] == (
+        f"id: {second.id}\nevent: log\n"
+        f"data: {json.dumps({'level': logging.INFO, 'message': 'Done'})}\n\n"
+    )
+    assert stream[2].startswith("event: end\n")
+    assert json.loads(stream[2].split("data: ", 1)[1])["status"] == "succeeded"
+    assert len(stream) == 3
+
+
+def test_stream_import_job_events_running():
+    """Streams of running jobs end once they sent events, without an end event"""
+    job = ImportJob.objects.create(repo=REPO, status=ImportJob.STATUS_RUNNING)
+    event = ImportJobEvent.objects.create(
+        job=job, kind=ImportJobEvent.KIND_STAGE, message=STAGE_FETCHING
+    )
+    stream = list(stream_import_job_events(job.id, timeout=60))
+    assert len(stream) == 2
+    assert stream[1].startswith(f"id: {event.id}\nevent: stage\n")
+
+
+def test_stream_import_job_events_timeout():
+    """Streams of running jobs end after the timeout, without an end event"""
+    job = ImportJob.objects.create(repo=REPO, status=ImportJob.STATUS_RUNNING)
+    stream = list(stream_import_job_events(job.id, timeout=0))
+    assert len(stream) == 1
+
+
+def test_prune_import_job_events():
+    """Only the events of jobs finished long ago are removed"""
+    old_job = ImportJob.objects.create(
+        repo=REPO,
+        status=ImportJob.STATUS_SUCCEEDED,
+        finished=timezone.now() - timedelta(days=2),
+    )
+    running_job = ImportJob.objects.create(repo=REPO)
+    for job in (old_job, running_job):
+        ImportJobEvent.objects.create(
+            job=job, kind=ImportJobEvent.KIND_STAGE, message=STAGE_FETCHING
+        )
+
+    assert prune_import_job_events() == 1
+    assert list(ImportJobEvent.objects.values_list("job_id", flat=True)) == [
+        running_job.id
+    ]
@@ -0,0 +1,171 @@
+"""
+Tests for the `edx-sysadmin` import_log module.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from opaque_keys.edx.locator import CourseLocator
+
+from edx_sysadmin.import_log import (
+    ImportLogHandler,
+    capture_import_log,
+    index_import_log_messages,
+    make_excerpt,
+    search_import_log_messages,
+    tokenize,
+)
+from edx_sysadmin.models import CourseGitLog
+
+pytestmark = [pytest.mark.django_db]
+
+
+def create_indexed_log(course_key, messages, age_days=0):
+    """Create a log for a course with its messages indexed"""
+    cgl = CourseGitLog.objects.create(course_id=course_key, repo_dir="repo")
+    # created is auto_now_add, so it can only be changed once saved
+    CourseGitLog.objects.filter(pk=cgl.pk).update(
+        created=timezone.now() - timedelta(days=age_days)
+    )
+    cgl.refresh_from_db()
+    index_import_log_messages(cgl, messages)
+    return cgl
+
+
+def test_handler_keeps_warnings_and_errors():
+    """
+    The whole log is captured as text, only warnings and errors are kept for indexing
+    """
+    logger = logging.getLogger("edx_sysadmin.tests.import_log")
+    logger.setLevel(logging.DEBUG)
+    handler = ImportLogHandler()
+    logger.addHandler(handler)
+    try:
+        logger.info("Importing chapter %s", "one")
+        logger.warning("Missing %s", "video")
+        logger.error("Broken problem")
+    finally:
+        logger.removeHandler(handler)
+
+    assert (
+        handler.getvalue() == "Importing chapter one\nMissing video\nBroken problem\n"
+    )
+    assert handler.messages == [
+        (logging.WARNING, "Missing video"),
+        (logging.ERROR, "Broken problem"),
+    ]
+    assert handler.get_summary() == {
+        "warning_count": 1,
+        "error_count": 1,
+        "first_error": "Broken problem",
+    }
+
+
+def test_capture_import_log_concurrent():
+    """
+    Imports running in parallel threads only capture their own lines and the
+    loggers get their level back once both are done
+    """
+    logger_name = "edx_sysadmin.tests.import_log.capture"
+    logger = logging.getLogger(logger_name)
+    logger.setLevel(logging.WARNING)
+    both_capturing = threading.Barrier(2)
+    handlers = {}
+
+    def run_import(name):
+        handler = ImportLogHandler()
+        handlers[name] = handler
+        with capture_import_log(handler, [logger_name]):
+            both_capturing.wait()
+            logger.debug("Importing %s", name)
+            both_capturing.wait()
+        logger.debug("Imported %s", name)
+
+    threads = [threading.Thread(target=run_import, args=(name,)) for name in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert handlers["a"].getvalue() == "Importing a\n"
+    assert handlers["b"].getvalue() == "Importing b\n"
+    assert logger.level == logging.WARNING
+    assert logger.handlers == []
+
+
+def test_capture_import_log_nested():
+    """
+    Nested captures of the same import only get the records of their own loggers
+    and of the children of those
+    """
+    course_logger = logging.getLogger("edx_sysadmin.tests.import_log.course")
+    job_logger = logging.getLogger("edx_sysadmin.tests.import_log.job")
+    course_handler = ImportLogHandler()
+    job_handler = ImportLogHandler()
+
+    with capture_import_log(job_handler, [job_logger.name, course_logger.name]):
+        with capture_import_log(course_handler, [course_logger.name]):
+            job_logger.warning("Fetching")
+            course_logger.getChild("block").warning("Broken block")
+
+    assert course_handler.getvalue() == "Broken block\n"
+    assert course_handler.warning_count == 1
+    assert job_handler.getvalue() == "Fetching\nBroken block\n"
+
+
+def test_tokenize():
+    """Terms are lower cased, unique and at least two characters long"""
+    assert tokenize("Failed to import a Problem: problem_3 failed") == [
+        "failed",
+        "to",
+        "import",
+        "problem",
+        "problem_3",
+    ]
+
+
+def test_search():
+    """
+    Every query term has to prefix a term of the message, filters narrow down the results
+    """
+    course_a = CourseLocator("MITx", "a", "run")
+    course_b = CourseLocator("MITx", "b", "run")
+    create_indexed_log(
+        course_a,
+        [
+            (logging.WARNING, "Unable to find static asset images/logo.png"),
+            (logging.ERROR, "Failed to import problem problem_3"),
+        ],
+    )
+    create_indexed_log(
+        course_b,
+        [(logging.ERROR, "Failed to parse xml of video intro")],
+        age_days=10,
+    )
+
+    def search(**kwargs):
+        return sorted(
+            search_import_log_messages(**kwargs).values_list("message", flat=True)
+        )
+
+    assert search(query="fail") == [
+        "Failed to import problem problem_3",
+        "Failed to parse xml of video intro",
+    ]
+    assert search(query="failed problem") == ["Failed to import problem problem_3"]
+    assert search(query="static", severity="error") == []
+    assert search(course_id=course_b) == ["Failed to parse xml of video intro"]
+    assert search(query="failed", since=timezone.now() - timedelta(days=1)) == [
+        "Failed to import problem problem_3"
+    ]
+
+
+def test_make_excerpt():
+    """Long messages are cut around the first matching term"""
+    message = "a" * 300 + " needle " + "b" * 300
+    excerpt = make_excerpt(message, "needle", width=100)
+    assert "needle" in excerpt
+    assert excerpt.startswith("...") and excerpt.endswith("...")
+    assert make_excerpt("short", "needle") == "short"
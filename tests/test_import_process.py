@@ -0,0 +1,209 @@
+"""
+Tests for the `edx-sysadmin` import_process module.
+"""
+import io
+import json
+import logging
+import sys
+from unittest.mock import patch
+
+from opaque_keys.edx.locator import CourseLocator
+
+from edx_sysadmin.git_import import CourseImportResult, GitImportErrorXmlImportFailed
+from edx_sysadmin.import_log import ImportLogHandler, capture_import_log
+from edx_sysadmin.import_process import (
+    ERROR_IMPORT_FAILED,
+    ERROR_MEMORY_LIMIT,
+    ERROR_PROCESS_DIED,
+    ERROR_PROCESS_TIMEOUT,
+    ImportProcess,
+    serve_imports,
+)
+
+LOGGER_NAME = "edx_sysadmin.tests.import_process"
+
+
+def make_request(rdir="repo"):
+    """A request line for serve_imports"""
+    return json.dumps(
+        {
+            "git_repo_dir": "/tmp",
+            "rdir": rdir,
+            "log_level": logging.INFO,
+            "logger_names": [LOGGER_NAME],
+        }
+    )
+
+
+def read_responses(responses):
+    """The responses written by serve_imports"""
+    return [json.loads(line) for line in responses.getvalue().splitlines()]
+
+
+def fake_child(*lines, exit_code=0):
+    """A child command answering every request with the given lines"""
+    script = (
+        "import sys\n"
+        "for request in sys.stdin:\n"
+        f"    print({chr(10).join(lines)!r}, flush=True)\n"
+    )
+    if exit_code:
+        script += f"    sys.exit({exit_code})\n"
+    return [sys.executable, "-c", script]
+
+
+def test_serve_imports_forwards_records_and_outcome():
+    """
+    Records logged by the import at the requested level are sent before its outcome
+    """
+
+    def import_course(git_repo_dir, rdir):
+        logger = logging.getLogger(LOGGER_NAME)
+        logger.debug("hidden")
+        logger.info("importing %s", rdir)
+        if rdir == "broken":
+            raise GitImportErrorXmlImportFailed()
+        return CourseImportResult([CourseLocator("org", "course", "run")], 0.5)
+
+    responses = io.StringIO()
+    requests = io.StringIO(make_request() + "\n" + make_request("broken") + "\n")
+    with patch("edx_sysadmin.git_import.import_course", side_effect=import_course):
+        serve_imports(requests, responses)
+
+    assert read_responses(responses) == [
+        {
+            "record": {
+                "name": LOGGER_NAME,
+                "levelno": logging.INFO,
+                "message": "importing repo",
+            }
+        },
+        {
+            "result": {
+                "error": None,
+                "course_keys": ["course-v1:org+course+run"],
+                "duration": 0.5,
+            }
+        },
+        {
+            "record": {
+                "name": LOGGER_NAME,
+                "levelno": logging.INFO,
+                "message": "importing broken",
+            }
+        },
+        {"result": {"error": "GitImportErrorXmlImportFailed"}},
+    ]
+
+
+def test_serve_imports_unexpected_error():
+    """
+    Imports failing with an unexpected error send its traceback and the child
+    goes on serving imports
+    """
+    responses = io.StringIO()
+    requests = io.StringIO(make_request() + "\n" + make_request() + "\n")
+    with patch(
+        "edx_sysadmin.git_import.import_course", side_effect=ValueError("bad xml")
+    ) as import_course, patch(
+        "edx_sysadmin.git_import.course_import_log",
+        logging.getLogger(LOGGER_NAME),
+    ):
+        serve_imports(requests, responses)
+
+    assert import_course.call_count == 2
+    record, result = read_responses(responses)[:2]
+    assert record["record"]["levelno"] == logging.ERROR
+    assert "ValueError: bad xml" in record["record"]["message"]
+    assert result == {"result": {"error": ERROR_IMPORT_FAILED}}
+
+
+def test_serve_imports_stops_after_memory_error():
+    """
+    Imports running out of memory are reported and end the child
+    """
+    responses = io.StringIO()
+    requests = io.StringIO(make_request() + "\n" + make_request() + "\n")
+    with patch(
+        "edx_sysadmin.git_import.import_course", side_effect=MemoryError
+    ) as import_course:
+        serve_imports(requests, responses)
+
+    import_course.assert_called_once_with("/tmp", "repo")
+    assert read_responses(responses) == [{"result": {"error": ERROR_MEMORY_LIMIT}}]
+
+
+def test_run_import_replays_records():
+    """
+    Records sent by the child are handed to the loggers of the parent
+    """
+    record = json.dumps(
+        {"record": {"name": LOGGER_NAME, "levelno": logging.WARNING, "message": "hi"}}
+    )
+    result = json.dumps({"result": {"error": "GitImportErrorXmlImportFailed"}})
+    process = ImportProcess(command=fake_child(record, result))
+    handler = ImportLogHandler()
+    try:
+        with capture_import_log(handler, [LOGGER_NAME]):
+            result = process.run_import({})
+        assert result == {"error": "GitImportErrorXmlImportFailed"}
+        assert handler.getvalue() == "hi\n"
+        assert handler.warning_count == 1
+        assert process.is_alive()
+    finally:
+        process.stop()
+
+
+def test_run_import_recycles_process():
+    """
+    The child is replaced once it ran max_imports imports
+    """
+    result = json.dumps({"result": {"error": None}})
+    process = ImportProcess(max_imports=2, command=fake_child(result))
+    try:
+        assert process.run_import({}) == {"error": None}
+        pid = process.process.pid
+        assert process.run_import({}) == {"error": None}
+        assert process.process is None
+        assert process.run_import({}) == {"error": None}
+        assert process.process.pid != pid
+    finally:
+        process.stop()
+
+
+def test_run_import_process_died():
+    """
+    Imports whose child exits without answering fail, the next import starts a new child
+    """
+    process = ImportProcess(command=fake_child("", exit_code=1))
+    assert process.run_import({}) == {"error": ERROR_PROCESS_DIED, "returncode": 1}
+    assert process.process is None
+
+
+def test_run_import_process_timeout():
+    """
+    Children which don't answer in time are killed
+    """
+    process = ImportProcess(
+        command=[sys.executable, "-c", "import time; time.sleep(30)"]
+    )
+    assert process.run_import({}, timeout=0.5) == {"error": ERROR_PROCESS_TIMEOUT}
+    assert process.process is None
+
+
+def test_run_import_process_timeout_while_logging():
+    """
+    Children which keep logging without finishing still time out
+    """
+    record = json.dumps(
+        {"record": {"name": LOGGER_NAME, "levelno": logging.INFO, "message": "hi"}}
+    )
+    script = (
+        "import time\n"
+        "while True:\n"
+        f"    print({record!r}, flush=True)\n"
+        "    time.sleep(0.1)\n"
+    )
+    process = ImportProcess(command=[sys.executable, "-c", script])
+    assert process.run_import({}, timeout=0.5) == {"error": ERROR_PROCESS_TIMEOUT}
+    assert process.process is None
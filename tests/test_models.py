@@ -2,3 +2,39 @@
 """
 Tests for the `edx-sysadmin` models module.
 """
+import pytest
+from opaque_keys.edx.locator import CourseLocator
+
+from edx_sysadmin.models import CourseGitLog
+
+pytestmark = [pytest.mark.django_db]
+
+COURSE_KEY = CourseLocator("MITx", "edx4edx", "edx4edx")
+
+
+def test_import_log_is_stored_compressed():
+    """
+    Import logs set through import_log are compressed and read back unchanged
+    """
+    import_log = "DEBUG: Loading block 1\n" * 1000
+    CourseGitLog.objects.create(
+        course_id=COURSE_KEY, repo_dir="edx4edx_lite", import_log=import_log
+    )
+
+    course_git_log = CourseGitLog.objects.get()
+    assert course_git_log.course_import_log is None
+    assert (
+        len(bytes(course_git_log.course_import_log_compressed)) < len(import_log) / 10
+    )
+    assert course_git_log.import_log == import_log
+
+
+def test_uncompressed_import_log():
+    """
+    Import logs stored before compression are still readable
+    """
+    CourseGitLog.objects.create(
+        course_id=COURSE_KEY, repo_dir="edx4edx_lite", course_import_log="import_log"
+    )
+
+    assert CourseGitLog.objects.get().import_log == "import_log"
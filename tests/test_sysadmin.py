@@ -25,7 +25,7 @@ from common.djangoapps.student.roles import CourseStaffRole, GlobalStaff
 from common.djangoapps.student.tests.factories import UserFactory
 from common.djangoapps.util.date_utils import DEFAULT_DATE_TIME_FORMAT, get_time_display
 from edx_sysadmin.git_import import GitImportErrorNoDir
-from edx_sysadmin.models import CourseGitLog
+from edx_sysadmin.models import CourseGitLog, CourseImportStatus, ImportJob
 from openedx.core.djangolib.markup import Text
 
 
@@ -160,10 +160,33 @@ class TestSysAdminMongoCourseImport(SysadminBaseTestCase):
         def_ms = modulestore()
         assert "xml" != def_ms.get_modulestore_type(None)
 
-        self._add_edx4edx()
+        response = self._add_edx4edx()
         course = def_ms.get_course(CourseLocator("MITx", "edx4edx", "edx4edx"))
         assert course is not None
 
+        # The import ran as a job, which is listed with its status
+        import_job = ImportJob.objects.latest("created")
+        assert import_job.status == ImportJob.STATUS_SUCCEEDED
+        assert import_job.user == self.user
+        assert import_job.course_git_log == CourseGitLog.objects.latest("created")
+        job_url = reverse("sysadmin:gitimport_job", kwargs={"job_id": import_job.id})
+        self.assertContains(response, job_url)
+        response = self.client.get(job_url)
+        assert response.json()["status"] == ImportJob.STATUS_SUCCEEDED
+        assert response.json()["course_id"] == "course-v1:MITx+edx4edx+edx4edx"
+
+        # Its stages and log lines were recorded and are streamed until its end
+        response = self.client.get(
+            reverse("sysadmin:gitimport_job_events", kwargs={"job_id": import_job.id})
+        )
+        assert response["Content-Type"] == "text/event-stream"
+        stream = b"".join(response.streaming_content).decode("utf-8")
+        assert "event: stage\n" in stream
+        assert "event: log\n" in stream
+        assert stream.endswith(
+            'event: end\ndata: {"status": "succeeded", "error": null}\n\n'
+        )
+
         self._rm_edx4edx()
         course = def_ms.get_course(CourseLocator("MITx", "edx4edx", "edx4edx"))
         assert course is None
@@ -189,7 +212,23 @@ class TestSysAdminMongoCourseImport(SysadminBaseTestCase):
             )
         )
 
-        self.assertContains(response, "======&gt; IMPORTING course")
+        # The import log itself is only loaded on demand
+        cil = CourseGitLog.objects.latest("created")
+        import_log_url = reverse(
+            "sysadmin:gitlog_import_log", kwargs={"log_id": cil.id}
+        )
+        self.assertContains(response, import_log_url)
+        self.assertNotContains(response, "======&gt; IMPORTING course")
+
+        response = self.client.get(import_log_url)
+        self.assertContains(response, "======> IMPORTING course")
+
+        # The summary of the import is stored along with the log
+        self.assertEqual(cil.status, CourseGitLog.STATUS_SUCCEEDED)
+        self.assertIsNotNone(cil.duration)
+        self.assertIsNotNone(cil.error_count)
+        response = self.client.get(reverse("sysadmin:gitlogs"), {"status": "failed"})
+        self.assertNotContains(response, "/gitlogs/course-v1:MITx+edx4edx+edx4edx")
 
         self._rm_edx4edx()
 
@@ -215,8 +254,8 @@ class TestSysAdminMongoCourseImport(SysadminBaseTestCase):
         date = CourseGitLog.objects.all().first().created.replace(tzinfo=UTC)
 
         for timezone in tz_names:
-            with (
-                override_settings(TIME_ZONE=timezone)
+            with override_settings(
+                TIME_ZONE=timezone
             ):  # lint-amnesty, pylint: disable=superfluous-parens
                 date_text = get_time_display(date, tz_format, settings.TIME_ZONE)
                 response = self.client.get(reverse("sysadmin:gitlogs"))
@@ -265,28 +304,50 @@ class TestSysAdminMongoCourseImport(SysadminBaseTestCase):
 
         self._rm_edx4edx()
 
-    def test_gitlog_pagination_out_of_range_invalid(self):
+    def test_gitlog_pagination(self):
         """
-        Make sure the pagination behaves properly when the requested page is out
-        of range.
+        Make sure the keyset pagination walks through all the logs in both
+        directions and falls back to the first page on a bad cursor.
         """
 
         self._setstaff_login()
 
-        for _ in range(15):
+        for index in range(15):
             CourseGitLog(
                 course_id=CourseLocator.from_string("test/test/test"),
                 course_import_log="import_log",
-                git_log="git_log",
+                git_log=f"git_log_{index:02d}",
                 repo_dir="repo_dir",
                 created=datetime.now(),
             ).save()
 
-        for page, expected in [(-1, 1), (1, 1), (2, 2), (30, 2), ("abc", 1)]:
-            response = self.client.get(
-                "{}?page={}".format(reverse("sysadmin:gitlogs"), page)
-            )
-            self.assertContains(response, f"Page {expected} of 2")
+        response = self.client.get(reverse("sysadmin:gitlogs"))
+        first_page = response.context["logs"]
+        assert [cil.git_log for cil in first_page] == [
+            f"git_log_{index:02d}" for index in range(14, 4, -1)
+        ]
+        assert not first_page.has_previous
+
+        response = self.client.get(
+            reverse("sysadmin:gitlogs"), {"after": first_page.next_cursor}
+        )
+        second_page = response.context["logs"]
+        assert [cil.git_log for cil in second_page] == [
+            f"git_log_{index:02d}" for index in range(4, -1, -1)
+        ]
+        assert not second_page.has_next
+
+        response = self.client.get(
+            reverse("sysadmin:gitlogs"), {"before": second_page.previous_cursor}
+        )
+        assert [cil.git_log for cil in response.context["logs"]] == [
+            cil.git_log for cil in first_page
+        ]
+
+        response = self.client.get(reverse("sysadmin:gitlogs"), {"after": "abc"})
+        assert [cil.git_log for cil in response.context["logs"]] == [
+            cil.git_log for cil in first_page
+        ]
 
         CourseGitLog.objects.all().delete()
 
@@ -316,6 +377,14 @@ class TestSysAdminMongoCourseImport(SysadminBaseTestCase):
         )
         assert response.status_code == 302
         assert response.url == "/404"
+        # Or the import logs themselves
+        cil = CourseGitLog.objects.latest("created")
+        import_log_url = reverse(
+            "sysadmin:gitlog_import_log", kwargs={"log_id": cil.id}
+        )
+        response = self.client.get(import_log_url)
+        assert response.status_code == 302
+        assert response.url == "/404"
 
         # Add user as staff in course team
         self.user.is_staff = True
@@ -328,12 +397,59 @@ class TestSysAdminMongoCourseImport(SysadminBaseTestCase):
         logged_in = self.client.login(username=self.user.username, password="foo")
         assert logged_in
 
+        response = self.client.get(import_log_url)
+        self.assertContains(response, "======> IMPORTING course")
+
+        self._rm_edx4edx()
+
+    def test_import_status(self):
+        """
+        Every import updates the import status of its course
+        """
+
+        self._setstaff_login()
+        self._mkdir(settings.GIT_REPO_DIR)
+
+        self._add_edx4edx()
+        import_status = CourseImportStatus.objects.get(
+            course_id=CourseLocator("MITx", "edx4edx", "edx4edx")
+        )
+        cil = CourseGitLog.objects.latest("created")
+        assert import_status.course_git_log_id == cil.id
+        assert import_status.status == CourseGitLog.STATUS_SUCCEEDED
+        assert import_status.commit == cil.commit
+
         response = self.client.get(
-            reverse(
-                "sysadmin:gitlogs_detail",
-                kwargs={"course_id": "course-v1:MITx+edx4edx+edx4edx"},
-            )
+            reverse("sysadmin:importstatus"), {"sort": "last_import"}
         )
-        self.assertContains(response, "======&gt; IMPORTING course")
+        self.assertContains(response, "/gitlogs/course-v1:MITx+edx4edx+edx4edx")
+        response = self.client.get(
+            reverse("sysadmin:importstatus"), {"status": "failed"}
+        )
+        self.assertNotContains(response, "/gitlogs/course-v1:MITx+edx4edx+edx4edx")
 
         self._rm_edx4edx()
+        assert not CourseImportStatus.objects.exists()
+
+    def test_gitlogs_conditional_get(self):
+        """
+        Unchanged log pages are answered with 304 until a new log is added.
+        """
+
+        self._setstaff_login()
+        course_id = CourseLocator.from_string("test/test/test")
+        CourseGitLog.objects.create(course_id=course_id, repo_dir="repo_dir")
+
+        response = self.client.get(reverse("sysadmin:gitlogs"))
+        assert response.status_code == 200
+        etag = response["ETag"]
+
+        response = self.client.get(reverse("sysadmin:gitlogs"), HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+
+        CourseGitLog.objects.create(course_id=course_id, repo_dir="repo_dir")
+        response = self.client.get(reverse("sysadmin:gitlogs"), HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response["ETag"] != etag
+
+        CourseGitLog.objects.all().delete()
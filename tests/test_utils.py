@@ -0,0 +1,256 @@
+"""
+Tests for the `edx-sysadmin` utils module.
+"""
+import logging
+import subprocess
+import sys
+from datetime import timedelta
+
+import pytest
+from common.djangoapps.student.roles import CourseInstructorRole
+from common.djangoapps.student.tests.factories import UserFactory
+from django.test import override_settings
+from django.utils import timezone
+from edx_django_utils.cache import RequestCache
+from opaque_keys.edx.locator import CourseLocator
+
+from edx_sysadmin.git_import import save_course_git_log
+from edx_sysadmin.import_log import ImportLogHandler, index_import_log_messages
+from edx_sysadmin.models import CourseGitLog, CourseGitLogMessage, CourseGitLogTerm
+from edx_sysadmin.utils.limits import limit_command
+from edx_sysadmin.utils.utils import (
+    get_course_import_statuses,
+    get_instructor_course_ids,
+    get_sysadmin_permissions,
+    prune_course_git_logs,
+    update_course_import_status,
+    user_has_access_to_git_import_panel,
+    user_has_access_to_git_logs_panel,
+    user_has_access_to_sysadmin,
+)
+
+pytestmark = [pytest.mark.django_db]
+
+
+def create_logs(course_key, count, age_days=0):
+    """Create count logs for a course, a minute apart, the latest age_days old"""
+    latest = timezone.now() - timedelta(days=age_days)
+    for index in range(count):
+        cgl = CourseGitLog.objects.create(
+            course_id=course_key,
+            repo_dir="repo",
+            git_log=f"{course_key.course}_{index}",
+        )
+        # created is auto_now_add, so it can only be changed once saved
+        CourseGitLog.objects.filter(pk=cgl.pk).update(
+            created=latest - timedelta(minutes=index)
+        )
+
+
+def test_prune_per_course_threshold():
+    """
+    Only the latest logs of every course are kept, in batches smaller than the excess
+    """
+    course_a = CourseLocator("MITx", "a", "run")
+    course_b = CourseLocator("MITx", "b", "run")
+    create_logs(course_a, 7)
+    create_logs(course_b, 2)
+
+    assert prune_course_git_logs(max_per_course=3, batch_size=2) == 4
+    assert sorted(
+        CourseGitLog.objects.filter(course_id=course_a).values_list(
+            "git_log", flat=True
+        )
+    ) == ["a_0", "a_1", "a_2"]
+    assert CourseGitLog.objects.filter(course_id=course_b).count() == 2
+
+
+def test_prune_by_age():
+    """
+    Logs older than the maximum age are removed whatever their course
+    """
+    course_a = CourseLocator("MITx", "a", "run")
+    create_logs(course_a, 2)
+    create_logs(CourseLocator("MITx", "b", "run"), 3, age_days=40)
+
+    assert prune_course_git_logs(max_age_days=30, batch_size=2) == 3
+    assert list(CourseGitLog.objects.values_list("course_id", flat=True)) == [
+        course_a,
+        course_a,
+    ]
+
+
+@override_settings(
+    SYSADMIN_MAX_GIT_LOGS_THRESHOLD="2", SYSADMIN_GIT_LOGS_MAX_AGE_DAYS=30.0
+)
+def test_prune_settings_coerced():
+    """
+    Retention settings given as strings or floats are applied
+    """
+    course_a = CourseLocator("MITx", "a", "run")
+    create_logs(course_a, 3)
+    create_logs(CourseLocator("MITx", "b", "run"), 1, age_days=40)
+
+    assert prune_course_git_logs() == 2
+    assert CourseGitLog.objects.filter(course_id=course_a).count() == 2
+
+
+@override_settings(SYSADMIN_MAX_GIT_LOGS_THRESHOLD=2)
+def test_import_prunes_its_course():
+    """
+    Saving the log of an import keeps the latest logs of its course only
+    """
+    course_a = CourseLocator("MITx", "a", "run")
+    course_b = CourseLocator("MITx", "b", "run")
+    create_logs(course_a, 3)
+    create_logs(course_b, 3)
+
+    cgl = save_course_git_log(course_a, "repo", "", "", ImportLogHandler(), 0.5)
+    assert set(
+        CourseGitLog.objects.filter(course_id=course_a).values_list("pk", flat=True)
+    ) == {cgl.pk, CourseGitLog.objects.get(git_log="a_0").pk}
+    assert CourseGitLog.objects.filter(course_id=course_b).count() == 3
+
+
+def test_import_commit_validated():
+    """
+    Only full commit ids are stored along with the log of an import
+    """
+    course_a = CourseLocator("MITx", "a", "run")
+    commit_id = "0123456789abcdef0123456789abcdef01234567"
+
+    cgl = save_course_git_log(
+        course_a, "repo", "", commit_id + "\n", ImportLogHandler(), 0.5
+    )
+    assert cgl.commit == commit_id
+    cgl = save_course_git_log(
+        course_a, "repo", "", "fatal: bad revision", ImportLogHandler(), 0.5
+    )
+    assert cgl.commit is None
+
+
+def test_prune_removes_indexed_messages():
+    """
+    The indexed messages of the pruned logs and their terms are removed with them
+    """
+    course_a = CourseLocator("MITx", "a", "run")
+    create_logs(course_a, 2, age_days=40)
+    for cgl in CourseGitLog.objects.all():
+        index_import_log_messages(cgl, [(logging.ERROR, "Broken problem")])
+
+    assert prune_course_git_logs(max_age_days=30, batch_size=1) == 2
+    assert not CourseGitLogMessage.objects.exists()
+    assert not CourseGitLogTerm.objects.exists()
+
+
+def test_instructor_course_ids_cached_per_request(django_assert_num_queries):
+    """
+    The instructor courses of a user are fetched once and refetched when a role changes
+    """
+    RequestCache.clear_all_namespaces()
+    user = UserFactory.create()
+    course_key = CourseLocator("MITx", "a", "run")
+
+    with django_assert_num_queries(1):
+        assert not user_has_access_to_git_logs_panel(user)
+        assert get_instructor_course_ids(user) == frozenset()
+
+    CourseInstructorRole(course_key).add_users(user)
+    with django_assert_num_queries(1):
+        assert user_has_access_to_git_logs_panel(user)
+        assert get_instructor_course_ids(user) == {course_key}
+
+    CourseInstructorRole(course_key).remove_users(user)
+    assert get_instructor_course_ids(user) == frozenset()
+
+
+def test_course_import_status():
+    """
+    Only the latest import of a course is kept, failed imports are listed first
+    """
+    course_a = CourseLocator("MITx", "a", "run")
+    course_b = CourseLocator("MITx", "b", "run")
+    now = timezone.now()
+    for course_key, status, age_days in (
+        (course_a, CourseGitLog.STATUS_FAILED, 3),
+        (course_b, CourseGitLog.STATUS_SUCCEEDED, 2),
+        (course_a, CourseGitLog.STATUS_SUCCEEDED, 1),
+        (course_b, CourseGitLog.STATUS_FAILED, 0),
+    ):
+        cgl = CourseGitLog.objects.create(
+            course_id=course_key, repo_dir="repo", status=status
+        )
+        CourseGitLog.objects.filter(pk=cgl.pk).update(
+            created=now - timedelta(days=age_days)
+        )
+        update_course_import_status(CourseGitLog.objects.get(pk=cgl.pk))
+
+    def course_ids(**kwargs):
+        return [
+            import_status.course_id
+            for import_status in get_course_import_statuses(**kwargs)
+        ]
+
+    assert course_ids() == [course_b, course_a]
+    assert course_ids(sort="last_import") == [course_a, course_b]
+    assert course_ids(status=CourseGitLog.STATUS_SUCCEEDED) == [course_a]
+
+
+def test_sysadmin_permissions_shared_per_request(django_assert_num_queries):
+    """
+    All access checks of a request share one role query, staff need none
+    """
+    RequestCache.clear_all_namespaces()
+    instructor = UserFactory.create()
+    course_key = CourseLocator("MITx", "a", "run")
+    CourseInstructorRole(course_key).add_users(instructor)
+    staff = UserFactory.create(is_staff=True)
+
+    with django_assert_num_queries(1):
+        assert user_has_access_to_sysadmin(instructor)
+        assert user_has_access_to_git_logs_panel(instructor)
+        assert not user_has_access_to_git_import_panel(instructor)
+        assert get_sysadmin_permissions(instructor).can_view_course_logs(course_key)
+        assert not get_sysadmin_permissions(instructor).can_view_course_logs(
+            CourseLocator("MITx", "b", "run")
+        )
+
+    with django_assert_num_queries(0):
+        assert user_has_access_to_sysadmin(staff)
+        assert get_sysadmin_permissions(staff).can_view_course_logs(course_key)
+
+
+def test_instructor_course_ids_cached_across_requests(django_assert_num_queries):
+    """
+    Later requests reuse the cached instructor courses until the user's roles change
+    """
+    RequestCache.clear_all_namespaces()
+    user = UserFactory.create()
+    course_key = CourseLocator("MITx", "a", "run")
+    CourseInstructorRole(course_key).add_users(user)
+    assert get_instructor_course_ids(user) == {course_key}
+
+    RequestCache.clear_all_namespaces()
+    with django_assert_num_queries(0):
+        assert user_has_access_to_git_logs_panel(user)
+
+    RequestCache.clear_all_namespaces()
+    CourseInstructorRole(course_key).remove_users(user)
+    RequestCache.clear_all_namespaces()
+    assert not user_has_access_to_git_logs_panel(user)
+
+
+def test_limit_command():
+    """
+    Commands get their limits from the shell they are started by, or run as is
+    """
+    cmd = [
+        sys.executable,
+        "-c",
+        "import resource; print(resource.getrlimit(resource.RLIMIT_CPU))",
+    ]
+    assert limit_command(cmd) == cmd
+    output = subprocess.check_output(
+        limit_command(cmd, cpu_limit=30, memory_limit=2**31)
+    )
+    assert output == b"(30, 30)\n"